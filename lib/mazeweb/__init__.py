@@ -19,23 +19,39 @@ import bottle
 from beaker.middleware import SessionMiddleware
 
 
+from .util import encoding
+from .util.data import load_configuration, unwrap
+
+#: The options passed to the Beaker session middleware; these may be overridden
+#: with the configuration value ``session.beaker``. Sessions are saved only when
+#: the maze is stored; see :func:`mazeweb.util.save`
 session_options = {
     'session.type': 'memory',
     'session.cookie_expires': 300,
-    'session.auto': True}
+    'session.auto': False,
+    'session.save_accessed_time': False}
+session_options.update(
+    ('session.' + key, value)
+    for key, value in unwrap(
+        load_configuration('mazeweb')('session.beaker', {})).items())
 
 
+# Responses are encoded with mazeweb.util.encoding.dumps, which splices in the
+# cached representations of rooms
 app = bottle.Bottle()
+app.uninstall(bottle.JSONPlugin)
+app.install(bottle.JSONPlugin(json_dumps = encoding.dumps))
 
 @app.get('/')
 def get_session_cookie():
     """Simply causes the beaker session cookie to be set.
     """
     session = bottle.request.environ.get('beaker.session')
-    session.persist()
+    if session.is_new:
+        session.save()
 
 
-import _info as info
+from . import _info as info
 from . import crawler
 from . import plugins
 
@@ -19,3 +19,6 @@ import bottle
 from . import plugin
 from . import maze_route
 from . import maze_room_route
+from . import maze_path_route
+from . import export_route
+from . import stats_route
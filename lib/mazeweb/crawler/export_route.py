@@ -0,0 +1,75 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import hmac
+
+import bottle
+from .. import app, util
+from ..util import export
+
+
+def _authorized():
+    """Returns whether the request carries the operator token.
+
+    The token is passed as ``Authorization: Bearer <token>``, and is compared
+    in constant time.
+
+    :rtype: bool
+    """
+    if not util.EXPORT_TOKEN:
+        return False
+    actual = bottle.request.headers.get('Authorization', '')
+    expected = 'Bearer ' + util.EXPORT_TOKEN
+    return hmac.compare_digest(
+        actual if isinstance(actual, bytes) else actual.encode('utf-8'),
+        expected if isinstance(expected, bytes) else expected.encode('utf-8'))
+
+
+@app.get('/maze/export')
+def maze_export(maze):
+    """Exports the topology of the whole current maze.
+
+    The response is streamed one row of rooms at a time as newline delimited
+    JSON, or in the binary format if the client accepts it; see
+    :mod:`mazeweb.util.export`.
+
+    This route is intended for operators, and is disabled unless
+    ``export.enabled`` is set in the configuration. Since the export reveals
+    the rooms not yet discovered, the request must also carry the operator
+    token ``export.token``.
+
+    :reqheader Accept: ``application/x-mazeweb`` to receive the export in the
+        binary format.
+
+    :reqheader Authorization: ``Bearer <token>``, where ``<token>`` is the
+        value of ``export.token``.
+
+    :statuscode 200: the maze is being exported
+
+    :statuscode 204: no maze has been initialised
+
+    :statuscode 403: exports are disabled, or the operator token is missing or
+        invalid
+    """
+    if not util.EXPORT or not _authorized():
+        raise bottle.HTTPError(status = 403)
+
+    if export.BINARY_MEDIA_TYPE in bottle.request.headers.get('Accept', ''):
+        bottle.response.content_type = export.BINARY_MEDIA_TYPE
+        return export.binary(maze)
+    else:
+        bottle.response.content_type = export.NDJSON_MEDIA_TYPE
+        return export.ndjson(maze)
@@ -0,0 +1,49 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bottle
+from .. import app, util
+
+
+@app.get('/maze/path')
+def maze_get_path(maze):
+    """Finds the shortest path from the current room to a visited room.
+
+    Only rooms that have been visited by the session are considered, so the
+    path reveals nothing about the maze that the client has not already seen.
+
+    The response is a :term:`path dict`.
+
+    :query to: The :term:`room identifier` of the target room.
+
+    :statuscode 200: the path was found
+
+    :statuscode 204: no maze has been initialised
+
+    :statuscode 400: ``to`` is missing or invalid
+
+    :statuscode 403: the target room has not been visited
+
+    :statuscode 404: the target room does not exist
+    """
+    try:
+        room_identifier = int(bottle.request.query.to)
+    except ValueError:
+        raise bottle.HTTPError(status = 400)
+
+    return dict(
+        path = [maze[room_pos].identifier
+            for room_pos in util.find_path(maze, room_identifier)])
@@ -18,6 +18,47 @@ import bottle
 from .. import app, util
 
 
+@app.get('/maze/rooms')
+def maze_get_rooms(maze):
+    """Retrieves descriptions of several rooms.
+
+    Only immediately reachable rooms will be returned; other rooms are listed
+    as denied, without distinguishing between unreachable and invalid rooms.
+
+    The response is a :term:`room list dict`.
+
+    :query ids: The :term:`room identifier` values of the rooms, separated by
+        comma (``,``).
+
+    :reqheader Accept: ``application/x-mazeweb`` to receive the response in
+        the :term:`binary wire format`.
+
+    :statuscode 200: the rooms were successfully retrieved
+
+    :statuscode 204: no maze has been initialised
+
+    :statuscode 400: ``ids`` is missing or invalid
+    """
+    try:
+        room_identifiers = [int(room_identifier)
+            for room_identifier in bottle.request.query.ids.split(',')]
+    except ValueError:
+        raise bottle.HTTPError(status = 400)
+
+    rooms = []
+    denied = []
+    for room_identifier in room_identifiers:
+        room_pos = util.find_adjacent(maze, room_identifier)
+        if room_pos is None:
+            denied.append(room_identifier)
+        else:
+            rooms.append(util.room_to_dict(maze, room_pos, True))
+
+    return util.response(maze, dict(
+        rooms = rooms,
+        denied = denied))
+
+
 @app.get('/maze/<room_identifier:int>')
 def maze_get_room(maze, room_identifier):
     """Retrieves a description of a room.
@@ -30,6 +71,9 @@ def maze_get_room(maze, room_identifier):
 
     :param room_identifier: The room identifier.
 
+    :reqheader Accept: ``application/x-mazeweb`` to receive the response in
+        the :term:`binary wire format`.
+
     :statuscode 200: the room was successfully retrieved
 
     :statuscode 204: no maze has been initialised
@@ -38,6 +82,6 @@ def maze_get_room(maze, room_identifier):
 
     :statuscode 404: ``room_identifier`` is invalid
     """
-    return util.room_to_dict(
+    return util.response(maze, util.room_to_dict(
         maze,
-        util.get_adjacent(maze, room_identifier), True)
+        util.get_adjacent(maze, room_identifier), True))
@@ -24,11 +24,14 @@ def maze_get(maze):
 
     The response is a :term:`maze dict` describing the new maze.
 
+    :reqheader Accept: ``application/x-mazeweb`` to receive the response in
+        the :term:`binary wire format`.
+
     :statuscode 200: the maze description was retrieved
 
     :statuscode 204: no maze has been initialised
     """
-    return util.to_dict(maze)
+    return util.response(maze, util.to_dict(maze))
 
 
 @app.post('/maze')
@@ -37,6 +40,9 @@ def maze_reset():
 
     The response is a :term:`maze dict` describing the new maze.
 
+    :reqheader Accept: ``application/x-mazeweb`` to receive the response in
+        the :term:`binary wire format`.
+
     :jsonparam int width: The width of the maze. This must be a value greater
         than ``0``. This value is optional with a default value of ``30``.
 
@@ -47,6 +53,16 @@ def maze_reset():
         value is optional with a default value of ``4``. Supported values are
         ``3``, ``4`` and ``6``.
 
+    :jsonparam str algorithm: The algorithm used to generate the maze. This
+        value is optional with a default value of ``"prim"``. Supported values
+        are ``"prim"``, ``"backtracker"``, ``"kruskal"``, ``"wilson"`` and
+        ``"pymaze"``; see :mod:`mazeweb.util.generate`.
+
+    :jsonparam bool lazy: Whether to generate the rooms of the maze only when
+        they are accessed. This value is optional with a default value of
+        ``false``. Use this for very large mazes; see
+        :mod:`mazeweb.util.regions`.
+
     :statuscode 200: the maze was successfully reset
 
     :statuscode 400: a parameter is invalid
@@ -59,26 +75,46 @@ def maze_reset():
         print('Remaining arguments: ' + str(remaining))
 
     util.store(maze)
-    return util.to_dict(maze)
+    return util.response(maze, util.to_dict(maze))
 
 
 @app.put('/maze')
 def maze_update():
     """Updates the maze.
 
-    The response is a :term:`maze dict` describing the new maze.
+    The response is a :term:`maze dict` describing the new maze, or a
+    :term:`delta dict` if ``delta`` is ``true``.
+
+    :reqheader Accept: ``application/x-mazeweb`` to receive the response in
+        the :term:`binary wire format`.
 
     :jsonparam int current_room: The :term:`room identifier` of the room to
         which to move. This room must be immediately reachable from the current
         room. This parameter is optional.
 
+    :jsonparam list path: A list of :term:`room identifier` values of rooms
+        through which to move, in order. Every room must be immediately
+        reachable from the previous one, and the first room from the current
+        room. The maze is updated only if the whole path is valid. If this
+        parameter is specified, ``current_room`` is ignored.
+
+    :jsonparam bool steps: Whether to include a list of the
+        :term:`non-recursive room dict` values of the rooms moved through as
+        ``steps`` in the response. This value is optional with a default value
+        of ``false``.
+
+    :jsonparam bool delta: Whether to respond with a :term:`delta dict`
+        containing only the current room and the rooms that became visible,
+        instead of a maze dict. This value is optional with a default value of
+        ``false``.
+
     :statuscode 200: the maze was successfully updated
 
-    :statuscode 400: no maze has been initialised
+    :statuscode 400: no maze has been initialised, or a parameter is invalid
 
-    :statuscode 403: the requested room is not immediately reachable
+    :statuscode 403: a requested room is not immediately reachable
 
-    :statuscode 404: the requested room does not exist
+    :statuscode 404: a requested room does not exist
     """
     try:
         maze = util.load()
@@ -87,30 +123,38 @@ def maze_update():
             e.status = 400
         raise
 
-    # Do not store the session by default
-    store = False
-
-    # Check for a request to change the current room
+    # Check for a request to change the current room; a single room is treated
+    # as a path of length one
     try:
-        next_room_identifier = int(bottle.request.json.get(
-            'current_room',
-            maze.current_room))
+        request = bottle.request.json
+        if 'path' in request:
+            if not isinstance(request['path'], list):
+                raise ValueError('path must be a list')
+            path = [int(room_identifier) for room_identifier in request['path']]
+        else:
+            path = [int(request.get('current_room', maze.current_room))]
+        steps = request.get('steps', False) is True
+        delta = request.get('delta', False) is True
     except:
         return bottle.HTTPResponse(status = 400)
-    if next_room_identifier != maze.current_room:
-        next_room = util.get_adjacent(maze, next_room_identifier)
-        maze.current_room = next_room_identifier
-        store = True
-
-    if store:
-        util.store(maze)
+    if not path:
+        return bottle.HTTPResponse(status = 400)
+    previous = util.visible(maze, maze.current_room_pos) if delta else None
+    room_positions = util.move(maze, path)
 
-    result = util.to_dict(maze)
+    result = util.delta_to_dict(maze, previous) if delta \
+        else util.to_dict(maze)
+    if steps:
+        result['steps'] = [util.room_to_dict(maze, room_pos)
+            for room_pos in room_positions]
 
     for plugin in maze.plugins.values():
         plugin.update_maze(maze, bottle.request.json, result)
 
-    return result
+    # Only the changes made by this request are stored
+    util.save(maze)
+
+    return util.response(maze, result)
 
 
 @app.delete('/maze')
@@ -119,5 +163,6 @@ def maze_delete():
 
     :statuscode 204: the maze was deleted
     """
+    util.delete()
     bottle.request.environ.get('beaker.session').delete()
     return bottle.HTTPResponse(status = 204)
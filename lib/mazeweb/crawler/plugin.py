@@ -21,6 +21,9 @@ from bottle import abort, install, HTTPResponse, HTTPError
 from .. import app, plugins, util
 from mazeweb import app
 
+# inspect.getargspec is not available on recent versions of Python 3
+_getargspec = getattr(inspect, 'getfullargspec', None) or inspect.getargspec
+
 
 class MazePlugin(object):
     """A bottle plugin that replaces the keyword argument 'maze' with an actual
@@ -42,13 +45,13 @@ class MazePlugin(object):
         """
         callback = context.callback
         try:
-            return inspect.getargspec(callback)[0]
+            return _getargspec(callback)[0]
         except TypeError:
             try:
-                return inspect.getargspec(callback.callback)[0]
+                return _getargspec(callback.callback)[0]
             except TypeError:
                 # Assume callback is a classmethod if we cannot get argspec
-                return inspect.getargspec(callback.callback.__func__)[0]
+                return _getargspec(callback.callback.__func__)[0]
 
     def apply(self, callback, context):
         # Check whether the route accepts the 'maze' keyword argument; ignore it
@@ -84,22 +87,28 @@ class MazePlugin(object):
             if 'maze' in argspec:
                 kwargs['maze'] = maze
 
-            return callback(*args, **kwargs)
+            result = callback(*args, **kwargs)
+
+            # Store any changes made to the maze by the route
+            if maze:
+                util.save(maze)
+
+            return result
 
         # Replace the route callback with the wrapped one.
         return wrapper
 
     class routed(object):
         def __init__(self, callback, method, *args, **kwargs):
-            # Assume callback is a classmethod if __name__ is not set
-            try:
-                self.__name__ = callback.__name__
-                self.is_classmethod = False
-                self.callback = callback
-            except AttributeError:
+            # Since Python 3.10, classmethod objects have __name__
+            if isinstance(callback, classmethod):
                 self.__name__ = callback.__func__.__name__
                 self.is_classmethod = True
                 self.callback = callback.__func__
+            else:
+                self.__name__ = callback.__name__
+                self.is_classmethod = False
+                self.callback = callback
 
             self.__doc__ = callback.__doc__
             self.method = method
@@ -0,0 +1,33 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bottle
+from .. import app, util
+
+
+@app.get('/stats')
+def stats_get():
+    """Retrieves statistics for the server process handling the request.
+
+    The response is a :term:`statistics dict`.
+
+    :statuscode 200: the statistics were retrieved
+    """
+    return dict(
+        cache = util.TOPOLOGIES.stats(),
+        sessions = util.SESSIONS.stats(),
+        paths = util.PATHS.stats(),
+        saves = util.SAVES.stats())
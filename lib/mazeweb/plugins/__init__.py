@@ -14,13 +14,12 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
-import json
 import os
 
 #: The available plugin classes
 PLUGINS = {}
 
-from ..util.data import ConfigurationStore, wrap, unwrap
+from ..util.data import ConfigurationStore, load_configuration, wrap, unwrap
 
 PLUGIN_PATH = os.getenv('MAZEWEB_PLUGIN_PATH', None)
 __path__ = (PLUGIN_PATH.split(os.pathsep) if not PLUGIN_PATH is None else []) \
@@ -34,6 +33,12 @@ class Plugin(object):
     #: The name of this plugin
     __plugin_name__ = None
 
+    #: Whether generated mazes may be cached and shared between sessions while
+    #: this plugin is loaded. Set this to ``False`` if :meth:`pre_initialize`
+    #: or :meth:`post_initialize` depend on anything but the maze and its
+    #: random number generator.
+    __plugin_cacheable__ = True
+
     def pre_initialize(self, maze):
         """Called when the maze has been initialised and all plugins loaded, but
         before the maze is initialised.
@@ -78,11 +83,34 @@ class Plugin(object):
         """
         pass
 
+    def visit_room(self, maze, room_pos):
+        """Called when a room is visited for the first time.
+
+        The start room is visited when the maze is created, without this
+        callback being called.
+
+        Whether any room has been visited is available from
+        ``maze.is_visited(maze.index(room_pos))``, and the number of visited
+        rooms from ``maze.visited_count``; neither requires the plugin to keep
+        its own record.
+
+        :param maze.BaseMaze maze: The maze.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+        """
+        pass
+
     def get_room(self, maze, room_pos, neighbor_details, result):
         """Called when the wire representation of a room is generated.
 
         This callback is called after the standard representation is generated.
 
+        The non-recursive representations of rooms are cached, so this callback
+        is not called again for a room until the maze is modified. If the
+        values added by a plugin change for any other reason, the plugin must
+        call :func:`mazeweb.util.invalidate`.
+
         :param maze.BaseMaze maze: The maze for which the wire representation is
             being generated.
 
@@ -128,41 +156,16 @@ class Plugin(object):
     def load_configuration(self):
         """Loads the configuration for this plugin and caches it in the class.
 
-        The configuration is read from the directories in
-        ``$MAZEWEB_CONFIG_DIR`` as
-        ``$MAZEWEB_CONFIG_DIR_PART/<self.__plugin_name__>.json``. The first file
-        found is used. ``$MAZEWEB_CONFIG_DIR`` is split on :attr:`os.pathsep`.
-
-        If the environment variable ``$MAZEWEB_CONFIG_DIR`` is not set, the
-        current directory will be used as ``$config_dir``.
+        The configuration is read from
+        ``$MAZEWEB_CONFIG_DIR_PART/plugins/<self.__plugin_name__>.json``, as
+        described for :func:`~mazeweb.util.data.load_configuration`.
 
         The value cached is a :class:`~mazeweb.util.data.ConfigurationStore`.
 
         :raises ValueError: if the configuration cannot be read
         """
-        # Iterate over all directories in $MAZEWEB_CONFIG_DIR
-        configuration_dirs = os.getenv('MAZEWEB_CONFIG_DIR', '.').split(
-            os.pathsep)
-
-        has_configuration = False
-        for configuration_dir in configuration_dirs:
-            # Load the JSON data and continue if it fails
-            filename = os.path.join(configuration_dir,
-                'plugins', self.__plugin_name__ + '.json')
-            try:
-                with open(filename, 'r') as f:
-                    data = json.load(f)
-                has_configuration = True
-                break
-            except IOError:
-                pass
-
-        if not has_configuration:
-            raise ValueError('Plugin %s does not have a configuration at %s',
-                self.__name__, filename)
-
-        # Wrap the configuration to make access easy
-        self.CONFIGURATION = ConfigurationStore(data)
+        self.CONFIGURATION = load_configuration(
+            os.path.join('plugins', self.__plugin_name__), True)
 
     @classmethod
     def initialize(self):
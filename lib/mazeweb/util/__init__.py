@@ -14,15 +14,20 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
+import array
 import bottle
+import collections
 import random
 
 from maze.quad import Maze
 from maze.tri import TriMaze
 from maze.hex import HexMaze
-from maze.randomized_prim import initialize
 
-from .numeric import randuniq
+from . import encoding, generate, regions, state, storage, wire
+from .cache import LRUCache
+from .counters import Counters
+from .data import load_configuration
+from .numeric import LFSR
 from ..plugins import PLUGINS
 
 
@@ -31,73 +36,365 @@ MAZE_CLASSES = dict((len(mc.Wall.WALLS), mc) for mc in (
     Maze,
     HexMaze))
 
-
-def new(width = 30, height = 20, walls = 4, seed = None, **kwargs):
+#: The mazeweb configuration, read from ``$MAZEWEB_CONFIG_DIR/mazeweb.json``
+CONFIGURATION = load_configuration('mazeweb')
+
+#: How mazes are stored in the session. With ``"compact"``, the doors and
+#: identifiers of all rooms are stored; with ``"seed"``, only the parameters
+#: required to regenerate the maze are stored for unmodified mazes, and
+#: regenerated mazes are kept in :data:`TOPOLOGIES`
+STORAGE = CONFIGURATION('session.storage', 'compact')
+if not STORAGE in ('compact', 'seed'):
+    raise ValueError('invalid session storage: %s' % STORAGE)
+
+#: The store in which the mazes of all sessions are kept; see
+#: :func:`mazeweb.util.storage.create`
+STORE = storage.create(CONFIGURATION)
+
+#: The number of times mazes have been saved in full, saved by updating only
+#: the current room and not saved at all since they were unmodified; see
+#: :func:`save`
+SAVES = Counters('full', 'current', 'avoided')
+
+#: The process-local cache of generated mazes, keyed on the generation
+#: parameters; the values are :class:`mazeweb.util.state.Snapshot` instances
+#: shared by all sessions using the same maze
+TOPOLOGIES = LRUCache(
+    CONFIGURATION('cache.size', 32),
+    CONFIGURATION('cache.memory', 64 * 1024 * 1024),
+    len)
+
+#: The process-local cache of session mazes, keyed on the session identifier;
+#: the values are :class:`mazeweb.util.state.Snapshot` instances, which are
+#: used instead of unpacking the stored maze as long as its revision is
+#: unchanged
+SESSIONS = LRUCache(
+    CONFIGURATION('cache.sessions.size', 256),
+    CONFIGURATION('cache.sessions.memory', 64 * 1024 * 1024),
+    len)
+
+#: The width and height of the regions of lazily generated mazes; see
+#: :mod:`mazeweb.util.regions`
+REGION_SIZE = CONFIGURATION('lazy.region', regions.REGION_SIZE)
+
+#: The maximum number of generated regions kept for every lazily generated maze
+REGION_CACHE = CONFIGURATION('cache.regions', regions.REGION_CACHE)
+
+#: The maximum number of room dicts cached for a maze; see :func:`room_to_dict`
+ROOM_CACHE_SIZE = CONFIGURATION('cache.rooms', 65536)
+
+#: The process-local cache of distance tables used to find paths through
+#: visited rooms, keyed on the session identifier, the revision of the maze, the
+#: number of visited rooms and the index of the target room; since rooms are
+#: never unvisited, the number identifies the visited rooms of a revision; see
+#: :func:`find_path`
+PATHS = LRUCache(
+    CONFIGURATION('cache.paths.size', 64),
+    CONFIGURATION('cache.paths.memory', 16 * 1024 * 1024),
+    state._nbytes)
+
+#: The distance of rooms not reachable through visited rooms in the tables of
+#: :data:`PATHS`
+UNREACHABLE = 0xFFFFFFFF
+
+#: Whether whole mazes may be exported; see :mod:`mazeweb.util.export`
+EXPORT = CONFIGURATION('export.enabled', False) is True
+
+#: The operator token required to export mazes; exports are refused if this is
+#: not set
+EXPORT_TOKEN = CONFIGURATION('export.token', None)
+
+
+def new(width = 30, height = 20, walls = 4, seed = None,
+        algorithm = generate.DEFAULT, lazy = False, **kwargs):
     """Creates a new maze from keyword arguments.
 
+    If ``seed`` is specified, or :data:`STORAGE` is ``"seed"``, the generated
+    maze is kept in :data:`TOPOLOGIES`, and later calls with the same
+    parameters return a maze sharing its doors and identifiers. Since plugins
+    may modify the maze when it is initialised, this requires plugin
+    initialisation to be deterministic; see
+    :attr:`mazeweb.plugins.Plugin.__plugin_cacheable__`.
+
+    Lazily generated mazes are always kept in :data:`TOPOLOGIES`, since they
+    are regenerated from their parameters when loaded.
+
     :param int width: The width of the maze.
 
     :param int height: The height of the maze.
 
     :param int walls: The number of walls. Valid values are 3, 4 and 6.
 
+    :param int seed: The seed for the random number generator. If this is not
+        specified, a random seed is used.
+
+    :param str algorithm: The name of the generation algorithm in
+        :data:`mazeweb.util.generate.ALGORITHMS`.
+
+    :param bool lazy: Whether to generate the rooms of the maze only when they
+        are accessed; see :mod:`mazeweb.util.regions`.
+
     :return: the tuple (a new maze instance, unused arguments)
 
-    :raises KeyError: if walls is invalid
+    :raises KeyError: if walls or algorithm is invalid
 
-    :raises ValueError: if the dimensions are invalid
+    :raises ValueError: if the dimensions or the seed are invalid, or if a
+        lazily generated maze is requested while a loaded plugin prevents
+        caching
     """
     if width <= 0 or height <= 0:
         raise ValueError('invalid maze dimensions')
-    maze = MAZE_CLASSES[walls](width, height)
+    if walls not in state.VIEW_CLASSES:
+        raise KeyError(walls)
+    if algorithm not in generate.ALGORITHMS:
+        raise KeyError(algorithm)
+    lazy = lazy is True
+    cache = not seed is None or STORAGE == 'seed' or lazy
+    seed = seed or random.randint(1, 1000000)
+    if seed <= 0:
+        raise ValueError('invalid seed')
+
+    key = _topology_key(walls, width, height, seed, algorithm, lazy) \
+        if cache else None
+    if key is None and lazy:
+        raise ValueError('lazy mazes cannot be cached')
+    if not key is None:
+        try:
+            return (TOPOLOGIES[key].restore(), kwargs)
+        except KeyError:
+            pass
+
+    maze = _generate(walls, width, height, seed, algorithm, lazy)
+    if not key is None:
+        maze.seeded = True
+        TOPOLOGIES[key] = state.Snapshot(maze)
+
+    return (maze, kwargs)
+
+
+def _generate(walls, width, height, seed, algorithm, lazy = False):
+    """Generates a new maze and initialises the plugins.
+
+    :param int walls: The number of walls.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :param int seed: The seed for the random number generator.
+
+    :param str algorithm: The name of the generation algorithm.
+
+    :param bool lazy: Whether to generate the rooms only when they are
+        accessed.
+
+    :return: a new maze
+    :rtype: mazeweb.util.state.MazeView
+    """
+    maze = regions.create(walls, width, height, seed) if lazy \
+        else state.create(walls, width, height)
     maze.plugins = dict((name, plugin()) for name, plugin in PLUGINS.items())
-    maze.random = randuniq(
-        None,
-        seed or random.randint(0, 1000000))
+    maze.seed = seed
+    maze.algorithm = algorithm
+    maze.random = LFSR(seed)
 
     for plugin in maze.plugins.values():
         plugin.pre_initialize(maze)
-    initialize(maze, lambda max: next(maze.random) % max)
 
-    maze.room_mapping = {}
-    for room_pos in maze.room_positions:
-        identifier = next(maze.random)
-        maze[room_pos].identifier = identifier
-        maze.room_mapping[identifier] = room_pos
+    # Identifiers are assigned in the order of maze.room_positions, which is the
+    # order of the backing array, by a permutation of the room index; they are
+    # thus unique, and rooms are found from their identifiers in constant time.
+    # Lazy mazes compute them when accessed
+    if lazy:
+        maze._doors.generate(seed, algorithm, REGION_SIZE, REGION_CACHE)
+    else:
+        generate.ALGORITHMS[algorithm](maze,
+            lambda max: next(maze.random) % max)
+        identifiers = maze._identifiers
+        identifiers[:] = state.identifier_permutation(seed).block(
+            len(identifiers))
+    maze.permuted = True
 
     maze.current_room = maze[(0, 0)].identifier
 
     for plugin in maze.plugins.values():
         plugin.post_initialize(maze)
 
-    return (maze, kwargs)
+    maze.visit(maze.current_room_index)
+
+    return maze
+
+
+def _topology_key(walls, width, height, seed, algorithm, lazy = False):
+    """Returns the key in :data:`TOPOLOGIES` for a maze.
+
+    Since plugins may modify the maze when it is initialised, the loaded
+    plugins are part of the key.
+
+    :return: a key, or ``None`` if a loaded plugin prevents caching
+    """
+    if not all(getattr(plugin, '__plugin_cacheable__', True)
+            for plugin in PLUGINS.values()):
+        return None
+    return (walls, width, height, seed & 0xFFFFFFFF, algorithm, lazy,
+        tuple(sorted(PLUGINS)))
+
+
+def topology(walls, width, height, seed, algorithm, lazy = False):
+    """Returns the shared backing arrays of a generated maze.
+
+    If the maze is not in :data:`TOPOLOGIES`, it is regenerated and added.
+
+    :param int walls: The number of walls.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :param int seed: The seed used to generate the maze.
+
+    :param str algorithm: The name of the algorithm used to generate the maze.
+
+    :param bool lazy: Whether the maze is lazily generated.
+
+    :return: the tuple ``(doors, identifiers)``; these must not be modified
+    """
+    key = _topology_key(walls, width, height, seed, algorithm, lazy)
+    snapshot = TOPOLOGIES.get(key) if not key is None else None
+    if snapshot is None:
+        snapshot = state.Snapshot(_generate(walls, width, height, seed,
+            algorithm, lazy))
+        if not key is None:
+            TOPOLOGIES[key] = snapshot
+    return (snapshot.doors, snapshot.identifiers)
 
 
 def load():
     """Loads the maze from the current session.
 
+    The session contains the maze in the compact format described in
+    :mod:`mazeweb.util.state`; a new maze view is created for every call.
+    Mazes stored with only their generation parameters are retrieved using
+    :func:`topology`.
+
+    If the revision of the stored maze matches the one in :data:`SESSIONS`,
+    the view is restored from there instead of being unpacked.
+
     :return: the current maze
-    :rtype: maze.BaseMaze
+    :rtype: mazeweb.util.state.MazeView
 
     :raises bottle.HTTPResponse: if no cached maze exists
     """
     session = bottle.request.environ.get('beaker.session')
     try:
-        return session['maze']
+        data = STORE.load(session)
     except KeyError:
         raise bottle.HTTPResponse(status = 204)
 
+    revision = state.get_revision(data)
+    snapshot = SESSIONS.get(session.id)
+    if not snapshot is None and snapshot.revision == revision:
+        return snapshot.restore(True, state.get_current(data),
+            state.get_moves(data), state.get_visited(data),
+            state.get_visited_count(data))
+
+    maze = state.unpack(data, topology)
+    if revision:
+        SESSIONS[session.id] = state.Snapshot(maze)
+    return maze
+
 
 def store(maze):
     """Stores a maze to the current session.
 
-    The session is saved.
+    The maze is stored in :data:`STORE` in the compact format described in
+    :mod:`mazeweb.util.state`. If :data:`STORAGE` is ``"seed"``, the doors and
+    identifiers are omitted for unmodified mazes.
 
-    :param maze.BaseMaze: maze The new maze.
+    A new revision is assigned to the maze, and it is added to
+    :data:`SESSIONS`.
+
+    :param mazeweb.util.state.MazeView: maze The new maze.
+    """
+    session = bottle.request.environ.get('beaker.session')
+    maze.revision = random.randint(1, 0xFFFFFFFF)
+    STORE.store(session, state.pack(maze, STORAGE == 'seed'))
+    SESSIONS[session.id] = state.Snapshot(maze)
+    SAVES.increment('full')
+
+    # The session must be saved for its cookie to be sent, and automatic saving
+    # is disabled
+    if session.is_new:
+        session.save()
+
+
+def store_current(maze):
+    """Stores only the current room, the number of moves and the newly visited
+    rooms of a maze to the current session.
+
+    This must only be used when nothing but the current room and the visited
+    rooms have changed since the maze was loaded.
+
+    :param mazeweb.util.state.MazeView: maze The maze.
+    """
+    session = bottle.request.environ.get('beaker.session')
+    try:
+        STORE.store_current(session, maze.current_room_index, maze.moves,
+            maze.visits)
+        SAVES.increment('current')
+    except KeyError:
+        store(maze)
+
+
+def save(maze):
+    """Saves the changes made to a maze loaded with :func:`load`.
+
+    Nothing is stored if the maze is unmodified, and only the current room and
+    the newly visited rooms are stored if nothing else has changed; see
+    :attr:`mazeweb.util.state.MazeView.modified`.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+    """
+    modified = maze.modified
+    if not modified:
+        SAVES.increment('avoided')
+    elif not modified & ~(state.MODIFIED_CURRENT | state.MODIFIED_VISITED):
+        store_current(maze)
+    else:
+        store(maze)
+
+
+def delete():
+    """Deletes the maze of the current session.
     """
     session = bottle.request.environ.get('beaker.session')
-    session['maze'] = maze
-    session.save()
+    STORE.delete(session)
+    try:
+        del SESSIONS[session.id]
+    except KeyError:
+        pass
+
+
+def invalidate(maze, room_pos = None):
+    """Invalidates the cached wire representations of rooms.
+
+    Plugins must call this function when the values they add in
+    :meth:`mazeweb.plugins.Plugin.get_room` change for any reason other than
+    modification of the rooms of the maze.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param room_pos: The position of the room to invalidate. If this is not
+        specified, all rooms are invalidated.
+    :type room_pos: (int, int)
+    """
+    if room_pos is None:
+        maze.room_dicts = {}
+    elif room_pos in maze.room_dicts:
+        # The dict may be shared with other views, so it must not be modified
+        room_dicts = dict(maze.room_dicts)
+        del room_dicts[room_pos]
+        maze.room_dicts = room_dicts
 
 
 def to_dict(maze):
@@ -116,8 +413,10 @@ def to_dict(maze):
         walls = len(maze.Wall.WALLS),
         plugins = list(maze.plugins.keys()),
         start_room = maze[(0, 0)].identifier,
-        current_room = room_to_dict(maze, maze.room_mapping[maze.current_room],
-            neighbor_details = True))
+        current_room = room_to_dict(maze, maze.current_room_pos,
+            neighbor_details = True),
+        version = maze.moves,
+        visited = maze.visited_count)
 
     for plugin in maze.plugins.values():
         plugin.get_maze(maze, result)
@@ -125,6 +424,71 @@ def to_dict(maze):
     return result
 
 
+def delta_to_dict(maze, previous):
+    """Converts the changes visible to a client after a move to a dict.
+
+    The result is a :term:`delta dict`.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param set previous: The positions of the rooms visible before the move, as
+        returned by :func:`visible`.
+
+    :return: a dict describing the current room and the rooms that became
+        visible
+    :rtype: dict
+    """
+    room_pos = maze.current_room_pos
+    return dict(
+        version = maze.moves,
+        current_room = room_to_dict(maze, room_pos),
+        rooms = [room_to_dict(maze, visible_pos)
+            for visible_pos in sorted(visible(maze, room_pos) - previous)
+            if visible_pos != room_pos])
+
+
+def visible(maze, room_pos):
+    """Returns the positions of the rooms visible from a room.
+
+    A room is visible if it is the room itself or if it is immediately
+    reachable from the room.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param room_pos: The position of the room.
+    :type room_pos: (int, int)
+
+    :rtype: set
+    """
+    result = set(target_pos
+        for target_pos, target, start, end in _room_geometry(maze, room_pos)[2]
+        if not target_pos is None)
+    result.add(room_pos)
+    return result
+
+
+def response(maze, value):
+    """Returns the response for a maze dict or room dict.
+
+    If the client accepts :data:`mazeweb.util.wire.MEDIA_TYPE`, the value is
+    encoded in the binary wire format, otherwise it is returned unchanged to be
+    encoded as JSON.
+
+    :param mazeweb.util.state.MazeView maze: The maze described by ``value``.
+
+    :param dict value: A :term:`maze dict`, a :term:`recursive room dict`, a
+        :term:`room list dict` or a :term:`delta dict`.
+
+    :return: the response
+    """
+    bottle.response.set_header('Vary', 'Accept')
+    if not wire.MEDIA_TYPE in bottle.request.headers.get('Accept', ''):
+        return value
+
+    bottle.response.content_type = wire.MEDIA_TYPE
+    return wire.dumps(value, maze.geometry)
+
+
 def room_to_dict(maze, room_pos, neighbor_details = False):
     """Converts a room to a ``dict``.
 
@@ -141,32 +505,280 @@ def room_to_dict(maze, room_pos, neighbor_details = False):
         populated with ``room_to_dict(maze, neighbor_pos, False)``, otherwise it
         will be set to the identifier of the neighbour room.
 
+    Non-recursive room dicts are cached in ``maze.room_dicts`` until the maze is
+    modified or :func:`invalidate` is called, so they must not be modified by
+    the caller. They are instances of
+    :class:`mazeweb.util.encoding.CachedDict`, so their JSON representation is
+    created only once. Recursive room dicts are assembled from the cached room
+    dicts of the neighbours.
+
     :return: a dict describing the room
     :rtype: dict
     """
-    result = dict(
-        identifier = maze[room_pos].identifier,
+    room_dicts = maze.room_dicts
+    if not neighbor_details:
+        try:
+            return room_dicts[room_pos]
+        except KeyError:
+            pass
+
+    identifier, center, walls = _room_geometry(maze, room_pos)
+    result = (dict if neighbor_details else encoding.CachedDict)(
+        identifier = identifier,
         position = dict(
             x = room_pos[0],
             y = room_pos[1]),
         center = dict(
-            x = maze.get_center(room_pos)[0],
-            y = maze.get_center(room_pos)[1]),
+            x = center[0],
+            y = center[1]),
         walls = [dict(
-            target = (maze[maze.walk(w)].identifier if not neighbor_details
-                    else room_to_dict(maze, maze.walk(w)))
-                if w in maze[room_pos] else None,
+            target = (target if not neighbor_details
+                    else room_to_dict(maze, target_pos))
+                if not target_pos is None else None,
             span = dict(
-                start = w.span[0],
-                end = w.span[1])) for w in maze.walls(room_pos)
-            if not maze.edge(w)])
+                start = start,
+                end = end)) for target_pos, target, start, end in walls])
 
     for plugin in maze.plugins.values():
         plugin.get_room(maze, room_pos, neighbor_details, result)
 
+    if not neighbor_details and len(room_dicts) < ROOM_CACHE_SIZE:
+        room_dicts[room_pos] = result
+
+    return result
+
+
+def _room_geometry(maze, room_pos):
+    """Returns the parts of the wire representation of a room that depend only
+    on the rooms of the maze.
+
+    The values are cached in ``maze.derived``.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param room_pos: The position of the room.
+    :type room_pos: (int, int)
+
+    :return: the tuple ``(identifier, center, walls)``, where ``walls`` is a
+        sequence of ``(target_pos, target, start, end)`` for all walls not on
+        the edge of the maze; ``target_pos`` and ``target`` are ``None`` for
+        walls without doors
+    """
+    key = ('room', room_pos)
+    try:
+        return maze.derived[key]
+    except KeyError:
+        pass
+
+    geometry = maze.geometry
+    width, height = maze.width, maze.height
+    identifiers = maze._identifiers
+    x, y = room_pos
+    doors = maze._doors[x * height + y]
+    walls = []
+    for wall, start, end, dx, dy in geometry.walls(room_pos):
+        tx, ty = x + dx, y + dy
+        if tx < 0 or tx >= width or ty < 0 or ty >= height:
+            continue
+        if doors & (1 << wall):
+            target_pos = (tx, ty)
+            target = identifiers[tx * height + ty]
+        else:
+            target_pos = target = None
+        walls.append((target_pos, target, start, end))
+
+    result = (
+        identifiers[x * height + y],
+        geometry.center(room_pos),
+        tuple(walls))
+    if len(maze.derived) < ROOM_CACHE_SIZE:
+        maze.derived[key] = result
+    return result
+
+
+def move(maze, path):
+    """Moves the current room of a maze along a path.
+
+    Every room is validated with :func:`get_adjacent` before the current room
+    is moved to it. If a room is invalid, the current room is restored before
+    the error is raised.
+
+    If the current room is changed, the number of moves of the maze is
+    incremented once. All rooms in ``path`` are marked as visited, and
+    :meth:`mazeweb.plugins.Plugin.visit_room` is called for the rooms visited
+    for the first time.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param path: The :term:`room identifier` values of the rooms through which
+        to move, in order.
+
+    :return: the positions of the rooms in ``path``
+    :rtype: [(int, int)]
+
+    :raises bottle.HTTPResponse: if a room is not immediately reachable from the
+        previous one (``403``) or if an identifier is invalid (``404``)
+    """
+    current_room_index = maze.current_room_index
+    result = []
+    try:
+        for room_identifier in path:
+            room_pos = get_adjacent(maze, room_identifier)
+            maze.current_room_index = maze.index(room_pos)
+            result.append(room_pos)
+    except:
+        maze.current_room_index = current_room_index
+        raise
+    for room_pos in result:
+        if maze.visit(maze.index(room_pos)):
+            for plugin in maze.plugins.values():
+                plugin.visit_room(maze, room_pos)
+    if maze.current_room_index != current_room_index:
+        maze.moves = (maze.moves + 1) & 0xFFFFFFFF
+    return result
+
+
+def find_path(maze, room_identifier):
+    """Finds the shortest path from the current room to a visited room.
+
+    Only rooms that have been visited are considered. The distances from all
+    visited rooms to the target room are cached in :data:`PATHS` for the
+    current session, so the maze must not have been modified since it was
+    loaded.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param int room_identifier: The identifier of the target room.
+
+    :return: the positions of the rooms on the path, excluding the current room
+    :rtype: [(int, int)]
+
+    :raises bottle.HTTPResponse: if the target room has not been visited or is
+        not reachable through visited rooms (``403``) or if
+        ``room_identifier`` is invalid (``404``)
+    """
+    try:
+        target = maze.identifier_index(room_identifier)
+    except ValueError:
+        raise bottle.HTTPError(status = 404)
+    if not maze.is_visited(target):
+        raise bottle.HTTPError(status = 403)
+
+    key = (
+        bottle.request.environ.get('beaker.session').id,
+        maze.revision,
+        maze.visited_count,
+        target)
+    distances = PATHS.get(key)
+    if distances is None:
+        distances = _distances(maze, target)
+        PATHS[key] = distances
+
+    index = maze.current_room_index
+    if distances[index] == UNREACHABLE:
+        raise bottle.HTTPError(status = 403)
+    result = []
+    while index != target:
+        index = next(neighbor for neighbor in _neighbors(maze, index)
+            if distances[neighbor] == distances[index] - 1)
+        result.append(maze.position(index))
+    return result
+
+
+def _distances(maze, target):
+    """Calculates the distances from all visited rooms to a room through
+    visited rooms.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param int target: The index of the target room.
+
+    :return: the distance for every room index; the distance of rooms not
+        reachable through visited rooms is :data:`UNREACHABLE`. For lazily
+        generated mazes, this is a mapping containing only the reachable rooms.
+    :rtype: array.array or _SparseDistances
+    """
+    if maze.lazy:
+        result = _SparseDistances()
+    else:
+        result = array.array('I', (UNREACHABLE,)) * (maze.width * maze.height)
+    result[target] = 0
+    queue = collections.deque((target,))
+    while queue:
+        index = queue.popleft()
+        distance = result[index] + 1
+        for neighbor in _neighbors(maze, index):
+            if result[neighbor] == UNREACHABLE and maze.is_visited(neighbor):
+                result[neighbor] = distance
+                queue.append(neighbor)
     return result
 
 
+class _SparseDistances(dict):
+    """Distances for the rooms reachable through visited rooms, returned by
+    :func:`_distances` for lazily generated mazes.
+
+    The distance of rooms not in the mapping is :data:`UNREACHABLE`.
+    """
+    @property
+    def nbytes(self):
+        """The approximate number of bytes used"""
+        return 64 * len(self)
+
+    def __missing__(self, index):
+        return UNREACHABLE
+
+
+def _neighbors(maze, index):
+    """Yields the indices of the rooms immediately reachable from a room.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param int index: The index of the room.
+
+    :return: a generator of room indices
+    """
+    width, height = maze.width, maze.height
+    x, y = divmod(index, height)
+    doors = maze._doors[index]
+    for wall, start, end, dx, dy in maze.geometry.walls((x, y)):
+        tx, ty = x + dx, y + dy
+        if doors & (1 << wall) \
+                and tx >= 0 and tx < width and ty >= 0 and ty < height:
+            yield tx * height + ty
+
+
+def find_adjacent(maze, room_identifier):
+    """Finds an adjacent room.
+
+    This function does not distinguish between unreachable and invalid rooms,
+    and is thus cheaper than :func:`get_adjacent` for rooms that are not
+    adjacent.
+
+    :param maze.BaseMaze maze: The maze whose room coordinates to retrieve.
+
+    :param int room_identifier: The identifier of the adjacent room.
+
+    :return: the coordinates of the adjacent room, or ``None`` if the room is
+        not immediately reachable or does not exist
+    :rtype: (int, int) or None
+    """
+    current_room_pos = maze.current_room_pos
+    if room_identifier == maze.current_room:
+        return current_room_pos
+
+    # Only the rooms adjacent to the current room are checked; a lookup in
+    # maze.room_mapping is constant time for generated mazes, but scans all
+    # rooms once an identifier has been changed
+    x, y = current_room_pos
+    for wall, start, end, dx, dy in maze.geometry.walls(current_room_pos):
+        room_pos = (x + dx, y + dy)
+        if room_pos in maze and maze[room_pos].identifier == room_identifier:
+            return room_pos
+
+    return None
+
+
 def get_adjacent(maze, room_identifier):
     """Returns the coordinates of an adjacent room.
 
@@ -180,15 +792,10 @@ def get_adjacent(maze, room_identifier):
     :raises bottle.HTTPResponse: if the room is not immediately reachable
         (``403``) or if ``room_identifier`` is invalid (``404``)
     """
-    try:
-        room_pos = maze.room_mapping[room_identifier]
-    except KeyError:
-        raise bottle.HTTPError(status = 404)
-
-    # Check whether the rooms are connected
-    current_room_pos = maze.room_mapping[maze.current_room]
-    if room_pos == current_room_pos \
-            or maze.adjacent(room_pos, current_room_pos):
+    room_pos = find_adjacent(maze, room_identifier)
+    if not room_pos is None:
         return room_pos
-    else:
+    elif room_identifier in maze.room_mapping:
         raise bottle.HTTPError(status = 403)
+    else:
+        raise bottle.HTTPError(status = 404)
@@ -0,0 +1,148 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import threading
+
+
+class LRUCache(object):
+    """A bounded, thread-safe mapping that evicts the least recently used item
+    when full.
+
+    The cache keeps counters for hits, misses and evictions; see
+    :meth:`stats`.
+
+    :param int size: The maximum number of items in the cache.
+
+    :param int memory: The maximum total size of the items in the cache, as
+        reported by ``sizeof``. If this is ``None``, only the number of items
+        is limited.
+
+    :param sizeof: A function returning the size of a value. This is required
+        if ``memory`` is set.
+
+    :raises ValueError: if size is less than ``1``, or if memory is set without
+        sizeof
+    """
+    def __init__(self, size, memory = None, sizeof = None):
+        if size < 1:
+            raise ValueError('size is too small')
+        if not memory is None and sizeof is None:
+            raise ValueError('sizeof is required to limit memory')
+        self._size = size
+        self._memory = memory
+        self._sizeof = sizeof or (lambda value: 0)
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def size(self):
+        """The maximum number of items in the cache"""
+        return self._size
+
+    @property
+    def memory(self):
+        """The maximum total size of the items in the cache, or ``None``"""
+        return self._memory
+
+    def stats(self):
+        """Returns the counters and current usage of this cache.
+
+        :return: a dict with the keys ``size``, ``memory``, ``items``,
+            ``used``, ``hits``, ``misses`` and ``evictions``
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(
+                size = self._size,
+                memory = self._memory,
+                items = len(self._items),
+                used = self._used,
+                hits = self.hits,
+                misses = self.misses,
+                evictions = self.evictions)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value, size = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                raise
+            self._items[key] = (value, size)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            self._remove(key)
+            self._items[key] = (value, size)
+            self._used += size
+            while len(self._items) > self._size or (
+                    not self._memory is None and self._used > self._memory):
+                self._remove(next(iter(self._items)))
+                self.evictions += 1
+
+    def __delitem__(self, key):
+        with self._lock:
+            if not self._remove(key):
+                raise KeyError(key)
+
+    def _remove(self, key):
+        """Removes an item while holding the lock.
+
+        :param key: The key of the item to remove.
+
+        :return: whether the item existed
+        """
+        try:
+            value, size = self._items.pop(key)
+            self._used -= size
+            return True
+        except KeyError:
+            return False
+
+    def get(self, key, default = None):
+        """Returns the value for a key, or ``default`` if it is not cached.
+
+        :param key: The key to look up.
+
+        :param default: The value to return if ``key`` is not cached.
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        """Removes all items from the cache.
+        """
+        with self._lock:
+            self._items.clear()
+            self._used = 0
@@ -0,0 +1,157 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import threading
+
+
+class Counters(object):
+    """A thread-safe set of named counters.
+
+    :param names: The names of the counters. All counters start at ``0``.
+    """
+    def __init__(self, *names):
+        self._values = dict((name, 0) for name in names)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            return self._values[name]
+
+    def increment(self, name, value = 1):
+        """Increments a counter.
+
+        :param str name: The name of the counter.
+
+        :param int value: The value to add.
+
+        :raises KeyError: if ``name`` is not a counter
+        """
+        with self._lock:
+            self._values[name] += value
+
+    def stats(self):
+        """Returns the current values of all counters.
+
+        :return: a dict mapping counter names to values
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._values)
+
+
+class Histograms(object):
+    """A thread-safe set of named latency histograms.
+
+    Every histogram counts values in the buckets whose upper bounds, in
+    seconds, are given by :attr:`BOUNDS`; the last bucket has no upper bound.
+    Histograms are created when a value is first added.
+    """
+    #: The upper bounds of the buckets, in seconds
+    BOUNDS = (
+        0.0005, 0.001, 0.002, 0.005,
+        0.01, 0.02, 0.05,
+        0.1, 0.2, 0.5,
+        1.0, 2.0, 5.0)
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, value):
+        """Adds a value to a histogram.
+
+        :param str name: The name of the histogram.
+
+        :param float value: The value to add, in seconds.
+        """
+        index = bisect.bisect_left(self.BOUNDS, value)
+        with self._lock:
+            try:
+                buckets = self._values[name]
+            except KeyError:
+                buckets = self._values[name] = [0] * (len(self.BOUNDS) + 1)
+            buckets[index] += 1
+
+    def merge(self, stats):
+        """Adds the values of histograms returned by :meth:`stats`.
+
+        This allows histograms recorded in different processes to be combined.
+
+        :param dict stats: The histograms to add, as returned by :meth:`stats`.
+
+        :raises ValueError: if the number of buckets of a histogram is invalid
+        """
+        with self._lock:
+            for name, value in stats.items():
+                if len(value['buckets']) != len(self.BOUNDS) + 1:
+                    raise ValueError('invalid histogram for %s' % name)
+                try:
+                    buckets = self._values[name]
+                except KeyError:
+                    buckets = self._values[name] = [0] * (len(self.BOUNDS) + 1)
+                for i, count in enumerate(value['buckets']):
+                    buckets[i] += count
+
+    def percentile(self, name, p):
+        """Returns an upper bound for a percentile of a histogram.
+
+        :param str name: The name of the histogram.
+
+        :param float p: The percentile, between ``0`` and ``100``.
+
+        :return: the upper bound of the bucket containing the percentile, or
+            ``None`` if it lies in the last bucket or the histogram is empty
+        :rtype: float or None
+
+        :raises KeyError: if ``name`` is not a histogram
+        """
+        with self._lock:
+            buckets = list(self._values[name])
+        return self._percentile(buckets, p)
+
+    def stats(self):
+        """Returns the current values of all histograms.
+
+        :return: a dict mapping histogram names to dicts with the keys
+            ``count``, ``buckets``, a list of the counts of all buckets, and
+            ``p50``, ``p95`` and ``p99``; see :meth:`percentile`
+        :rtype: dict
+        """
+        with self._lock:
+            values = dict(
+                (name, list(buckets))
+                for name, buckets in self._values.items())
+        return dict(
+            (name, dict(
+                count = sum(buckets),
+                buckets = buckets,
+                p50 = self._percentile(buckets, 50),
+                p95 = self._percentile(buckets, 95),
+                p99 = self._percentile(buckets, 99)))
+            for name, buckets in values.items())
+
+    def _percentile(self, buckets, p):
+        """Returns an upper bound for a percentile of a list of buckets.
+        """
+        remaining = sum(buckets) * p / 100.0
+        if not remaining:
+            return None
+        for bound, count in zip(self.BOUNDS, buckets):
+            remaining -= count
+            if remaining <= 0:
+                return bound
+        return None
@@ -14,6 +14,10 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
+import json
+import os
+
+
 class DictWrapper(dict):
     """A wrapper for :class:`dict` in configurations.
 
@@ -109,3 +113,41 @@ def unwrap(v, default = None):
 
 
 ConfigurationStore = DictWrapper
+
+
+def load_configuration(name, required = False):
+    """Loads a configuration file.
+
+    The configuration is read from the directories in ``$MAZEWEB_CONFIG_DIR``
+    as ``$MAZEWEB_CONFIG_DIR_PART/<name>.json``. The first file found is used.
+    ``$MAZEWEB_CONFIG_DIR`` is split on :attr:`os.pathsep`.
+
+    If the environment variable ``$MAZEWEB_CONFIG_DIR`` is not set, the
+    current directory will be used as ``$config_dir``.
+
+    :param str name: The name of the configuration, without extension. This
+        may contain directory names, such as ``plugins/name``.
+
+    :param bool required: Whether a missing configuration is an error.
+
+    :return: the configuration, or an empty configuration if no file was found
+        and ``required`` is false
+    :rtype: ConfigurationStore
+
+    :raises ValueError: if a configuration file exists but cannot be parsed,
+        or if no file was found and ``required`` is true
+    """
+    configuration_dirs = os.getenv('MAZEWEB_CONFIG_DIR', '.').split(os.pathsep)
+
+    for configuration_dir in configuration_dirs:
+        filename = os.path.join(configuration_dir, name + '.json')
+        try:
+            with open(filename, 'r') as f:
+                return ConfigurationStore(json.load(f))
+        except IOError:
+            pass
+
+    if required:
+        raise ValueError('The configuration %s was not found in %s' % (
+            name, os.pathsep.join(configuration_dirs)))
+    return ConfigurationStore({})
@@ -0,0 +1,163 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""JSON encoding of responses.
+
+Room dicts that are cached by :func:`mazeweb.util.room_to_dict` are instances
+of :class:`CachedDict`, which keeps its own JSON representation. When a
+response is encoded with :func:`dumps`, every cached dict is replaced with a
+placeholder, the remaining structure is encoded and the cached representations
+are spliced into the result.
+
+If *orjson* is installed, it is used instead of :mod:`json`.
+"""
+
+import json
+import random
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    _string_types = basestring
+except NameError:
+    _string_types = str
+
+
+if not orjson is None:
+    def encode(value):
+        """Encodes a value as JSON.
+
+        :param value: The value to encode.
+
+        :rtype: str
+        """
+        return orjson.dumps(value, option = orjson.OPT_NON_STR_KEYS).decode(
+            'utf-8')
+
+else:
+    _encoder = json.JSONEncoder(separators = (',', ':'))
+
+    def encode(value):
+        """Encodes a value as JSON.
+
+        :param value: The value to encode.
+
+        :rtype: str
+        """
+        return _encoder.encode(value)
+
+
+class CachedDict(dict):
+    """A dict that caches its JSON representation.
+
+    The representation is created the first time it is required, so instances
+    must not be modified once they have been encoded.
+
+    The binary representation, created by :func:`mazeweb.util.wire.dump_room`,
+    is cached in :attr:`binary`.
+    """
+    __slots__ = (
+        '_json',
+        'binary')
+
+    def __init__(self, *args, **kwargs):
+        super(CachedDict, self).__init__(*args, **kwargs)
+        self._json = None
+        self.binary = None
+
+    @property
+    def json(self):
+        """The JSON representation of this dict"""
+        if self._json is None:
+            self._json = encode(self)
+        return self._json
+
+
+#: The prefix of placeholders for cached dicts; strings in the encoded value
+#: that start with this prefix are also replaced, so that they are not mistaken
+#: for placeholders
+_PLACEHOLDER = '@fragment-%016x-' % random.getrandbits(64)
+
+#: The regular expression matching encoded placeholders
+_PLACEHOLDER_RE = re.compile('"' + re.escape(_PLACEHOLDER) + '([0-9]+)"')
+
+
+def _replace(value, fragments):
+    """Replaces every :class:`CachedDict` in a value with a placeholder.
+
+    Containers are copied only if they contain cached dicts or strings that
+    look like placeholders.
+
+    :param value: The value.
+
+    :param list fragments: The list to which to append the JSON
+        representations of the replaced dicts.
+
+    :return: ``value`` if it contains no cached dicts, otherwise a copy
+    """
+    if isinstance(value, CachedDict):
+        fragments.append(value.json)
+        return _PLACEHOLDER + str(len(fragments) - 1)
+
+    elif isinstance(value, _string_types):
+        if value.startswith(_PLACEHOLDER):
+            fragments.append(encode(value))
+            return _PLACEHOLDER + str(len(fragments) - 1)
+        return value
+
+    elif isinstance(value, dict):
+        result = None
+        for key, item in value.items():
+            replaced = _replace(item, fragments)
+            if not replaced is item:
+                if result is None:
+                    result = dict(value)
+                result[key] = replaced
+        return value if result is None else result
+
+    elif isinstance(value, (list, tuple)):
+        result = None
+        for i, item in enumerate(value):
+            replaced = _replace(item, fragments)
+            if not replaced is item:
+                if result is None:
+                    result = list(value)
+                result[i] = replaced
+        return value if result is None else result
+
+    else:
+        return value
+
+
+def dumps(value):
+    """Encodes a value as JSON, splicing in the cached representations of all
+    :class:`CachedDict` instances.
+
+    :param value: The value to encode.
+
+    :rtype: str
+    """
+    fragments = []
+    value = _replace(value, fragments)
+    if not fragments:
+        return encode(value)
+    else:
+        return _PLACEHOLDER_RE.sub(
+            lambda m: fragments[int(m.group(1))],
+            encode(value))
@@ -0,0 +1,128 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""Export of the topology of whole mazes.
+
+A maze is exported as a header followed by one row of rooms at a time, so a
+maze of any size is exported without creating a description of all rooms.
+Every row contains the rooms with the same vertical position, and for every
+room its identifier and door mask, which has the bit ``1 << wall`` set for
+every wall with a door.
+
+With :func:`ndjson`, the header and every row are JSON objects on a line of
+their own::
+
+    {"walls": 4, "width": 30, "height": 20, "start_room": 1411380071,
+        "current_room": 1411380071}
+    {"y": 0, "identifiers": [1411380071, ...], "doors": [6, ...]}
+    ...
+
+With :func:`binary`, the header is :data:`mazeweb.util.wire.MAZE` followed by
+the identifier of the current room, and every row is ``width`` identifiers
+followed by ``width`` door masks, all little endian.
+"""
+
+import array
+import struct
+
+from . import encoding, wire
+
+
+#: The media type of exports created by :func:`ndjson`
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+#: The media type of exports created by :func:`binary`
+BINARY_MEDIA_TYPE = wire.MEDIA_TYPE
+
+#: The format of the current room following the header of binary exports
+CURRENT = struct.Struct('<I')
+
+
+def _rows(maze):
+    """Yields the identifiers and door masks of the rooms of a maze row by
+    row.
+
+    The rooms of lazy mazes are read one row of regions at a time, column by
+    column, so that every region is generated only once; see
+    :mod:`mazeweb.util.regions`.
+
+    :param mazeweb.util.state.MazeView maze: The maze to export.
+
+    :return: a generator of ``(y, identifiers, doors)``, where ``identifiers``
+        and ``doors`` are arrays
+    """
+    height = maze.height
+    identifiers = maze._identifiers
+    doors = maze._doors
+    if not maze.lazy:
+        for y in range(height):
+            yield (y, identifiers[y::height], doors[y::height])
+        return
+
+    # The last row of regions includes the remaining rows of rooms
+    size, rows = (doors.regions.size, doors.regions.rows) \
+        if not doors.regions is None else (height, 1)
+    for row in range(rows):
+        top = row * size
+        bottom = top + size if row < rows - 1 else height
+        columns = [(
+                identifiers[x * height + top:x * height + bottom],
+                doors[x * height + top:x * height + bottom])
+            for x in range(maze.width)]
+        for y in range(bottom - top):
+            yield (
+                top + y,
+                array.array(identifiers.typecode,
+                    (column[0][y] for column in columns)),
+                array.array(doors.typecode,
+                    (column[1][y] for column in columns)))
+
+
+def ndjson(maze):
+    """Exports a maze as newline delimited JSON.
+
+    :param mazeweb.util.state.MazeView maze: The maze to export.
+
+    :return: a generator of lines
+    """
+    yield encoding.encode(dict(
+        walls = len(maze.Wall.WALLS),
+        width = maze.width,
+        height = maze.height,
+        start_room = maze[(0, 0)].identifier,
+        current_room = maze.current_room)) + '\n'
+    for y, identifiers, doors in _rows(maze):
+        yield encoding.encode(dict(
+            y = y,
+            identifiers = identifiers.tolist(),
+            doors = doors.tolist())) + '\n'
+
+
+def binary(maze):
+    """Exports a maze in the binary format.
+
+    :param mazeweb.util.state.MazeView maze: The maze to export.
+
+    :return: a generator of byte strings
+    """
+    width = maze.width
+    row = struct.Struct('<%dI%dB' % (width, width))
+    yield wire.MAZE.pack(
+        len(maze.Wall.WALLS),
+        width,
+        maze.height,
+        maze[(0, 0)].identifier) + CURRENT.pack(maze.current_room)
+    for y, identifiers, doors in _rows(maze):
+        yield row.pack(*(identifiers.tolist() + doors.tolist()))
@@ -0,0 +1,304 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""Maze generation algorithms.
+
+An algorithm is a function called as ``initialize(maze, randomizer)``, the
+interface of :func:`maze.randomized_prim.initialize`. ``maze`` is a new
+:class:`mazeweb.util.state.MazeView` without doors, and ``randomizer`` is
+called with a maximum value and returns an integer between ``0`` and the
+non-inclusive maximum value. Given the same sequence of random values, an
+algorithm must always generate the same maze.
+
+All algorithms generate perfect mazes, where every room is reachable from every
+other room through exactly one path. As with *pymaze*, rooms that already have
+doors when the algorithm is called, such as rooms modified by
+:meth:`mazeweb.plugins.Plugin.pre_initialize`, are considered part of the maze
+and are never entered.
+
+Except for ``"pymaze"``, the algorithms work directly on the door bitmask of
+the maze and the room index, using the passages precomputed by
+:meth:`mazeweb.util.geometry.Geometry.passages`, and never create wall or room
+objects.
+"""
+
+import array
+
+from maze.randomized_prim import initialize as _pymaze
+
+from .numeric import TYPECODE
+
+
+#: The registered algorithms, keyed on name; see :func:`algorithm`
+ALGORITHMS = {}
+
+#: The codes identifying the registered algorithms in packed mazes, keyed on
+#: name
+CODES = {}
+
+#: The name of the algorithm used when none is specified
+DEFAULT = 'prim'
+
+
+def algorithm(code, name = None):
+    """Registers a function as a generation algorithm.
+
+    :param int code: The code identifying the algorithm in packed mazes. This
+        must never change, since it is used to regenerate stored mazes.
+
+    :param str name: The name of the algorithm. If this is not specified, the
+        name of the function is used.
+    """
+    def inner(f):
+        ALGORITHMS[name or f.__name__] = f
+        CODES[name or f.__name__] = code
+        return f
+
+    return inner
+
+
+def name(code):
+    """Returns the name of an algorithm from its code.
+
+    :param int code: The code of the algorithm.
+
+    :rtype: str
+
+    :raises ValueError: if no algorithm has the code
+    """
+    try:
+        return next(n for n, c in CODES.items() if c == code)
+    except StopIteration:
+        raise ValueError('invalid algorithm code: %d' % code)
+
+
+def _neighbors(maze, index):
+    """Returns the rooms adjacent to a room.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :param int index: The index of the room.
+
+    :return: a list of the tuple ``(wall, target, back)`` for every wall not on
+        the edge of the maze, where ``target`` is the index of the room behind
+        the wall and ``back`` the index of the wall on its other side
+    """
+    width, height = maze.width, maze.height
+    x, y = divmod(index, height)
+    return [
+        (wall, (x + dx) * height + y + dy, back)
+        for wall, dx, dy, back in maze.geometry.passages((x, y))
+        if 0 <= x + dx < width and 0 <= y + dy < height]
+
+
+def _carved(maze):
+    """Returns the rooms of a maze that already have doors.
+
+    :param mazeweb.util.state.MazeView maze: The maze.
+
+    :return: a copy of the door bitmask, which is non-zero for every room with
+        doors; this may be modified
+    :rtype: bytearray
+    """
+    return bytearray(maze._doors)
+
+
+algorithm(0, 'pymaze')(_pymaze)
+
+
+@algorithm(1)
+def prim(maze, randomizer):
+    """Randomised Prim's algorithm.
+
+    This generates the same kind of mazes as
+    :func:`maze.randomized_prim.initialize`, but the frontier is a flat list
+    of ``index << 3 | wall`` values, and walls are removed from it by swapping
+    with the last item instead of shifting the list.
+    """
+    width, height = maze.width, maze.height
+    doors = maze._doors
+    passages = maze.geometry.passages
+    added = _carved(maze)
+    frontier = []
+
+    def add(index):
+        added[index] = 1
+        x, y = divmod(index, height)
+        for wall, dx, dy, back in passages((x, y)):
+            tx, ty = x + dx, y + dy
+            if 0 <= tx < width and 0 <= ty < height \
+                    and not added[tx * height + ty]:
+                frontier.append(index << 3 | wall)
+
+    add(randomizer(width) * height + randomizer(height))
+    while frontier:
+        i = randomizer(len(frontier))
+        value = frontier[i]
+        frontier[i] = frontier[-1]
+        frontier.pop()
+
+        index, wall = value >> 3, value & 7
+        x, y = divmod(index, height)
+        wall, dx, dy, back = passages((x, y))[wall]
+        target = (x + dx) * height + y + dy
+        if not added[target]:
+            doors[index] |= 1 << wall
+            doors[target] |= 1 << back
+            add(target)
+
+
+@algorithm(2)
+def backtracker(maze, randomizer):
+    """The recursive backtracker.
+
+    This generates mazes with long, winding corridors and few dead ends. The
+    recursion is replaced by an explicit stack of room indices.
+    """
+    doors = maze._doors
+    visited = _carved(maze)
+
+    start = randomizer(maze.width) * maze.height + randomizer(maze.height)
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        index = stack[-1]
+        candidates = [
+            neighbor for neighbor in _neighbors(maze, index)
+            if not visited[neighbor[1]]]
+        if not candidates:
+            stack.pop()
+            continue
+
+        wall, target, back = candidates[randomizer(len(candidates))]
+        doors[index] |= 1 << wall
+        doors[target] |= 1 << back
+        visited[target] = 1
+        stack.append(target)
+
+
+@algorithm(3)
+def kruskal(maze, randomizer):
+    """Randomised Kruskal's algorithm.
+
+    All walls between rooms without doors are shuffled, and a door is added to
+    every wall separating rooms not yet connected. Connected rooms are tracked
+    with a union-find structure using path halving.
+    """
+    width, height = maze.width, maze.height
+    doors = maze._doors
+    passages = maze.geometry.passages
+    carved = _carved(maze)
+
+    # Every wall between two rooms is added once, from the room with the lower
+    # index, as index << 3 | wall
+    walls = array.array(TYPECODE, (
+        index << 3 | wall
+        for index in range(width * height)
+        if not carved[index]
+        for wall, target, back in _neighbors(maze, index)
+        if target > index and not carved[target]))
+    for i in range(len(walls) - 1, 0, -1):
+        j = randomizer(i + 1)
+        walls[i], walls[j] = walls[j], walls[i]
+
+    parents = array.array(TYPECODE, range(width * height))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    remaining = width * height - sum(1 for c in carved if c) - 1
+    for value in walls:
+        if not remaining:
+            break
+        index, wall = value >> 3, value & 7
+        x, y = divmod(index, height)
+        wall, dx, dy, back = passages((x, y))[wall]
+        target = (x + dx) * height + y + dy
+        root1, root2 = find(index), find(target)
+        if root1 != root2:
+            parents[root1] = root2
+            doors[index] |= 1 << wall
+            doors[target] |= 1 << back
+            remaining -= 1
+
+
+@algorithm(4)
+def wilson(maze, randomizer):
+    """Wilson's algorithm.
+
+    This generates a uniformly random spanning tree of the rooms using loop
+    erased random walks, and is thus unbiased, but considerably slower than
+    the other algorithms for large mazes. Walks start from every room not yet
+    in the maze, in index order.
+
+    Since walks never enter rooms that already have doors, only rooms
+    reachable from the first room added to the maze are walked from. This also
+    skips rooms without neighbours, such as those of triangular mazes one room
+    wide.
+    """
+    height = maze.height
+    count = maze.width * height
+    doors = maze._doors
+    passages = maze.geometry.passages
+    carved = _carved(maze)
+    added = bytearray(count)
+
+    # The wall through which a walk last left every room; since only the last
+    # exit is followed when the walk is added, loops are erased implicitly
+    exits = bytearray(count)
+
+    root = randomizer(maze.width) * height + randomizer(height)
+    carved[root] = 0
+    added[root] = 1
+
+    # A walk from a room separated from the root, by rooms with doors or by
+    # the shape of the maze, would never end, so such rooms are treated as if
+    # they had doors
+    reachable = bytearray(count)
+    reachable[root] = 1
+    queue = [root]
+    while queue:
+        for wall, target, back in _neighbors(maze, queue.pop()):
+            if not carved[target] and not reachable[target]:
+                reachable[target] = 1
+                queue.append(target)
+    for index in range(count):
+        if not reachable[index]:
+            carved[index] = 1
+
+    for start in range(count):
+        if carved[start]:
+            continue
+        index = start
+        while not added[index]:
+            neighbors = [
+                neighbor for neighbor in _neighbors(maze, index)
+                if not carved[neighbor[1]]]
+            wall, target, back = neighbors[randomizer(len(neighbors))]
+            exits[index] = wall
+            index = target
+
+        index = start
+        while not added[index]:
+            x, y = divmod(index, height)
+            wall, dx, dy, back = passages((x, y))[exits[index]]
+            target = (x + dx) * height + y + dy
+            doors[index] |= 1 << wall
+            doors[target] |= 1 << back
+            added[index] = 1
+            index = target
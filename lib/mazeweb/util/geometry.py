@@ -0,0 +1,140 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""Precomputed room geometry.
+
+The physical layout of a room depends only on the maze class and the position
+of the room, so it is computed once for every maze class and size and shared by
+all mazes.
+
+For all supported maze classes, the horizontal coordinate of the center of a
+room depends only on its horizontal position and the parity of its vertical
+position, and vice versa. The walls of a room, their spans and directions
+depend only on the parities of its coordinates.
+"""
+
+import array
+
+from .cache import LRUCache
+
+
+class Geometry(object):
+    """The physical layout of the rooms of a maze class and size.
+
+    :param maze_class: The maze class; this must be a subclass of
+        :class:`maze.BaseMaze`.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+    """
+    __slots__ = (
+        'width',
+        'height',
+        '_centers_x',
+        '_centers_y',
+        '_walls',
+        '_passages')
+
+    def __init__(self, maze_class, width, height):
+        self.width = width
+        self.height = height
+
+        sample = maze_class(2, 2)
+        self._centers_x = tuple(
+            array.array('d', (sample.get_center((x, parity))[0]
+                for x in range(width)))
+            for parity in (0, 1))
+        self._centers_y = tuple(
+            array.array('d', (sample.get_center((parity, y))[1]
+                for y in range(height)))
+            for parity in (0, 1))
+
+        Wall = maze_class.Wall
+        self._walls = tuple(
+            tuple(
+                (int(wall), wall.span[0], wall.span[1]) + tuple(wall.direction)
+                for wall in (Wall((x, y), w) for w in Wall.WALLS))
+            for x in (0, 1)
+            for y in (0, 1))
+        self._passages = tuple(
+            tuple(
+                (int(wall),) + tuple(wall.direction) + (int(wall.back),)
+                for wall in (Wall((x, y), w) for w in Wall.WALLS))
+            for x in (0, 1)
+            for y in (0, 1))
+
+    def center(self, room_pos):
+        """Returns the physical coordinates of the center of a room.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :return: the same value as :meth:`maze.BaseMaze.get_center`
+        :rtype: (float, float)
+        """
+        x, y = room_pos
+        return (self._centers_x[y & 1][x], self._centers_y[x & 1][y])
+
+    def walls(self, room_pos):
+        """Returns the walls of a room.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :return: a sequence of the tuple ``(wall, start, end, dx, dy)`` for
+            every wall of the room in the order of
+            :meth:`maze.BaseMaze.walls`, where ``wall`` is the wall index,
+            ``(start, end)`` its span and ``(dx, dy)`` its direction
+        """
+        return self._walls[(room_pos[0] & 1) << 1 | (room_pos[1] & 1)]
+
+    def passages(self, room_pos):
+        """Returns the passages through the walls of a room.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :return: a sequence of the tuple ``(wall, dx, dy, back)`` for every
+            wall of the room, indexed by wall index, where ``(dx, dy)`` is the
+            direction of the wall and ``back`` the index of the wall on its
+            other side
+        """
+        return self._passages[(room_pos[0] & 1) << 1 | (room_pos[1] & 1)]
+
+
+#: The geometries created by :func:`get`
+GEOMETRIES = LRUCache(64)
+
+
+def get(maze_class, width, height):
+    """Returns the shared geometry for a maze class and size.
+
+    :param maze_class: The maze class; this must be a subclass of
+        :class:`maze.BaseMaze`.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :rtype: Geometry
+    """
+    key = (len(maze_class.Wall.WALLS), width, height)
+    try:
+        return GEOMETRIES[key]
+    except KeyError:
+        result = Geometry(maze_class, width, height)
+        GEOMETRIES[key] = result
+        return result
@@ -14,6 +14,22 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
+import array
+import binascii
+import sys
+
+
+#: The feedback mask of the shift register used by :func:`randuniq`
+MASK = 0xD0000001
+
+#: The array type code of 32 bit values
+TYPECODE = next(t for t in ('I', 'L') if array.array(t).itemsize == 4)
+
+#: The number of values generated one at a time by :func:`randuniq_block`
+#: before the block is doubled; this must be a power of two
+BLOCK_SEED = 4096
+
+
 def randuniq(length, seed = 1):
     """Generates length unique, pseudo-random numbers.
 
@@ -40,7 +56,7 @@ def randuniq(length, seed = 1):
         elif length > 2**31:
             raise ValueError('length is too great')
 
-    mask = 0xD0000001
+    mask = MASK
     data = seed & (2**32 - 1)
 
     if not length is None:
@@ -57,3 +73,399 @@ def randuniq(length, seed = 1):
         data = (data >> 1) ^ (-(data & 1) & mask)
 
         yield data
+
+
+def randuniq_block(length, seed = 1):
+    """Generates the same numbers as :func:`randuniq`, but returns all of them
+    at once.
+
+    The first :data:`BLOCK_SEED` numbers are generated one at a time. The
+    sequence is then repeatedly doubled: since every step of the shift register
+    is linear, the number ``m`` steps after any number is the product of a
+    ``32x32`` bit matrix and that number, so the next ``m`` numbers are
+    computed from the previous ``m`` by table lookups on their bytes. This is
+    done with :meth:`bytes.translate` and XOR of long integers, so the work per
+    number is done in C.
+
+    :param int length: The number of numbers to generate.
+
+    :param int seed: A seed to use to initialise the pseudo-random generator.
+
+    :return: the numbers
+    :rtype: array.array
+
+    :raises ValueError: if seed is zero or less, length is negative, zero or
+        greater than ``2**31``
+    """
+    if seed <= 0:
+        raise ValueError('seed is invalid')
+    if length is None or length <= 0:
+        raise ValueError('length is too small')
+    elif length > 2**31:
+        raise ValueError('length is too great')
+
+    result = array.array(TYPECODE, randuniq(min(length, BLOCK_SEED), seed))
+    if sys.byteorder != 'little':
+        result.byteswap()
+    data = _tobytes(result)
+
+    # BLOCK_SEED is a power of two, so the number of values is always a power
+    # of two when doubling
+    count = len(result)
+    while count < length:
+        chunk = min(count, length - count)
+        data += _advance(_power(count.bit_length() - 1), data[:4 * chunk])
+        count += chunk
+
+    result = array.array(TYPECODE)
+    _frombytes(result, data)
+    if sys.byteorder != 'little':
+        result.byteswap()
+    return result
+
+
+def jump(seed, steps):
+    """Advances the state of the shift register used by :func:`randuniq` by a
+    number of steps.
+
+    Every step is a multiplication with a bit matrix, so advancing by ``steps``
+    steps is a multiplication with the matrices for the powers of two making up
+    ``steps``. This requires ``O(log steps)`` operations.
+
+    :param int seed: The state from which to advance.
+
+    :param int steps: The number of steps.
+
+    :return: the state after ``steps`` steps; this is also the value yielded by
+        the last step
+    :rtype: int
+
+    :raises ValueError: if seed is zero or less, or steps is negative
+    """
+    if seed <= 0:
+        raise ValueError('seed is invalid')
+    if steps < 0:
+        raise ValueError('steps is negative')
+
+    result = seed & (2**32 - 1)
+    exponent = 0
+    while steps:
+        if steps & 1:
+            result = _apply(_power(exponent), result)
+        steps >>= 1
+        exponent += 1
+    return result
+
+
+def randuniq_at(index, seed = 1):
+    """Returns a single number yielded by :func:`randuniq`.
+
+    This is ``jump(seed, index + 1)``; no earlier numbers are generated.
+
+    :param int index: The index of the number in the sequence.
+
+    :param int seed: A seed to use to initialise the pseudo-random generator.
+
+    :rtype: int
+
+    :raises ValueError: if seed is zero or less, or index is negative
+    """
+    if index < 0:
+        raise ValueError('index is negative')
+    return jump(seed, index + 1)
+
+
+class Permutation(object):
+    """A keyed permutation of 32 bit values.
+
+    This is a balanced Feistel network over the two 16 bit halves of a value.
+    The round function looks up the two bytes of the right half in substitution
+    tables filled from ``randuniq_block(..., key)``. Since a Feistel network is
+    a bijection for any round function, distinct values are always mapped to
+    distinct values, and every value can be mapped back with :meth:`inverse`.
+
+    Use :meth:`for_key` to reuse the tables of a key.
+
+    :param int key: The key; this must be greater than zero.
+
+    :raises ValueError: if key is zero or less
+    """
+    __slots__ = ('_sboxes', '_tables')
+
+    #: The number of rounds
+    ROUNDS = 4
+
+    #: The maximum number of permutations kept by :meth:`for_key`
+    CACHE_SIZE = 64
+
+    _cache = {}
+
+    def __init__(self, key):
+        values = randuniq_block(self.ROUNDS * 512, key)
+        self._sboxes = [
+            ([v & 0xFFFF for v in values[512 * r:512 * r + 256]],
+                [v & 0xFFFF for v in values[512 * r + 256:512 * r + 512]])
+            for r in range(self.ROUNDS)]
+
+        # The substitution tables split into byte translation tables
+        self._tables = [
+            tuple(
+                bytes(bytearray((v >> shift) & 0xFF for v in sbox))
+                for sbox in sboxes
+                for shift in (0, 8))
+            for sboxes in self._sboxes]
+
+    @classmethod
+    def for_key(self, key):
+        """Returns the permutation for a key.
+
+        Recently used permutations are cached.
+
+        :param int key: The key.
+
+        :rtype: Permutation
+        """
+        try:
+            return self._cache[key]
+        except KeyError:
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+            result = self._cache[key] = self(key)
+            return result
+
+    def __call__(self, value):
+        """Permutes a value.
+
+        :param int value: The value, which must be a 32 bit unsigned value.
+
+        :rtype: int
+        """
+        left, right = value >> 16, value & 0xFFFF
+        for low, high in self._sboxes:
+            left, right = right, left ^ low[right & 0xFF] ^ high[right >> 8]
+        return (left << 16) | right
+
+    def inverse(self, value):
+        """Returns the value permuted into ``value``.
+
+        :param int value: The permuted value, which must be a 32 bit unsigned
+            value.
+
+        :rtype: int
+        """
+        left, right = value >> 16, value & 0xFFFF
+        for low, high in reversed(self._sboxes):
+            left, right = right ^ low[left & 0xFF] ^ high[left >> 8], left
+        return (left << 16) | right
+
+    def block(self, length):
+        """Permutes the values ``0`` to ``length - 1``.
+
+        The values are permuted bytewise with :meth:`bytes.translate` and XOR
+        of long integers, so the work per value is done in C.
+
+        :param int length: The number of values.
+
+        :return: the permuted values
+        :rtype: array.array
+        """
+        if length <= 0:
+            return array.array(TYPECODE)
+
+        # The bytes of all values, as one string per byte position
+        unit = bytes(bytearray(range(256)))
+        planes = []
+        for i in range(4):
+            run = 256 ** i
+            pattern = b''.join(
+                unit[v:v + 1] * min(run, length)
+                for v in range(min(256, (length + run - 1) // run)))
+            planes.append((pattern * (
+                (length + len(pattern) - 1) // len(pattern)))[:length])
+
+        right, left = planes[0:2], planes[2:4]
+        for low_low, low_high, high_low, high_high in self._tables:
+            f_low = _toint(right[0].translate(low_low)) \
+                ^ _toint(right[1].translate(high_low))
+            f_high = _toint(right[0].translate(low_high)) \
+                ^ _toint(right[1].translate(high_high))
+            left, right = right, [
+                _fromint(_toint(left[0]) ^ f_low, length),
+                _fromint(_toint(left[1]) ^ f_high, length)]
+
+        data = bytearray(4 * length)
+        for i, plane in enumerate(right + left):
+            data[i::4] = plane
+        result = array.array(TYPECODE)
+        _frombytes(result, bytes(data))
+        if sys.byteorder != 'little':
+            result.byteswap()
+        return result
+
+
+def _apply(matrix, value):
+    """Multiplies a bit matrix with a value.
+
+    :param matrix: The matrix, as the images of the 32 unit vectors.
+    :type matrix: [int]
+
+    :param int value: The value.
+
+    :rtype: int
+    """
+    result = 0
+    bit = 0
+    while value:
+        if value & 1:
+            result ^= matrix[bit]
+        value >>= 1
+        bit += 1
+    return result
+
+
+def _compose(a, b):
+    """Returns the product of two bit matrices; the result applies ``b`` and
+    then ``a``.
+    """
+    return [_apply(a, column) for column in b]
+
+
+def _power(exponent):
+    """Returns the matrix advancing the shift register by ``2**exponent``
+    steps.
+
+    The matrices are computed by repeated squaring when first requested.
+
+    :param int exponent: The base two logarithm of the number of steps.
+
+    :return: a matrix; see :func:`_apply`
+    """
+    while len(_POWERS) <= exponent:
+        _POWERS.append(_compose(_POWERS[-1], _POWERS[-1]))
+    return _POWERS[exponent]
+
+
+def _advance(matrix, data):
+    """Multiplies a bit matrix with every value of a block.
+
+    :param matrix: The matrix; see :func:`_apply`.
+
+    :param bytes data: The values, as little endian 32 bit values.
+
+    :return: the products, as little endian 32 bit values
+    :rtype: bytes
+    """
+    count = len(data) // 4
+    planes = [data[i::4] for i in range(4)]
+
+    # The images of all values of every byte; the image of a byte is the
+    # image of the byte without its lowest bit XOR the image of that bit
+    images = []
+    for i in range(4):
+        image = [0] * 256
+        for b in range(1, 256):
+            low = b & -b
+            image[b] = image[b ^ low] ^ matrix[8 * i + low.bit_length() - 1]
+        images.append(image)
+
+    result = bytearray(len(data))
+    for o in range(4):
+        value = 0
+        for i in range(4):
+            # Byte o of the image of byte i of every value
+            table = bytes(bytearray((v >> (8 * o)) & 0xFF for v in images[i]))
+            value ^= _toint(planes[i].translate(table))
+        result[o::4] = _fromint(value, count)
+    return bytes(result)
+
+
+# _toint and _fromint are only used to XOR strings of equal length, so the
+# byte order is irrelevant; big endian avoids reversing the strings on Python 2
+if hasattr(int, 'from_bytes'):
+    def _toint(data):
+        return int.from_bytes(data, 'big')
+
+    def _fromint(value, length):
+        return value.to_bytes(length, 'big')
+
+    def _tobytes(a):
+        return a.tobytes()
+
+    def _frombytes(a, data):
+        a.frombytes(data)
+else:
+    def _toint(data):
+        return int(binascii.hexlify(data) or b'0', 16)
+
+    def _fromint(value, length):
+        return binascii.unhexlify('%0*x' % (2 * length, value))
+
+    def _tobytes(a):
+        return a.tostring()
+
+    def _frombytes(a, data):
+        a.fromstring(data)
+
+
+#: The matrix advancing the shift register by one step
+_STEP = [(1 << bit) >> 1 ^ (MASK if bit == 0 else 0) for bit in range(32)]
+
+#: The matrices advancing the shift register by powers of two steps; see
+#: :func:`_power`
+_POWERS = [_STEP]
+
+
+class LFSR(object):
+    """An infinite sequence of pseudo-random numbers with an accessible state.
+
+    Iterating over an instance yields the same values as ``randuniq(None,
+    seed)``, but unlike a generator, the current position in the sequence is
+    available as :attr:`state`. Passing a state as ``seed`` to a new instance
+    will resume the sequence.
+
+    :param int seed: A seed to use to initialise the pseudo-random generator.
+
+    :raises ValueError: if seed is zero or less
+    """
+    __slots__ = ('state',)
+
+    #: The feedback mask of the shift register
+    MASK = MASK
+
+    def __init__(self, seed = 1):
+        if seed <= 0:
+            raise ValueError('seed is invalid')
+        self.state = seed & (2**32 - 1)
+
+    def block(self, length):
+        """Returns the next numbers of the sequence at once.
+
+        See :func:`randuniq_block`.
+
+        :param int length: The number of numbers.
+
+        :rtype: array.array
+        """
+        result = randuniq_block(length, self.state)
+        self.state = result[-1]
+        return result
+
+    def jump(self, steps):
+        """Skips numbers of the sequence.
+
+        See :func:`jump`.
+
+        :param int steps: The number of numbers to skip.
+
+        :raises ValueError: if steps is negative
+        """
+        self.state = jump(self.state, steps)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        data = self.state
+        self.state = data = (data >> 1) ^ (-(data & 1) & self.MASK)
+        return data
+    next = __next__
@@ -0,0 +1,479 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""Lazily generated mazes.
+
+The rooms of a lazy maze are divided into square regions, and the doors of a
+region are generated only when one of its rooms is first accessed. Generated
+regions are kept in a bounded cache, and are regenerated from the seed when
+evicted, so the memory used does not depend on the size of the maze.
+
+When the maze is generated, a perfect maze with one room per region is
+generated with the chosen algorithm, and for every door of this coarse maze, a
+single door on the border between the two regions is selected. Every region is
+then generated as an independent perfect maze, so the whole maze is perfect.
+Every region draws its random numbers from its own part of the sequence of the
+seed, starting :data:`STRIDE` numbers after the previous region; see
+:func:`mazeweb.util.numeric.jump`.
+
+Room identifiers are computed from the room index by
+:func:`mazeweb.util.state.identifier_permutation`, and are never stored.
+
+The arrays of a :class:`mazeweb.util.state.MazeView` are replaced with
+:class:`LazyDoors` and :class:`LazyIdentifiers`, and the visited bitset with a
+set of room indices, so lazy mazes are used like any other maze. Rooms
+modified after the maze has been generated are kept in an overlay.
+"""
+
+import array
+
+from . import generate, geometry, state
+from .cache import LRUCache
+from .numeric import LFSR, TYPECODE
+
+#: The default width and height of regions
+REGION_SIZE = 64
+
+#: The default number of generated regions kept for every maze
+REGION_CACHE = 256
+
+#: The number of random numbers reserved for every region
+STRIDE = 1 << 16
+
+
+def create(walls, width, height, seed):
+    """Creates a new lazy maze view without doors.
+
+    The doors are generated by :meth:`LazyDoors.generate`; doors added before
+    that are kept, and their rooms are never entered by the generation
+    algorithm.
+
+    :param int walls: The number of walls. Valid values are 3, 4 and 6.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :param int seed: The seed of the maze, used to compute the identifiers.
+
+    :return: a new maze
+    :rtype: mazeweb.util.state.MazeView
+
+    :raises KeyError: if walls is invalid
+    """
+    maze = state.VIEW_CLASSES[walls](
+        width,
+        height,
+        LazyDoors(walls, width, height),
+        LazyIdentifiers(state.identifier_permutation(seed), width * height),
+        set())
+    maze.lazy = True
+    return maze
+
+
+class Regions(object):
+    """The doors of a maze, generated one region at a time.
+
+    Regions are ``size`` rooms wide and high, except for the last column and
+    row of regions, which include the remaining rooms. Since ``size`` is even,
+    every room of a region has the same walls as the room at the same position
+    in a separate maze of the size of the region.
+
+    :param int walls: The number of walls.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :param int seed: The seed of the maze.
+
+    :param str algorithm: The name of the generation algorithm in
+        :data:`mazeweb.util.generate.ALGORITHMS`.
+
+    :param dict carved: The door masks of rooms that had doors before the maze
+        was generated, keyed on room index. These rooms are never entered.
+
+    :param int size: The width and height of regions. This is rounded down to
+        an even number of at least ``2``.
+
+    :param int cache: The maximum number of generated regions to keep. At
+        least one row and one column of regions are kept, so that traversing
+        the maze row by row or column by column generates every region once.
+    """
+    def __init__(self, walls, width, height, seed, algorithm, carved = None,
+            size = REGION_SIZE, cache = REGION_CACHE):
+        self.maze_class = state.VIEW_CLASSES[walls]
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.algorithm = algorithm
+        self.carved = carved or {}
+        self.size = max(2, size & ~1)
+        self.columns = max(1, width // self.size)
+        self.rows = max(1, height // self.size)
+
+        # The tuple (wall, dx, dy, back) for every direction, keyed on the
+        # parity of the room position; see Geometry.passages
+        passages = geometry.get(self.maze_class, width, height).passages
+        self._directions = tuple(
+            dict(((dx, dy), (wall, back))
+                for wall, dx, dy, back in passages((x, y)))
+            for x in (0, 1)
+            for y in (0, 1))
+        self._cache = LRUCache(max(cache, self.columns, self.rows))
+
+        # The coarse maze has one room per region, and draws random numbers
+        # after those reserved for the regions
+        count = self.columns * self.rows
+        coarse = state.create(4, self.columns, self.rows)
+        random = LFSR(seed)
+        random.jump(count * STRIDE)
+        randomizer = lambda max: next(random) % max
+        generate.ALGORITHMS[algorithm](coarse, randomizer)
+
+        # The index plus one of the room on the right and upper border of every
+        # region with a door to the next region, or 0 for no door
+        self._right = array.array(TYPECODE, (0,)) * count
+        self._up = array.array(TYPECODE, (0,)) * count
+        for index in range(count):
+            doors = coarse._doors[index]
+            if doors & (1 << coarse.Wall.RIGHT):
+                self._right[index] = self._opening(index, 1, 0, randomizer)
+            if doors & (1 << coarse.Wall.UP):
+                self._up[index] = self._opening(index, 0, 1, randomizer)
+
+    def __getitem__(self, index):
+        """Returns the door mask of a room.
+
+        :param int index: The index of the room.
+
+        :rtype: int
+        """
+        x, y = divmod(index, self.height)
+        column = min(x // self.size, self.columns - 1)
+        row = min(y // self.size, self.rows - 1)
+        x0, x1, y0, y1 = self._bounds(column * self.rows + row)
+        return self.region(column * self.rows + row)[
+            (x - x0) * (y1 - y0) + y - y0]
+
+    @property
+    def nbytes(self):
+        """The approximate number of bytes used when the cache is full"""
+        return 2 * self._right.itemsize * len(self._right) \
+            + self._cache.size * (2 * self.size) ** 2
+
+    def stats(self):
+        """Returns the counters of the region cache.
+
+        See :meth:`mazeweb.util.cache.LRUCache.stats`.
+        """
+        return self._cache.stats()
+
+    def _bounds(self, region):
+        """Returns the bounds of a region.
+
+        :param int region: The index of the region.
+
+        :return: the tuple ``(x0, x1, y0, y1)``, where ``x1`` and ``y1`` are
+            not part of the region
+        """
+        column, row = divmod(region, self.rows)
+        return (
+            column * self.size,
+            self.width if column == self.columns - 1
+                else (column + 1) * self.size,
+            row * self.size,
+            self.height if row == self.rows - 1 else (row + 1) * self.size)
+
+    def _crossing(self, index, dx, dy):
+        """Returns the wall of a room in a direction.
+
+        :param int index: The index of the room.
+
+        :param int dx: The horizontal direction.
+
+        :param int dy: The vertical direction.
+
+        :return: the tuple ``(wall, target, back)``, or ``None`` if the room
+            has no such wall
+        """
+        x, y = divmod(index, self.height)
+        try:
+            wall, back = self._directions[(x & 1) << 1 | (y & 1)][(dx, dy)]
+        except KeyError:
+            return None
+        return (wall, (x + dx) * self.height + y + dy, back)
+
+    def _opening(self, region, dx, dy, randomizer):
+        """Selects the door between a region and the next region in a
+        direction.
+
+        Rooms that had doors before the maze was generated are selected only
+        if no other rooms are available.
+
+        :param int region: The index of the region.
+
+        :param int dx: The horizontal direction; this is ``1`` or ``0``.
+
+        :param int dy: The vertical direction; this is ``1`` or ``0``.
+
+        :param randomizer: The source of randomness.
+
+        :return: the index plus one of the room in ``region``, or ``0`` if no
+            room has a wall in the direction
+        """
+        x0, x1, y0, y1 = self._bounds(region)
+        if dx:
+            first, stride, count = (x1 - 1) * self.height + y0, 1, y1 - y0
+        else:
+            first, stride, count = x0 * self.height + y1 - 1, self.height, \
+                x1 - x0
+
+        # Since walls depend only on the parity of the room position, and
+        # regions start at even positions, every other room along the border
+        # has the same walls
+        offsets = [
+            offset for offset in (0, 1)
+            if offset < count
+            and not self._crossing(first + offset * stride, dx, dy) is None]
+        step = 2 if len(offsets) == 1 else 1
+        candidates = range(
+            first + offsets[0] * stride if offsets else first,
+            first + count * stride if offsets else first,
+            step * stride)
+        if self.carved:
+            candidates = [
+                index for index in candidates
+                if not index in self.carved
+                and not self._crossing(index, dx, dy)[1] in self.carved] \
+                or candidates
+        if not candidates:
+            return 0
+        return candidates[randomizer(len(candidates))] + 1
+
+    def region(self, region):
+        """Returns the doors of a region, generating it if it is not cached.
+
+        :param int region: The index of the region.
+
+        :return: the door masks of the rooms of the region, indexed as in a
+            maze of the size of the region; this must not be modified
+        :rtype: array.array
+        """
+        try:
+            return self._cache[region]
+        except KeyError:
+            pass
+
+        x0, x1, y0, y1 = self._bounds(region)
+        height = self.height
+        maze = self.maze_class(x1 - x0, y1 - y0)
+        for index, doors in self.carved.items():
+            x, y = divmod(index, height)
+            if x0 <= x < x1 and y0 <= y < y1:
+                maze._doors[(x - x0) * (y1 - y0) + y - y0] = doors
+
+        random = LFSR(self.seed)
+        random.jump(region * STRIDE)
+        generate.ALGORITHMS[self.algorithm](maze,
+            lambda max: next(random) % max)
+        doors = maze._doors
+
+        def add_door(index, dx, dy, backwards):
+            wall, target, back = self._crossing(index, dx, dy)
+            if backwards:
+                index, wall = target, back
+            x, y = divmod(index, height)
+            doors[(x - x0) * (y1 - y0) + y - y0] |= 1 << wall
+
+        column, row = divmod(region, self.rows)
+        if self._right[region]:
+            add_door(self._right[region] - 1, 1, 0, False)
+        if self._up[region]:
+            add_door(self._up[region] - 1, 0, 1, False)
+        if column > 0 and self._right[region - self.rows]:
+            add_door(self._right[region - self.rows] - 1, 1, 0, True)
+        if row > 0 and self._up[region - 1]:
+            add_door(self._up[region - 1] - 1, 0, 1, True)
+
+        self._cache[region] = doors
+        return doors
+
+
+class _LazyArray(object):
+    """The parts of the :class:`array.array` interface used by
+    :class:`mazeweb.util.state.MazeView`, for values computed on demand.
+
+    Values that are set are kept in an overlay. Subclasses implement
+    :meth:`_compute`.
+
+    :param int count: The number of values.
+    """
+    def __init__(self, count):
+        self._count = count
+        self._overlay = {}
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    @property
+    def overlay(self):
+        """The values that have been set, keyed on index; this must not be
+        modified"""
+        return self._overlay
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return array.array(self.typecode, (
+                self[i] for i in range(*index.indices(self._count))))
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError(index)
+        try:
+            return self._overlay[index]
+        except KeyError:
+            return self._compute(index)
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError(index)
+        self._overlay[index] = value
+
+    def __copy__(self):
+        result = object.__new__(type(self))
+        result.__dict__.update(self.__dict__)
+        result._overlay = dict(self._overlay)
+        return result
+
+    def _compute(self, index):
+        """Computes a value not in the overlay.
+
+        :param int index: The index of the value.
+        """
+        raise NotImplementedError()
+
+
+class LazyDoors(_LazyArray):
+    """The door masks of a lazy maze.
+
+    Until :meth:`generate` is called, no room has any doors.
+
+    :param int walls: The number of walls.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+    """
+    typecode = 'B'
+    itemsize = 1
+
+    def __init__(self, walls, width, height):
+        super(LazyDoors, self).__init__(width * height)
+        self._walls = walls
+        self._width = width
+        self._height = height
+        self.regions = None
+
+    @property
+    def nbytes(self):
+        """The approximate number of bytes used"""
+        return 64 * len(self._overlay) \
+            + (self.regions.nbytes if not self.regions is None else 0)
+
+    def generate(self, seed, algorithm, size = REGION_SIZE,
+            cache = REGION_CACHE):
+        """Generates the doors.
+
+        Rooms with doors are passed to :class:`Regions` as ``carved``.
+
+        :param int seed: The seed of the maze.
+
+        :param str algorithm: The name of the generation algorithm.
+
+        :param int size: The width and height of regions.
+
+        :param int cache: The maximum number of generated regions to keep.
+        """
+        self.regions = Regions(self._walls, self._width, self._height, seed,
+            algorithm, self._overlay, size, cache)
+        self._overlay = {}
+
+    def _compute(self, index):
+        return self.regions[index] if not self.regions is None else 0
+
+
+class LazyIdentifiers(_LazyArray):
+    """The identifiers of a lazy maze.
+
+    :param mazeweb.util.numeric.Permutation permutation: The permutation
+        mapping room indices to identifiers.
+
+    :param int count: The number of rooms.
+    """
+    typecode = state.ID_TYPECODE
+    itemsize = 4
+
+    def __init__(self, permutation, count):
+        super(LazyIdentifiers, self).__init__(count)
+        self._permutation = permutation
+        self._indices = {}
+
+    @property
+    def nbytes(self):
+        """The approximate number of bytes used"""
+        return 128 * len(self._overlay)
+
+    def __setitem__(self, index, value):
+        super(LazyIdentifiers, self).__setitem__(index, value)
+        self._indices[value] = index % self._count
+
+    def __copy__(self):
+        result = super(LazyIdentifiers, self).__copy__()
+        result._indices = dict(self._indices)
+        return result
+
+    def index(self, value):
+        """Returns the lowest index of a value.
+
+        :param int value: The value.
+
+        :rtype: int
+
+        :raises ValueError: if no room has the identifier
+        """
+        if isinstance(value, bool) \
+                or not isinstance(value, state._integer_types) \
+                or value < 0 or value > 0xFFFFFFFF:
+            raise ValueError(value)
+        result = []
+        index = self._indices.get(value)
+        if not index is None and self._overlay.get(index) == value:
+            result.append(index)
+        index = self._permutation.inverse(value)
+        if index < self._count and not index in self._overlay:
+            result.append(index)
+        if not result:
+            raise ValueError(value)
+        return min(result)
+
+    def _compute(self, index):
+        return self._permutation(index)
@@ -0,0 +1,1158 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""Compact maze state.
+
+A maze is kept as a small header and two flat arrays: one byte per room with a
+bit set for every wall that has a door, and one 32 bit identifier per room.
+Rooms are indexed in the order of :attr:`maze.BaseMaze.room_positions`, thus
+the room at ``(x, y)`` has the index ``x * height + y``.
+
+The packed format is::
+
+    header | doors | identifiers | visited | overlay | plugins
+
+where ``header`` is :data:`HEADER`, ``doors`` and ``identifiers`` are the
+little endian array data, ``visited`` is a bitset with the bit ``1 << (index %
+8)`` of byte ``index // 8`` set for every visited room and ``plugins`` is the
+pickled list of plugin name and plugin pairs, sorted on name.
+
+A maze that has not been modified since it was generated may be packed as
+:data:`KIND_SEEDED`, in which case ``doors`` and ``identifiers`` are omitted and
+regenerated from the seed and the generation algorithm when unpacked.
+
+Lazily generated mazes, see :mod:`mazeweb.util.regions`, are always packed as
+:data:`KIND_SEEDED` with :data:`FLAG_LAZY` set, so that the size of the record
+does not depend on the size of the maze. For these records, ``visited`` is the
+little endian 32 bit indices of the visited rooms, and ``overlay`` is::
+
+    overlay := values values
+
+    values := COUNT index* value*
+
+where ``COUNT`` is :data:`OVERLAY_COUNT`, followed by the 32 bit indices and
+the values of the rooms modified since the maze was generated; first the door
+masks and then the identifiers. Other records have no ``overlay``.
+
+Generated mazes assign identifiers with :func:`identifier_permutation`, a
+permutation of the room index keyed by the seed. As long as no identifier has
+been changed, :data:`FLAG_PERMUTED` is set in the header, and rooms are found
+from their identifiers without scanning the identifier array.
+"""
+
+import array
+import copy
+import pickle
+import struct
+import sys
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from maze.quad import Maze
+from maze.tri import TriMaze
+from maze.hex import HexMaze
+
+from . import generate, geometry
+from .numeric import LFSR, Permutation
+
+try:
+    _integer_types = (int, long)
+except NameError:
+    _integer_types = (int,)
+
+
+#: The magic bytes that start every packed maze
+MAGIC = b'MZ'
+
+#: The version of the packed format
+VERSION = 11
+
+#: The header of a packed maze; the fields are the magic bytes, the format
+#: version, the kind of record, the number of walls, the width, the height, the
+#: seed, the state of the random number generator, the index of the current
+#: room, the number of moves, the number of visited rooms, the length of the
+#: pickled plugins, the revision, the flags and the code of the generation
+#: algorithm; see :data:`mazeweb.util.generate.CODES`
+HEADER = struct.Struct('<2sBBBIIIIIIIIIBB')
+
+#: The offset of the index of the current room in a packed maze
+CURRENT_OFFSET = struct.calcsize('<2sBBBIIII')
+
+#: The format of the index of the current room and the number of moves in a
+#: packed maze
+CURRENT = struct.Struct('<II')
+
+#: The offset of the number of visited rooms in a packed maze
+VISITED_COUNT_OFFSET = struct.calcsize('<2sBBBIIIIII')
+
+#: The format of the number of visited rooms in a packed maze
+VISITED_COUNT = struct.Struct('<I')
+
+#: The offset of the flags in a packed maze
+FLAGS_OFFSET = struct.calcsize('<2sBBBIIIIIIIII')
+
+#: The format of the flags in a packed maze
+FLAGS = struct.Struct('<B')
+
+#: The offset of the kind of record in a packed maze
+KIND_OFFSET = struct.calcsize('<2sB')
+
+#: The format of the kind of record, the number of walls, the width and the
+#: height in a packed maze
+KIND = struct.Struct('<BBII')
+
+#: The offset of the revision in a packed maze
+REVISION_OFFSET = struct.calcsize('<2sBBBIIIIIIII')
+
+#: The format of the revision in a packed maze
+REVISION = struct.Struct('<I')
+
+#: The format of the number of values in the overlay of a packed lazy maze
+OVERLAY_COUNT = struct.Struct('<I')
+
+#: A packed maze containing the doors and identifiers of all rooms
+KIND_FULL = 0
+
+#: A packed maze containing only the parameters required to regenerate it
+KIND_SEEDED = 1
+
+#: The flag set in the header of a packed maze whose identifiers are those
+#: assigned by :func:`identifier_permutation`; see :attr:`MazeView.permuted`
+FLAG_PERMUTED = 1 << 0
+
+#: The flag set in the header of a packed maze that is lazily generated; see
+#: :attr:`MazeView.lazy`. The visited rooms of such mazes are stored as a list
+#: of room indices, and the rooms modified since they were generated as an
+#: overlay
+FLAG_LAZY = 1 << 1
+
+#: The current room of the maze has changed; see :attr:`MazeView.modified`
+MODIFIED_CURRENT = 1 << 0
+
+#: The doors or identifiers of the maze have changed
+MODIFIED_ROOMS = 1 << 1
+
+#: The plugins of the maze have changed
+MODIFIED_PLUGINS = 1 << 2
+
+#: The state of the random number generator of the maze has changed
+MODIFIED_RANDOM = 1 << 3
+
+#: The flag set in :attr:`MazeView.modified` when a room has been visited for
+#: the first time
+MODIFIED_VISITED = 1 << 4
+
+#: All parts of the maze have changed; this is the state of new mazes
+MODIFIED_ALL = MODIFIED_CURRENT | MODIFIED_ROOMS | MODIFIED_PLUGINS \
+    | MODIFIED_RANDOM | MODIFIED_VISITED
+
+#: The array type code used for room identifiers; identifiers are 32 bit values
+ID_TYPECODE = next(t for t in ('I', 'L') if array.array(t).itemsize == 4)
+
+
+def _array(typecode, data = b''):
+    """Creates an array from its machine representation.
+
+    :param str typecode: The array type code.
+
+    :param data: The little endian array data.
+
+    :return: a new array
+    :rtype: array.array
+    """
+    result = array.array(typecode)
+    if hasattr(result, 'frombytes'):
+        result.frombytes(data)
+    else:
+        result.fromstring(bytes(data))
+    if sys.byteorder == 'big':
+        result.byteswap()
+    return result
+
+
+def _dump_plugins(plugins):
+    """Pickles a plugin dict.
+
+    The items are sorted, so that equal dicts are pickled to equal bytes.
+
+    :param dict plugins: The plugins.
+
+    :rtype: bytes
+    """
+    return pickle.dumps(sorted(plugins.items()), pickle.HIGHEST_PROTOCOL)
+
+
+def _load_plugins(data):
+    """Unpickles a plugin dict pickled with :func:`_dump_plugins`.
+
+    :param bytes data: The pickled plugins.
+
+    :rtype: dict
+    """
+    return dict(pickle.loads(data))
+
+
+def _bytes(a):
+    """Returns the little endian machine representation of an array.
+
+    :param a: The array to convert. Other sequences with the attribute
+        ``typecode``, such as the arrays of lazy mazes, are converted to arrays
+        first.
+
+    :rtype: bytes
+    """
+    if not isinstance(a, array.array):
+        a = array.array(a.typecode, a)
+    elif sys.byteorder == 'big':
+        a = array.array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes() if hasattr(a, 'tobytes') else a.tostring()
+
+
+def _nbytes(a):
+    """Returns the approximate number of bytes used by an array.
+
+    :param a: The array, or a sequence with the attribute ``nbytes``, such as
+        the arrays of lazy mazes.
+
+    :rtype: int
+    """
+    try:
+        return a.nbytes
+    except AttributeError:
+        return a.itemsize * len(a)
+
+
+class RoomView(object):
+    """A room of a :class:`MazeView`.
+
+    This class implements the interface of :class:`maze.Room` on top of the
+    door bitmask of the maze, and adds the property :attr:`identifier`.
+    """
+    __slots__ = (
+        '_maze',
+        '_index')
+
+    def __init__(self, maze, index):
+        self._maze = maze
+        self._index = index
+
+    def __bool__(self):
+        return bool(self._maze._doors[self._index])
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        return other.doors == self.doors
+
+    def __contains__(self, wall_index):
+        return self.has_door(wall_index)
+
+    def __getitem__(self, wall_index):
+        return self.has_door(wall_index)
+
+    def __setitem__(self, wall_index, has_door):
+        self.set_door(wall_index, has_door)
+
+    def __iadd__(self, wall_index):
+        self.add_door(wall_index)
+        return self
+
+    def __isub__(self, wall_index):
+        self.remove_door(wall_index)
+        return self
+
+    @property
+    def doors(self):
+        """The set of wall indices with doors"""
+        mask = self._maze._doors[self._index]
+        return set(w for w in self._maze.Wall.WALLS if mask & (1 << w))
+
+    @property
+    def identifier(self):
+        """The identifier of this room"""
+        return self._maze._identifiers[self._index]
+
+    @identifier.setter
+    def identifier(self, value):
+        maze = self._maze
+        maze._modify()
+        maze.permuted = False
+        maze._identifiers[self._index] = value
+
+    def has_door(self, wall_index):
+        return bool(self._maze._doors[self._index] & (1 << int(wall_index)))
+
+    def add_door(self, wall_index):
+        maze = self._maze
+        maze._modify()
+        maze._doors[self._index] |= 1 << int(wall_index)
+
+    def remove_door(self, wall_index):
+        maze = self._maze
+        maze._modify()
+        maze._doors[self._index] &= ~(1 << int(wall_index)) & 0xFF
+
+    def set_door(self, wall_index, has_door):
+        if has_door:
+            self.add_door(wall_index)
+        else:
+            self.remove_door(wall_index)
+
+
+class RoomMapping(Mapping):
+    """A read-only mapping from room identifier to room position for a
+    :class:`MazeView`.
+
+    Lookups use :meth:`MazeView.identifier_index`, so they scan the identifier
+    array only if the identifiers are not those assigned when the maze was
+    generated.
+    """
+    def __init__(self, maze):
+        self._maze = maze
+
+    def __getitem__(self, identifier):
+        try:
+            return self._maze.position(self._maze.identifier_index(
+                identifier))
+        except ValueError:
+            raise KeyError(identifier)
+
+    def __contains__(self, identifier):
+        try:
+            self._maze.identifier_index(identifier)
+            return True
+        except ValueError:
+            return False
+
+    def __iter__(self):
+        return iter(self._maze._identifiers)
+
+    def __len__(self):
+        return len(self._maze._identifiers)
+
+
+class MazeView(object):
+    """A maze backed by flat arrays.
+
+    This class is mixed in with the *pymaze* maze classes; use :func:`create`
+    and :func:`unpack` to create instances.
+
+    In addition to the maze interface, instances have the attributes
+    ``plugins``, ``seed``, ``algorithm``, ``random``, ``revision``, ``seeded``
+    and ``moves`` and the properties :attr:`current_room`,
+    :attr:`current_room_pos` and :attr:`room_mapping`. ``algorithm`` is the
+    name of the algorithm in :data:`mazeweb.util.generate.ALGORITHMS` used to
+    generate the maze. ``seeded`` is true as long as the doors and identifiers
+    are those generated from ``seed`` and ``algorithm``. ``moves`` is the
+    number of requests that have moved the current room; it is stored along
+    with the current room.
+
+    ``permuted`` is true as long as the identifiers are those assigned by
+    :func:`identifier_permutation` for ``seed``. Rooms are then found from
+    their identifiers without scanning the identifier array; see
+    :meth:`identifier_index`.
+
+    ``lazy`` is true for mazes created by :func:`mazeweb.util.regions.create`,
+    whose backing arrays are generated on demand.
+
+    The rooms that have been visited are recorded in a bitset of one bit per
+    room, passed as ``visited``, or for lazy mazes in a set of room indices;
+    see :meth:`visit` and :meth:`is_visited`. The number of visited rooms,
+    ``visited_count``, is maintained along with them. The indices
+    of the rooms visited for the first time since the view was unpacked are
+    listed in :attr:`visits`.
+
+    The backing arrays may be shared with other views; they are then copied
+    before the first modification. See :meth:`share`.
+
+    Views created by :func:`unpack` track the changes made to them; see
+    :attr:`modified`.
+
+    Values computed from the backing arrays may be cached in the dict
+    ``derived``, and the wire representations of rooms in the dict
+    ``room_dicts``. Both are replaced with empty dicts when the rooms are
+    modified. Since views restored from a :class:`Snapshot` share them, items
+    may be added to them but never changed.
+    """
+    def __init__(self, width, height, doors = None, identifiers = None,
+            visited = None):
+        self.width = width
+        self.height = height
+        self._doors = doors if not doors is None \
+            else array.array('B', bytes(bytearray(width * height)))
+        self._identifiers = identifiers if not identifiers is None \
+            else array.array(ID_TYPECODE, (0,)) * (width * height)
+        self._current = 0
+        self._visited = visited if not visited is None \
+            else bytearray((width * height + 7) // 8)
+        self._visits = []
+        self.visited_count = 0
+        self._shared = False
+        self._modified = MODIFIED_ALL
+        self._pristine = None
+        self.plugins = {}
+        self.seed = None
+        self.algorithm = None
+        self.random = None
+        self.revision = 0
+        self.seeded = False
+        self.permuted = False
+        self.lazy = False
+        self.moves = 0
+        self.derived = {}
+        self.room_dicts = {}
+        self._geometry = None
+
+    def __getitem__(self, room_pos):
+        if isinstance(room_pos, tuple) and len(room_pos) == 2:
+            if not room_pos in self:
+                raise IndexError(room_pos)
+            return RoomView(self, self.index(room_pos))
+
+        return super(MazeView, self).__getitem__(room_pos)
+
+    def share(self):
+        """Marks the backing arrays as shared.
+
+        Shared arrays are never modified; they are copied before the first
+        modification of the maze.
+
+        :return: the tuple ``(doors, identifiers)``
+        """
+        self._shared = True
+        return (self._doors, self._identifiers)
+
+    @property
+    def shared(self):
+        """Whether the backing arrays are shared, and thus unmodified since
+        :meth:`share` was called"""
+        return self._shared
+
+    def _unshare(self):
+        """Replaces the shared backing arrays with private copies.
+        """
+        self._doors = copy.copy(self._doors)
+        self._identifiers = copy.copy(self._identifiers)
+        self._shared = False
+
+    def _modify(self):
+        """Prepares the backing arrays for modification.
+        """
+        if self._shared:
+            self._unshare()
+        self.seeded = False
+        if self.derived:
+            self.derived = {}
+        if self.room_dicts:
+            self.room_dicts = {}
+        self._modified |= MODIFIED_ROOMS
+
+    @property
+    def modified(self):
+        """The parts of this maze modified since it was unpacked, as a
+        combination of the ``MODIFIED_*`` flags.
+
+        Changes to the plugins and the random number generator are detected by
+        comparing them with their unpacked state, so this property is not free.
+        """
+        if self._pristine is None:
+            return MODIFIED_ALL
+        random, plugins = self._pristine
+        modified = self._modified
+        if self.random.state != random:
+            modified |= MODIFIED_RANDOM
+        if _dump_plugins(self.plugins) != plugins:
+            modified |= MODIFIED_PLUGINS
+        return modified
+
+    def index(self, room_pos):
+        """Returns the index of a room in the backing arrays.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :rtype: int
+        """
+        return room_pos[0] * self.height + room_pos[1]
+
+    def position(self, index):
+        """Returns the position of a room from its index in the backing arrays.
+
+        :param int index: The room index.
+
+        :rtype: (int, int)
+        """
+        return divmod(index, self.height)
+
+    def identifier_index(self, identifier):
+        """Returns the index of a room in the backing arrays from its
+        identifier.
+
+        If :attr:`permuted` is true, the index is computed with the inverse of
+        :func:`identifier_permutation`; otherwise the identifier array is
+        scanned.
+
+        :param int identifier: The room identifier.
+
+        :rtype: int
+
+        :raises ValueError: if no room has the identifier
+        """
+        if self.permuted:
+            if isinstance(identifier, bool) \
+                    or not isinstance(identifier, _integer_types) \
+                    or identifier < 0 or identifier > 0xFFFFFFFF:
+                raise ValueError(identifier)
+            index = identifier_permutation(self.seed).inverse(identifier)
+            if index < len(self._identifiers) \
+                    and self._identifiers[index] == identifier:
+                return index
+            raise ValueError(identifier)
+
+        try:
+            return self._identifiers.index(identifier)
+        except (OverflowError, TypeError):
+            raise ValueError(identifier)
+
+    @property
+    def current_room(self):
+        """The identifier of the current room"""
+        return self._identifiers[self._current]
+
+    @current_room.setter
+    def current_room(self, value):
+        index = self.identifier_index(value)
+        if index != self._current:
+            self._current = index
+            self._modified |= MODIFIED_CURRENT
+
+    @property
+    def current_room_index(self):
+        """The index of the current room in the backing arrays"""
+        return self._current
+
+    @current_room_index.setter
+    def current_room_index(self, value):
+        if value != self._current:
+            self._current = value
+            self._modified |= MODIFIED_CURRENT
+
+    def visit(self, index):
+        """Marks a room as visited.
+
+        :param int index: The index of the room.
+
+        :return: whether the room was visited for the first time
+        :rtype: bool
+        """
+        visited = self._visited
+        if isinstance(visited, set):
+            if index in visited:
+                return False
+            visited.add(index)
+        else:
+            byte, bit = index >> 3, 1 << (index & 7)
+            if visited[byte] & bit:
+                return False
+            visited[byte] |= bit
+        self._visits.append(index)
+        self.visited_count += 1
+        self._modified |= MODIFIED_VISITED
+        return True
+
+    def is_visited(self, index):
+        """Returns whether a room has been visited.
+
+        :param int index: The index of the room.
+
+        :rtype: bool
+        """
+        visited = self._visited
+        if isinstance(visited, set):
+            return index in visited
+        return bool(visited[index >> 3] & (1 << (index & 7)))
+
+    @property
+    def visits(self):
+        """The indices of the rooms visited for the first time since this maze
+        was unpacked, in order"""
+        return self._visits
+
+    @property
+    def current_room_pos(self):
+        """The position of the current room"""
+        return self.position(self._current)
+
+    @property
+    def geometry(self):
+        """The precomputed room geometry shared by all mazes of this class and
+        size; see :mod:`mazeweb.util.geometry`"""
+        if self._geometry is None:
+            self._geometry = geometry.get(type(self), self.width, self.height)
+        return self._geometry
+
+    @property
+    def room_mapping(self):
+        """A mapping from room identifier to room position"""
+        return RoomMapping(self)
+
+
+def identifier_permutation(seed):
+    """Returns the permutation used to assign room identifiers to the rooms of
+    mazes generated from a seed.
+
+    The identifier of the room at index ``i`` is ``permutation(i)``, so all
+    identifiers are distinct, and the index of a room is
+    ``permutation.inverse(identifier)``.
+
+    :param int seed: The seed of the maze.
+
+    :rtype: mazeweb.util.numeric.Permutation
+    """
+    return Permutation.for_key((seed & 0xFFFFFFFF) or 1)
+
+
+#: The view classes for the supported maze classes, keyed on the number of walls
+VIEW_CLASSES = dict(
+    (len(mc.Wall.WALLS), type(mc.__name__ + 'View', (MazeView, mc), {}))
+    for mc in (
+        TriMaze,
+        Maze,
+        HexMaze))
+
+
+def create(walls, width, height):
+    """Creates a new maze view without doors.
+
+    :param int walls: The number of walls. Valid values are 3, 4 and 6.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :return: a new maze
+    :rtype: MazeView
+
+    :raises KeyError: if walls is invalid
+    """
+    return VIEW_CLASSES[walls](width, height)
+
+
+def pack(maze, seeded = False):
+    """Packs a maze view to its compact representation.
+
+    :param MazeView maze: The maze to pack.
+
+    :param bool seeded: Whether to omit the doors and identifiers if the maze
+        is unmodified since it was generated, as indicated by
+        :attr:`MazeView.seeded`. A maze packed this way must be unpacked with a
+        ``topology`` callback. They are always omitted for lazy mazes, which
+        are packed with only the rooms modified since they were generated.
+
+    The revision of the maze, :attr:`MazeView.revision`, is stored unchanged;
+    callers that cache unpacked mazes should assign a new revision before
+    packing a modified maze.
+
+    :return: the packed maze
+    :rtype: bytes
+    """
+    kind = KIND_SEEDED if maze.lazy or (seeded and maze.seeded) else KIND_FULL
+    flags = (FLAG_PERMUTED if maze.permuted else 0) \
+        | (FLAG_LAZY if maze.lazy else 0)
+    plugins = _dump_plugins(maze.plugins)
+    return b''.join((
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            kind,
+            len(maze.Wall.WALLS),
+            maze.width,
+            maze.height,
+            maze.seed & 0xFFFFFFFF,
+            maze.random.state,
+            maze._current,
+            maze.moves,
+            maze.visited_count,
+            len(plugins),
+            maze.revision,
+            flags,
+            generate.CODES[maze.algorithm]),
+        _bytes(maze._doors) if kind == KIND_FULL else b'',
+        _bytes(maze._identifiers) if kind == KIND_FULL else b'',
+        _pack_visited(maze._visited, maze.width * maze.height, maze.lazy),
+        _pack_overlay(maze) if maze.lazy else b'',
+        plugins))
+
+
+def unpack(data, topology = None):
+    """Unpacks a maze packed with :func:`pack`.
+
+    :param bytes data: The packed maze.
+
+    :param topology: A callback used to regenerate mazes packed as
+        :data:`KIND_SEEDED`. It is called as ``topology(walls, width, height,
+        seed, algorithm, lazy)`` and must return the tuple ``(doors,
+        identifiers)`` as returned by :meth:`MazeView.share` for the
+        regenerated maze.
+
+    :return: a maze view
+    :rtype: MazeView
+
+    :raises ValueError: if ``data`` is not a packed maze, or if it is a seeded
+        maze and ``topology`` is ``None``
+    """
+    try:
+        (magic, version, kind, walls, width, height, seed, state, current,
+            moves, visited_count, plugins_length, revision, flags,
+            algorithm) = \
+            HEADER.unpack_from(data)
+    except struct.error:
+        raise ValueError('data is too short')
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('data is not a packed maze')
+    algorithm = generate.name(algorithm)
+
+    sparse = kind == KIND_SEEDED and bool(flags & FLAG_LAZY)
+    count = width * height if kind == KIND_FULL else 0
+    doors_offset = HEADER.size
+    identifiers_offset = doors_offset + count
+    visited_offset = identifiers_offset + 4 * count
+    overlay_offset = visited_offset + (4 * visited_count if sparse
+        else (width * height + 7) // 8)
+    if sparse:
+        doors_overlay, offset = _unpack_values(data, overlay_offset, 'B')
+        identifiers_overlay, plugins_offset = _unpack_values(data, offset,
+            ID_TYPECODE)
+    else:
+        doors_overlay, identifiers_overlay = [], []
+        plugins_offset = overlay_offset
+    if len(data) != plugins_offset + plugins_length:
+        raise ValueError('data has invalid length')
+
+    visited = data[visited_offset:overlay_offset]
+    visited = set(_array(ID_TYPECODE, visited)) if sparse \
+        else bytearray(visited)
+    if kind == KIND_FULL:
+        maze = VIEW_CLASSES[walls](
+            width,
+            height,
+            _array('B', data[doors_offset:identifiers_offset]),
+            _array(ID_TYPECODE, data[identifiers_offset:visited_offset]),
+            visited)
+    elif kind == KIND_SEEDED and not topology is None:
+        doors, identifiers = topology(walls, width, height, seed, algorithm,
+            bool(flags & FLAG_LAZY))
+        maze = VIEW_CLASSES[walls](
+            width,
+            height,
+            doors,
+            identifiers,
+            visited)
+        maze._shared = True
+        maze.seeded = not (doors_overlay or identifiers_overlay)
+        maze.lazy = bool(flags & FLAG_LAZY)
+        if not maze.seeded:
+            maze._unshare()
+            for index, value in doors_overlay:
+                maze._doors[index] = value
+            for index, value in identifiers_overlay:
+                maze._identifiers[index] = value
+    else:
+        raise ValueError('cannot unpack maze of kind %d' % kind)
+    plugins = bytes(data[plugins_offset:])
+    maze.visited_count = visited_count
+    maze._current = current
+    maze.moves = moves
+    maze._modified = 0
+    maze._pristine = (state, plugins)
+    maze.seed = seed
+    maze.algorithm = algorithm
+    maze.random = LFSR(state)
+    maze.revision = revision
+    maze.permuted = bool(flags & FLAG_PERMUTED)
+    maze.plugins = _load_plugins(plugins)
+
+    return maze
+
+
+def get_current(data):
+    """Reads the index of the current room from a packed maze.
+
+    :param data: The packed maze.
+
+    :return: the room index
+    :rtype: int
+    """
+    return CURRENT.unpack_from(data, CURRENT_OFFSET)[0]
+
+
+def get_moves(data):
+    """Reads the number of moves from a packed maze.
+
+    :param data: The packed maze.
+
+    :return: the number of moves
+    :rtype: int
+    """
+    return CURRENT.unpack_from(data, CURRENT_OFFSET)[1]
+
+
+def get_visited(data):
+    """Reads the visited rooms from a packed maze.
+
+    :param data: The packed maze.
+
+    :return: the visited bitset, or for lazy mazes the indices of the visited
+        rooms; see :func:`is_lazy`
+    :rtype: bytes or array.array
+    """
+    offset, length, sparse = _visited_range(data)
+    if sparse:
+        return _array(ID_TYPECODE, data[offset:offset + length])
+    else:
+        return bytes(data[offset:offset + length])
+
+
+def get_visited_count(data):
+    """Reads the number of visited rooms from a packed maze.
+
+    :param data: The packed maze.
+
+    :return: the number of visited rooms
+    :rtype: int
+    """
+    return VISITED_COUNT.unpack_from(data, VISITED_COUNT_OFFSET)[0]
+
+
+def set_visited(data, indices):
+    """Marks rooms of a packed maze as visited in place.
+
+    The number of visited rooms is updated as well.
+
+    :param data: The packed maze. This must be a writable buffer, such as a
+        ``bytearray`` or a writable ``mmap``. The indices of rooms visited for
+        the first time are inserted into lazy mazes, see :func:`is_lazy`, so
+        ``data`` must then be a ``bytearray``.
+
+    :param indices: The indices of the rooms.
+    """
+    offset, length, sparse = _visited_range(data)
+    count = get_visited_count(data)
+    if sparse:
+        visited = set(_array(ID_TYPECODE, data[offset:offset + length]))
+        added = array.array(ID_TYPECODE)
+        for index in indices:
+            if not index in visited:
+                visited.add(index)
+                added.append(index)
+        data[offset + length:offset + length] = _bytes(added)
+        count += len(added)
+    else:
+        count = _set_bits(data, offset, indices, count)
+    VISITED_COUNT.pack_into(data, VISITED_COUNT_OFFSET, count)
+
+
+def is_lazy(data):
+    """Returns whether a packed maze is a lazy maze.
+
+    The visited rooms of such mazes are stored as a list of room indices, and
+    :func:`set_visited` changes their length.
+
+    :param data: The packed maze.
+
+    :rtype: bool
+    """
+    return _visited_range(data)[2]
+
+
+def _set_bits(data, offset, indices, count):
+    """Sets the bits of rooms in the visited bitset of a packed maze.
+
+    :param data: The packed maze.
+
+    :param int offset: The offset of the bitset.
+
+    :param indices: The indices of the rooms.
+
+    :param int count: The number of visited rooms.
+
+    :return: the new number of visited rooms
+    :rtype: int
+    """
+    for index in indices:
+        byte, bit = offset + (index >> 3), 1 << (index & 7)
+        value = bytearray(data[byte:byte + 1])[0]
+        if not value & bit:
+            data[byte:byte + 1] = bytes(bytearray((value | bit,)))
+            count += 1
+    return count
+
+
+def _visited_range(data):
+    """Returns the offset and length of the visited rooms of a packed maze.
+
+    :param data: The packed maze.
+
+    :return: the tuple ``(offset, length, sparse)``, where ``sparse`` is whether
+        the visited rooms are stored as a list of room indices
+    """
+    kind, walls, width, height = KIND.unpack_from(data, KIND_OFFSET)
+    flags, = FLAGS.unpack_from(data, FLAGS_OFFSET)
+    count = width * height
+    if kind == KIND_SEEDED and flags & FLAG_LAZY:
+        return (HEADER.size, 4 * get_visited_count(data), True)
+    else:
+        return (
+            HEADER.size + (5 * count if kind == KIND_FULL else 0),
+            (count + 7) // 8,
+            False)
+
+
+def _pack_visited(visited, count, sparse):
+    """Returns the packed representation of the visited rooms of a maze.
+
+    :param visited: The visited rooms; a bitset or a set of room indices.
+
+    :param int count: The number of rooms of the maze.
+
+    :param bool sparse: Whether to pack the visited rooms as a list of room
+        indices instead of as a bitset.
+
+    :rtype: bytes
+    """
+    if isinstance(visited, (set, frozenset)):
+        indices = sorted(visited)
+    elif sparse:
+        indices = [index for index in range(count)
+            if visited[index >> 3] & (1 << (index & 7))]
+    else:
+        return bytes(visited)
+
+    if sparse:
+        return _bytes(array.array(ID_TYPECODE, indices))
+    else:
+        bitset = bytearray((count + 7) // 8)
+        _set_bits(bitset, 0, indices, 0)
+        return bytes(bitset)
+
+
+def _pack_overlay(maze):
+    """Returns the packed overlay of a lazy maze.
+
+    The overlay is empty for mazes unmodified since they were generated, since
+    the regenerated maze has the same overlay.
+
+    :param MazeView maze: The lazy maze.
+
+    :rtype: bytes
+    """
+    if maze.seeded:
+        doors, identifiers = {}, {}
+    else:
+        doors, identifiers = maze._doors.overlay, maze._identifiers.overlay
+    return b''.join(
+        OVERLAY_COUNT.pack(len(values))
+            + _bytes(array.array(ID_TYPECODE, sorted(values)))
+            + _bytes(array.array(typecode,
+                (values[index] for index in sorted(values))))
+        for values, typecode in ((doors, 'B'), (identifiers, ID_TYPECODE)))
+
+
+def _unpack_values(data, offset, typecode):
+    """Reads a list of values from the overlay of a packed lazy maze.
+
+    :param data: The packed maze.
+
+    :param int offset: The offset of the list.
+
+    :param str typecode: The array type code of the values.
+
+    :return: the tuple ``(values, offset)``, where ``values`` is a list of
+        ``(index, value)`` tuples and ``offset`` is the offset following the
+        list
+
+    :raises ValueError: if ``data`` is too short
+    """
+    try:
+        count, = OVERLAY_COUNT.unpack_from(data, offset)
+    except struct.error:
+        raise ValueError('data is too short')
+    indices_offset = offset + OVERLAY_COUNT.size
+    values_offset = indices_offset + 4 * count
+    end = values_offset + array.array(typecode).itemsize * count
+    if len(data) < end:
+        raise ValueError('data is too short')
+    return (
+        list(zip(
+            _array(ID_TYPECODE, data[indices_offset:values_offset]),
+            _array(typecode, data[values_offset:end]))),
+        end)
+
+
+def _copy_visited(visited):
+    """Creates the visited rooms of a new maze view.
+
+    :param visited: The visited rooms, as returned by :func:`get_visited` or
+        kept by a :class:`Snapshot`.
+
+    :return: a bitset, or a set of room indices if ``visited`` is not a bitset
+    :rtype: bytearray or set
+    """
+    if isinstance(visited, (bytes, bytearray)):
+        return bytearray(visited)
+    else:
+        return set(visited)
+
+
+def get_revision(data):
+    """Reads the revision from a packed maze.
+
+    :param data: The packed maze.
+
+    :return: the revision
+    :rtype: int
+    """
+    return REVISION.unpack_from(data, REVISION_OFFSET)[0]
+
+
+def set_current(data, index, moves):
+    """Updates the index of the current room and the number of moves of a
+    packed maze in place.
+
+    :param data: The packed maze. This must be a writable buffer, such as a
+        ``bytearray`` or a writable ``mmap``.
+
+    :param int index: The new room index.
+
+    :param int moves: The new number of moves.
+    """
+    CURRENT.pack_into(data, CURRENT_OFFSET, index, moves)
+
+
+class Snapshot(object):
+    """An immutable snapshot of a maze view.
+
+    The backing arrays of the maze, as well as :attr:`MazeView.derived` and
+    :attr:`MazeView.room_dicts`, are shared with the snapshot, and with all
+    views created by :meth:`restore`.
+
+    :param MazeView maze: The maze to snapshot. Its backing arrays are marked
+        as shared.
+    """
+    __slots__ = (
+        'walls',
+        'width',
+        'height',
+        'seed',
+        'algorithm',
+        'doors',
+        'identifiers',
+        'random',
+        'current',
+        'visited',
+        'visited_count',
+        'moves',
+        'plugins',
+        'revision',
+        'seeded',
+        'permuted',
+        'lazy',
+        'derived',
+        'room_dicts')
+
+    def __init__(self, maze):
+        self.walls = len(maze.Wall.WALLS)
+        self.width = maze.width
+        self.height = maze.height
+        self.seed = maze.seed
+        self.algorithm = maze.algorithm
+        self.doors, self.identifiers = maze.share()
+        self.random = maze.random.state
+        self.current = maze._current
+        self.visited = frozenset(maze._visited) \
+            if isinstance(maze._visited, set) else bytes(maze._visited)
+        self.visited_count = maze.visited_count
+        self.moves = maze.moves
+        self.plugins = _dump_plugins(maze.plugins)
+        self.revision = maze.revision
+        self.seeded = maze.seeded
+        self.permuted = maze.permuted
+        self.lazy = maze.lazy
+        self.derived = maze.derived
+        self.room_dicts = maze.room_dicts
+
+    def __len__(self):
+        """The approximate number of bytes used by this snapshot"""
+        return HEADER.size + _nbytes(self.doors) + _nbytes(self.identifiers) \
+            + (4 * len(self.visited) if isinstance(self.visited, frozenset)
+                else len(self.visited)) + len(self.plugins)
+
+    def restore(self, unmodified = False, current = None, moves = None,
+            visited = None, visited_count = None):
+        """Creates a new maze view from this snapshot.
+
+        The plugins of the new maze are copies of the plugins of the original
+        maze, as they were when the snapshot was taken.
+
+        :param bool unmodified: Whether the new maze should track the changes
+            made to it, as if it were unpacked. Otherwise
+            :attr:`MazeView.modified` reports the maze as new.
+
+        :param int current: The index of the current room of the new maze. If
+            this is not specified, the current room of the original maze is
+            used.
+
+        :param int moves: The number of moves of the new maze. If this is not
+            specified, the number of moves of the original maze is used.
+
+        :param visited: The visited rooms of the new maze, as returned by
+            :func:`get_visited`. If this is not specified, the rooms visited in
+            the original maze are used.
+
+        :param int visited_count: The number of rooms visited in the new maze.
+            This must be specified if ``visited`` is specified.
+
+        :return: a new maze view
+        :rtype: MazeView
+        """
+        if visited is None:
+            visited, visited_count = self.visited, self.visited_count
+        maze = VIEW_CLASSES[self.walls](
+            self.width,
+            self.height,
+            self.doors,
+            self.identifiers,
+            _copy_visited(visited))
+        maze._shared = True
+        maze._current = self.current if current is None else current
+        maze.moves = self.moves if moves is None else moves
+        maze.visited_count = visited_count
+        maze.seed = self.seed
+        maze.algorithm = self.algorithm
+        maze.random = LFSR(self.random)
+        maze.revision = self.revision
+        maze.seeded = self.seeded
+        maze.permuted = self.permuted
+        maze.lazy = self.lazy
+        maze.derived = self.derived
+        maze.room_dicts = self.room_dicts
+        maze.plugins = _load_plugins(self.plugins)
+        if unmodified:
+            maze._modified = 0
+            maze._pristine = (self.random, self.plugins)
+        return maze
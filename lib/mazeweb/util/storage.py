@@ -0,0 +1,375 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""Storage for packed mazes.
+
+A store keeps one packed maze, as described in :mod:`mazeweb.util.state`, per
+session. Stores other than :class:`BeakerStore` use the *Beaker* session only
+for its identifier, so sessions survive server restarts and may be shared
+between server processes.
+"""
+
+import mmap
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+from . import state
+
+
+class Store(object):
+    """The interface for maze stores.
+
+    All methods take the *Beaker* session of the current request as their first
+    argument.
+
+    :param int timeout: The number of seconds after which an unmodified maze is
+        discarded. Stores that rely on the *Beaker* session for expiry ignore
+        this value.
+    """
+    #: The minimum number of seconds between purges of expired mazes
+    PURGE_INTERVAL = 60
+
+    def __init__(self, timeout = 3600):
+        self.timeout = timeout
+        self._purged = 0
+
+    def load(self, session):
+        """Loads the packed maze for a session.
+
+        :param session: The session.
+
+        :return: the packed maze
+        :rtype: bytes or bytearray
+
+        :raises KeyError: if no maze is stored for the session
+        """
+        raise NotImplementedError()
+
+    def store(self, session, data):
+        """Stores a packed maze for a session.
+
+        :param session: The session.
+
+        :param bytes data: The packed maze.
+        """
+        raise NotImplementedError()
+
+    def store_current(self, session, index, moves, visited = ()):
+        """Updates only the index of the current room, the number of moves and
+        the visited rooms of the stored maze.
+
+        :param session: The session.
+
+        :param int index: The index of the current room.
+
+        :param int moves: The number of moves.
+
+        :param visited: The indices of rooms to mark as visited.
+
+        :raises KeyError: if no maze is stored for the session
+        """
+        raise NotImplementedError()
+
+    def delete(self, session):
+        """Deletes the maze stored for a session.
+
+        Deleting a maze that does not exist is not an error.
+
+        :param session: The session.
+        """
+        raise NotImplementedError()
+
+    def _purge(self):
+        """Removes mazes that have not been modified for :attr:`timeout`
+        seconds.
+
+        This is done at most once every :attr:`PURGE_INTERVAL` seconds.
+        """
+        now = time.time()
+        if now - self._purged < self.PURGE_INTERVAL:
+            return
+        self._purged = now
+        self._expire(now)
+
+    def _expire(self, now):
+        """Removes mazes that have not been modified since ``now -``
+        :attr:`timeout`.
+
+        :param float now: The current time.
+        """
+        pass
+
+
+class BeakerStore(Store):
+    """Stores mazes in the *Beaker* session.
+
+    The maze is kept as a ``bytearray`` under the key ``'maze'``, so that the
+    current room can be updated in place.
+    """
+    def load(self, session):
+        return session['maze']
+
+    def store(self, session, data):
+        session['maze'] = bytearray(data)
+        session.save()
+
+    def store_current(self, session, index, moves, visited = ()):
+        state.set_current(session['maze'], index, moves)
+        state.set_visited(session['maze'], visited)
+        session.save()
+
+    def delete(self, session):
+        session.pop('maze', None)
+
+
+class FileStore(Store):
+    """Stores mazes as files in a directory.
+
+    Every maze is written to a new file that atomically replaces the previous
+    one. Updates of the current room are written in place through a memory
+    map, except for lazy mazes, whose visited rooms change their length, and
+    mazes are read through a memory map.
+
+    :param str path: The directory in which to store mazes. It is created if
+        it does not exist.
+    """
+    def __init__(self, path, timeout = 3600):
+        super(FileStore, self).__init__(timeout)
+        self.path = os.path.realpath(path)
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    def _filename(self, session):
+        """Returns the name of the file for a session.
+
+        :raises KeyError: if the session identifier cannot be used as a file
+            name
+        """
+        if not re.match(r'^[0-9A-Za-z_-]+$', session.id):
+            raise KeyError(session.id)
+        return os.path.join(self.path, session.id)
+
+    def load(self, session):
+        try:
+            with open(self._filename(session), 'rb') as f:
+                m = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+                try:
+                    return m[:]
+                finally:
+                    m.close()
+        except (IOError, OSError, ValueError):
+            raise KeyError(session.id)
+
+    def store(self, session, data):
+        filename = self._filename(session)
+        fd, temporary = tempfile.mkstemp(dir = self.path, prefix = '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.rename(temporary, filename)
+        except:
+            os.remove(temporary)
+            raise
+        self._purge()
+
+    def store_current(self, session, index, moves, visited = ()):
+        try:
+            with open(self._filename(session), 'r+b') as f:
+                m = mmap.mmap(f.fileno(), 0)
+                try:
+                    if state.is_lazy(m):
+                        data = bytearray(m[:])
+                    else:
+                        state.set_current(m, index, moves)
+                        state.set_visited(m, visited)
+                        return
+                finally:
+                    m.close()
+        except (IOError, OSError, ValueError):
+            raise KeyError(session.id)
+
+        # Visiting rooms changes the length of lazy mazes, but they are small
+        # enough to be rewritten
+        state.set_current(data, index, moves)
+        state.set_visited(data, visited)
+        self.store(session, data)
+
+    def delete(self, session):
+        try:
+            os.remove(self._filename(session))
+        except (KeyError, OSError):
+            pass
+
+    def _expire(self, now):
+        for name in os.listdir(self.path):
+            filename = os.path.join(self.path, name)
+            try:
+                if now - os.path.getmtime(filename) > self.timeout:
+                    os.remove(filename)
+            except OSError:
+                pass
+
+
+class SQLiteStore(Store):
+    """Stores mazes in an *SQLite* database.
+
+    The index of the current room and the number of moves are kept in separate
+    columns, and rooms visited since the maze was stored in a separate table,
+    so that moving to a different room does not rewrite the packed maze.
+
+    :param str path: The database file name. It is created if it does not
+        exist.
+    """
+    def __init__(self, path, timeout = 3600):
+        super(SQLiteStore, self).__init__(timeout)
+        self.path = os.path.realpath(path)
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS mazes (
+                    id TEXT PRIMARY KEY,
+                    current INTEGER NOT NULL,
+                    moves INTEGER NOT NULL,
+                    modified REAL NOT NULL,
+                    data BLOB NOT NULL)''')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS visited (
+                    id TEXT NOT NULL,
+                    room INTEGER NOT NULL)''')
+            connection.execute('''
+                CREATE INDEX IF NOT EXISTS visited_id ON visited (id)''')
+            connection.execute('''
+                CREATE INDEX IF NOT EXISTS mazes_modified
+                    ON mazes (modified)''')
+
+    def _connection(self):
+        """Returns the database connection for the current thread.
+        """
+        try:
+            return self._local.connection
+        except AttributeError:
+            connection = sqlite3.connect(self.path, timeout = 30)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            self._local.connection = connection
+            return connection
+
+    def load(self, session):
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT current, moves, data FROM mazes WHERE id = ?',
+            (session.id,)).fetchone()
+        if row is None:
+            raise KeyError(session.id)
+        current, moves, data = row
+        data = bytearray(data)
+        state.set_current(data, current, moves)
+        state.set_visited(data, (room for room, in connection.execute(
+            'SELECT room FROM visited WHERE id = ?',
+            (session.id,))))
+        return data
+
+    def store(self, session, data):
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO mazes '
+                '(id, current, moves, modified, data) VALUES (?, ?, ?, ?, ?)',
+                (session.id, state.get_current(data), state.get_moves(data),
+                    time.time(), sqlite3.Binary(data)))
+            connection.execute(
+                'DELETE FROM visited WHERE id = ?',
+                (session.id,))
+        self._purge()
+
+    def store_current(self, session, index, moves, visited = ()):
+        with self._connection() as connection:
+            cursor = connection.execute(
+                'UPDATE mazes SET current = ?, moves = ?, modified = ? '
+                'WHERE id = ?',
+                (index, moves, time.time(), session.id))
+            if cursor.rowcount == 0:
+                raise KeyError(session.id)
+            connection.executemany(
+                'INSERT INTO visited (id, room) VALUES (?, ?)',
+                ((session.id, room) for room in visited))
+
+    def delete(self, session):
+        with self._connection() as connection:
+            connection.execute(
+                'DELETE FROM mazes WHERE id = ?',
+                (session.id,))
+            connection.execute(
+                'DELETE FROM visited WHERE id = ?',
+                (session.id,))
+
+    def _expire(self, now):
+        with self._connection() as connection:
+            cursor = connection.execute(
+                'DELETE FROM mazes WHERE modified < ?',
+                (now - self.timeout,))
+            if cursor.rowcount:
+                connection.execute(
+                    'DELETE FROM visited WHERE id NOT IN '
+                    '(SELECT id FROM mazes)')
+
+
+#: The available stores, keyed on their configuration names
+STORES = {
+    'beaker': BeakerStore,
+    'file': FileStore,
+    'sqlite': SQLiteStore}
+
+
+def create(configuration):
+    """Creates the store described by a configuration.
+
+    The following configuration values are used:
+
+    ``session.store``
+        The name of the store in :data:`STORES`. The default is ``"beaker"``.
+
+    ``session.path``
+        The path of the directory or file used by the store. The default is
+        ``sessions`` or ``sessions.sqlite`` in ``$MAZEWEB_CACHE_DIR``.
+
+    ``session.timeout``
+        The number of seconds after which unmodified mazes are discarded.
+
+    :param mazeweb.util.data.ConfigurationStore configuration: The
+        configuration.
+
+    :return: a new store
+    :rtype: Store
+
+    :raises ValueError: if the store name is invalid
+    """
+    name = configuration('session.store', 'beaker')
+    try:
+        store_class = STORES[name]
+    except KeyError:
+        raise ValueError('invalid session store: %s' % name)
+
+    timeout = configuration('session.timeout', 3600)
+    if store_class is BeakerStore:
+        return store_class(timeout)
+
+    path = configuration('session.path', os.path.join(
+        os.getenv('MAZEWEB_CACHE_DIR', '.'),
+        'sessions.sqlite' if store_class is SQLiteStore else 'sessions'))
+    return store_class(path, timeout)
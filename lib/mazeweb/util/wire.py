@@ -0,0 +1,469 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""The binary wire format.
+
+Clients that send :data:`MEDIA_TYPE` in the ``Accept`` header receive maze
+dicts and room dicts in a compact binary format instead of JSON. The physical
+layout of rooms is not transferred, since it is derived from the room position
+using :mod:`mazeweb.util.geometry`.
+
+All values are little endian. A response is encoded as::
+
+    response := TAG_MAZE maze | TAG_ROOM room | TAG_ROOMS rooms
+        | TAG_DELTA delta
+
+A maze dict is encoded as::
+
+    maze := MAZE extras room
+
+where ``MAZE`` is :data:`MAZE` and ``room`` is the current room. A room dict is
+encoded as::
+
+    room := ROOM target* extras
+
+where ``ROOM`` is :data:`ROOM`. The door mask has a bit set for every wall
+with a door, and the bit :data:`RECURSIVE` set if the targets are rooms rather
+than identifiers. For every door, in wall order, ``target`` is either the room
+identifier, :data:`IDENTIFIER`, or the non-recursive room.
+
+A room list dict is encoded as::
+
+    rooms := LENGTH room* extras
+
+where ``LENGTH`` is the number of rooms. A delta dict is encoded as::
+
+    delta := VERSION room rooms
+
+where ``VERSION`` is :data:`VERSION` and ``room`` is the current room.
+
+``extras`` is the JSON encoded object of all other values, for example those
+added by plugins, prefixed with its length, :data:`LENGTH`. An empty object is
+encoded as the length ``0``.
+"""
+
+import json
+import struct
+
+from . import encoding, geometry, state
+
+
+#: The media type of the binary wire format
+MEDIA_TYPE = 'application/x-mazeweb'
+
+#: The tag starting an encoded maze dict
+TAG_MAZE = b'M'
+
+#: The tag starting an encoded room dict
+TAG_ROOM = b'R'
+
+#: The tag starting an encoded room list dict
+TAG_ROOMS = b'L'
+
+#: The tag starting an encoded delta dict
+TAG_DELTA = b'D'
+
+#: The header of a maze dict; the fields are the number of walls, the width,
+#: the height and the identifier of the start room
+MAZE = struct.Struct('<BIII')
+
+#: The header of a room dict; the fields are the identifier, the horizontal and
+#: vertical position and the door mask
+ROOM = struct.Struct('<IIIB')
+
+#: The format of a room identifier
+IDENTIFIER = struct.Struct('<I')
+
+#: The format of the length of the extra values
+LENGTH = struct.Struct('<I')
+
+#: The format of the version of a delta dict
+VERSION = struct.Struct('<I')
+
+#: The bit in the door mask set for recursive room dicts
+RECURSIVE = 1 << 7
+
+#: The keys of maze dicts encoded in :data:`MAZE`
+MAZE_KEYS = frozenset((
+    'width',
+    'height',
+    'walls',
+    'start_room',
+    'current_room'))
+
+#: The keys of room list dicts encoded as rooms
+ROOMS_KEYS = frozenset((
+    'rooms',))
+
+#: The keys of delta dicts encoded in :data:`VERSION` or as the current room
+DELTA_KEYS = frozenset((
+    'version',
+    'current_room'))
+
+#: The keys of room dicts encoded in :data:`ROOM` or derived from the position
+ROOM_KEYS = frozenset((
+    'identifier',
+    'position',
+    'center',
+    'walls'))
+
+
+def _walls(geometry, room_pos):
+    """Yields the walls of a room that are not on the edge of the maze.
+
+    :param mazeweb.util.geometry.Geometry geometry: The maze geometry.
+
+    :param room_pos: The position of the room.
+    :type room_pos: (int, int)
+
+    :return: a generator of ``(wall, start, end)``
+    """
+    x, y = room_pos
+    width, height = geometry.width, geometry.height
+    for wall, start, end, dx, dy in geometry.walls(room_pos):
+        tx, ty = x + dx, y + dy
+        if tx >= 0 and tx < width and ty >= 0 and ty < height:
+            yield wall, start, end
+
+
+def _dump_extras(value, keys):
+    """Encodes the values of a dict not in ``keys``.
+
+    :param dict value: The dict.
+
+    :param keys: The keys to exclude.
+
+    :rtype: bytes
+    """
+    extras = dict((k, v) for k, v in value.items() if not k in keys)
+    if not extras:
+        return LENGTH.pack(0)
+    data = encoding.dumps(extras).encode('utf-8')
+    return LENGTH.pack(len(data)) + data
+
+
+def _load_extras(data, offset, result):
+    """Decodes extra values and adds them to a dict.
+
+    :param bytes data: The encoded data.
+
+    :param int offset: The offset of the extra values.
+
+    :param dict result: The dict to update.
+
+    :return: the offset following the extra values
+    :rtype: int
+    """
+    length, = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    if length:
+        # Decoding errors are reported as ValueError, like other invalid data
+        try:
+            result.update(json.loads(
+                bytes(data[offset:offset + length]).decode('utf-8')))
+        except ValueError:
+            raise ValueError('invalid extra values')
+    return offset + length
+
+
+def dump_room(geometry, room):
+    """Encodes a room dict.
+
+    The encoded value of a :class:`mazeweb.util.encoding.CachedDict` is cached
+    in the dict.
+
+    :param mazeweb.util.geometry.Geometry geometry: The geometry of the maze.
+
+    :param dict room: A :term:`recursive room dict` or a :term:`non-recursive
+        room dict`.
+
+    :rtype: bytes
+    """
+    cached = isinstance(room, encoding.CachedDict)
+    if cached and not room.binary is None:
+        return room.binary
+
+    position = room['position']
+    room_pos = (position['x'], position['y'])
+    doors = 0
+    targets = []
+    for (wall, start, end), w in zip(_walls(geometry, room_pos),
+            room['walls']):
+        target = w['target']
+        if target is None:
+            continue
+        doors |= 1 << wall
+        if isinstance(target, dict):
+            doors |= RECURSIVE
+            targets.append(dump_room(geometry, target))
+        else:
+            targets.append(IDENTIFIER.pack(target))
+
+    result = b''.join((
+        ROOM.pack(room['identifier'], room_pos[0], room_pos[1], doors),
+        b''.join(targets),
+        _dump_extras(room, ROOM_KEYS)))
+    if cached:
+        room.binary = result
+    return result
+
+
+def dump_maze(value):
+    """Encodes a maze dict.
+
+    :param dict value: A :term:`maze dict`.
+
+    :rtype: bytes
+    """
+    walls, width, height = value['walls'], value['width'], value['height']
+    return b''.join((
+        MAZE.pack(walls, width, height, value['start_room']),
+        _dump_extras(value, MAZE_KEYS),
+        dump_room(
+            geometry.get(state.VIEW_CLASSES[walls], width, height),
+            value['current_room'])))
+
+
+def dump_rooms(geometry, value):
+    """Encodes a room list dict.
+
+    :param mazeweb.util.geometry.Geometry geometry: The geometry of the maze.
+
+    :param dict value: A :term:`room list dict`.
+
+    :rtype: bytes
+    """
+    rooms = value['rooms']
+    return b''.join((
+        LENGTH.pack(len(rooms)),
+        b''.join(dump_room(geometry, room) for room in rooms),
+        _dump_extras(value, ROOMS_KEYS)))
+
+
+def dump_delta(geometry, value):
+    """Encodes a delta dict.
+
+    :param mazeweb.util.geometry.Geometry geometry: The geometry of the maze.
+
+    :param dict value: A :term:`delta dict`.
+
+    :rtype: bytes
+    """
+    return b''.join((
+        VERSION.pack(value['version']),
+        dump_room(geometry, value['current_room']),
+        dump_rooms(geometry, dict(
+            (k, v) for k, v in value.items() if not k in DELTA_KEYS))))
+
+
+def load_room(geometry, data, offset = 0):
+    """Decodes a room dict encoded with :func:`dump_room`.
+
+    :param mazeweb.util.geometry.Geometry geometry: The geometry of the maze.
+
+    :param bytes data: The encoded data.
+
+    :param int offset: The offset of the room in ``data``.
+
+    :return: the tuple ``(room, offset)``, where ``room`` is the room dict
+        and ``offset`` the offset following the room
+
+    :raises ValueError: if ``data`` is invalid
+    """
+    try:
+        identifier, x, y, doors = ROOM.unpack_from(data, offset)
+    except struct.error:
+        raise ValueError('data is too short')
+    offset += ROOM.size
+    room_pos = (x, y)
+    center = geometry.center(room_pos)
+
+    walls = []
+    for wall, start, end in _walls(geometry, room_pos):
+        if not doors & (1 << wall):
+            target = None
+        elif doors & RECURSIVE:
+            target, offset = load_room(geometry, data, offset)
+        else:
+            try:
+                target, = IDENTIFIER.unpack_from(data, offset)
+            except struct.error:
+                raise ValueError('data is too short')
+            offset += IDENTIFIER.size
+        walls.append(dict(
+            target = target,
+            span = dict(
+                start = start,
+                end = end)))
+
+    result = dict(
+        identifier = identifier,
+        position = dict(
+            x = x,
+            y = y),
+        center = dict(
+            x = center[0],
+            y = center[1]),
+        walls = walls)
+    try:
+        offset = _load_extras(data, offset, result)
+    except struct.error:
+        raise ValueError('data is too short')
+    return (result, offset)
+
+
+def load_rooms(geometry, data, offset = 0):
+    """Decodes a room list dict encoded with :func:`dump_rooms`.
+
+    :param mazeweb.util.geometry.Geometry geometry: The geometry of the maze.
+
+    :param bytes data: The encoded data.
+
+    :param int offset: The offset of the room list in ``data``.
+
+    :return: the tuple ``(value, offset)``, where ``value`` is the room list
+        dict and ``offset`` the offset following it
+
+    :raises ValueError: if ``data`` is invalid
+    """
+    try:
+        count, = LENGTH.unpack_from(data, offset)
+    except struct.error:
+        raise ValueError('data is too short')
+    offset += LENGTH.size
+
+    rooms = []
+    for i in range(count):
+        room, offset = load_room(geometry, data, offset)
+        rooms.append(room)
+
+    result = dict(
+        rooms = rooms)
+    try:
+        offset = _load_extras(data, offset, result)
+    except struct.error:
+        raise ValueError('data is too short')
+    return (result, offset)
+
+
+def load_delta(geometry, data, offset = 0):
+    """Decodes a delta dict encoded with :func:`dump_delta`.
+
+    :param mazeweb.util.geometry.Geometry geometry: The geometry of the maze.
+
+    :param bytes data: The encoded data.
+
+    :param int offset: The offset of the delta dict in ``data``.
+
+    :return: the tuple ``(value, offset)``, where ``value`` is the delta dict
+        and ``offset`` the offset following it
+
+    :raises ValueError: if ``data`` is invalid
+    """
+    try:
+        version, = VERSION.unpack_from(data, offset)
+    except struct.error:
+        raise ValueError('data is too short')
+    current_room, offset = load_room(geometry, data, offset + VERSION.size)
+    result, offset = load_rooms(geometry, data, offset)
+    result['version'] = version
+    result['current_room'] = current_room
+    return (result, offset)
+
+
+def load_maze(data):
+    """Decodes a maze dict encoded with :func:`dump_maze`.
+
+    :param bytes data: The encoded data.
+
+    :return: a :term:`maze dict`
+
+    :raises ValueError: if ``data`` is invalid
+    """
+    try:
+        walls, width, height, start_room = MAZE.unpack_from(data)
+        result = dict(
+            walls = walls,
+            width = width,
+            height = height,
+            start_room = start_room)
+        offset = _load_extras(data, MAZE.size, result)
+    except struct.error:
+        raise ValueError('data is too short')
+    if not walls in state.VIEW_CLASSES:
+        raise ValueError('invalid number of walls: %d' % walls)
+
+    result['current_room'], offset = load_room(
+        geometry.get(state.VIEW_CLASSES[walls], width, height),
+        data,
+        offset)
+    if offset != len(data):
+        raise ValueError('data has invalid length')
+    return result
+
+
+#: The functions used to decode values with a tag other than :data:`TAG_MAZE`
+LOADERS = {
+    TAG_ROOM: load_room,
+    TAG_ROOMS: load_rooms,
+    TAG_DELTA: load_delta}
+
+
+def dumps(value, geometry = None):
+    """Encodes a maze dict, room dict, room list dict or delta dict as a
+    response.
+
+    :param dict value: A :term:`maze dict`, :term:`recursive room dict`,
+        :term:`non-recursive room dict`, :term:`room list dict` or
+        :term:`delta dict`.
+
+    :param mazeweb.util.geometry.Geometry geometry: The geometry of the maze.
+        This is required for all values except maze dicts.
+
+    :rtype: bytes
+    """
+    if 'start_room' in value:
+        return TAG_MAZE + dump_maze(value)
+    elif 'version' in value:
+        return TAG_DELTA + dump_delta(geometry, value)
+    elif 'rooms' in value:
+        return TAG_ROOMS + dump_rooms(geometry, value)
+    else:
+        return TAG_ROOM + dump_room(geometry, value)
+
+
+def loads(data, geometry = None):
+    """Decodes a response encoded with :func:`dumps`.
+
+    :param bytes data: The encoded response.
+
+    :param mazeweb.util.geometry.Geometry geometry: The geometry of the maze.
+        This is required for all values except maze dicts.
+
+    :return: a maze dict, room dict, room list dict or delta dict
+
+    :raises ValueError: if ``data`` is invalid, or if it is not a maze dict
+        and ``geometry`` is ``None``
+    """
+    tag = bytes(data[:1])
+    if tag == TAG_MAZE:
+        return load_maze(data[1:])
+    elif tag in LOADERS and not geometry is None:
+        result, offset = LOADERS[tag](geometry, data, 1)
+        if offset != len(data):
+            raise ValueError('data has invalid length')
+        return result
+    else:
+        raise ValueError('cannot decode value with tag %r' % tag)
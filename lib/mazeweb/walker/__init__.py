@@ -16,23 +16,406 @@
 
 import json
 import math
+import socket
+import struct
 import sys
+import timeit
 
+from mazeweb.util import geometry, wire
+from mazeweb.util.counters import Counters, Histograms
 from mazeweb.util.data import wrap, unwrap
 
 from maze.hex import HexMaze
 from maze.quad import Maze
 from maze.tri import TriMaze
 
+from .index import RoomIndex
+
 if sys.version_info.major < 3:
-    from httplib import CannotSendRequest, HTTPConnection
+    from httplib import HTTPConnection, HTTPException
 else:
-    from http.client import CannotSendRequest, HTTPConnection
+    from http.client import HTTPConnection, HTTPException
+
+
+#: The maze classes used for the local maze, keyed on the number of walls
+MAZE_CLASSES = {
+    3: TriMaze,
+    4: Maze,
+    6: HexMaze}
+
+#: The magic bytes that start every saved walker
+MAGIC = b'MW'
+
+#: The version of the saved format
+VERSION = 1
+
+#: The header of a saved walker; the fields are the magic bytes, the format
+#: version, the number of walls, the current room, the version of the maze and
+#: the length of the session cookie, which follows the header. The header and
+#: cookie are followed by the room index saved with
+#: :meth:`mazeweb.walker.index.RoomIndex.dump`.
+HEADER = struct.Struct('<2sBBIII')
+
+#: The default number of times a request is retried on a new connection
+RETRIES = 3
+
+#: The HTTP methods of requests that are retried even if they were sent, since
+#: repeating them has no further effect on the server
+IDEMPOTENT = ('GET', 'DELETE')
+
+
+class BaseMazeWalker(object):
+    """The state of a maze walker shared by the blocking and asynchronous
+    implementations.
+
+    This class keeps the local copy of the maze built from the responses of the
+    server, but does not communicate with the server.
+    """
+    def _reset_statistics(self):
+        """Creates the counters and latency histograms of this walker.
+        """
+        # Count the room requests made, those saved since the room was
+        # included in a response or already known, the resynchronisations
+        # caused by missed moves and the requests retried on a new connection
+        self.counters = Counters('requests', 'saved', 'skipped', 'resyncs',
+            'reconnects')
+
+        # The round-trip times of requests, keyed on HTTP method
+        self.latencies = Histograms()
+
+    def _initialize(self, data, width, height):
+        """Creates the local maze from the response to ``POST /maze``.
+
+        :param data: The :term:`maze dict` of the new maze.
+
+        :param int width: The requested width of the maze.
+
+        :param int height: The requested height of the maze.
+
+        :raises ValueError: if the size of the maze created on the server was
+            different from the requested size
+        """
+        if data.width != width or data.height != height:
+            raise ValueError('Failed to create a maze with dimensions %s' % (
+                str((width, height))))
+
+        self.maze = MAZE_CLASSES[data.walls](data.width, data.height)
+        self.geometry = geometry.get(type(self.maze), data.width, data.height)
+
+        # Create the index of known rooms, which maps identifiers to positions
+        self.mapping = RoomIndex(data.width, data.height)
+
+        # The version of the maze on the server, used to detect missed moves
+        # in delta mode
+        self.version = data.version
+
+    def _restore(self, f):
+        """Restores the state saved with :meth:`save`.
+
+        :param f: A file opened for binary reading.
+
+        :raises ValueError: if the file does not contain a saved walker
+        """
+        try:
+            magic, version, walls, current_room, maze_version, length = \
+                HEADER.unpack(f.read(HEADER.size))
+        except struct.error:
+            raise ValueError('data is too short')
+        if magic != MAGIC or version != VERSION or not walls in MAZE_CLASSES:
+            raise ValueError('data is not a saved walker')
+        self.cookies = f.read(length).decode('latin-1')
+        self.mapping = RoomIndex.load(f)
+        if not current_room in self.mapping:
+            raise ValueError('the current room is not known')
+
+        width, height = self.mapping.width, self.mapping.height
+        self.maze = MAZE_CLASSES[walls](width, height)
+        self.geometry = geometry.get(type(self.maze), width, height)
+        for known in self.mapping.known():
+            room = self.maze[known.position]
+            x, y = known.position
+            for wall, start, end, dx, dy in self.geometry.walls(
+                    known.position):
+                if (x + dx, y + dy) in self.maze:
+                    room[wall] = bool(known.doors & (1 << wall))
+
+        self._current_room = current_room
+        self.version = maze_version
+
+    def save(self, f):
+        """Saves the explored state of this walker to a file.
+
+        The session cookie, the current room and the index of known rooms are
+        saved, so that the walk can be resumed with ``resume`` without
+        retrieving the known rooms again. To resume the walk from a different
+        process, call :meth:`detach` to keep the session on the server.
+
+        :param f: A file opened for binary writing.
+        """
+        cookies = self.cookies.encode('latin-1')
+        f.write(HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(self.maze.Wall.WALLS),
+            self._current_room,
+            self.version,
+            len(cookies)))
+        f.write(cookies)
+        self.mapping.dump(f)
+
+    def detach(self):
+        """Detaches this walker from its session.
+
+        The session is not deleted on the server when the walker is destroyed
+        or closed. The walker cannot be used after this method has been called.
+        """
+        self.cookies = None
+
+    @property
+    def current_room(self):
+        """The identifier of the current room"""
+        return self._current_room
+
+    @property
+    def position(self):
+        """The position of the current room"""
+        return self.mapping[self.current_room]
+
+    @property
+    def frontier(self):
+        """The positions of the known rooms that have not been visited"""
+        return self.mapping.frontier
+
+    def random_frontier(self, rng):
+        """Returns the position of a random known room that has not been
+        visited.
+
+        See :meth:`mazeweb.walker.index.RoomIndex.random_frontier`.
+        """
+        return self.mapping.random_frontier(rng)
+
+    def is_reachable(self, room_position):
+        """Returns whether a room is immediately reachable from the current
+        room.
+
+        :param room_position:
+            The position of the room.
+        :type room_position: (int, int)
+
+        :return: whether the room is reachable
+        :rtype: bool
+        """
+        if room_position == self.position:
+            # The current room is reachable
+            return True
+        else:
+            return self.maze.connected(self.position, room_position)
+
+    def __getitem__(self, i):
+        """Returns a known room.
+
+        :param i: The identifier or the position of the room.
+
+        :rtype: mazeweb.walker.index.KnownRoom
+
+        :raises IndexError: if ``i`` is a position outside of the maze
+
+        :raises KeyError: if the room is not known
+        """
+        if isinstance(i, tuple) and len(i) == 2:
+            return self.mapping.room(i)
+        else:
+            return self.mapping.room(self.mapping[i])
+
+    def _identifier(self, room_position):
+        """Returns the identifier of a known room.
+
+        :param room_position: The position of the room.
+        :type room_position: (int, int)
+
+        :rtype: int
+
+        :raises ValueError: if ``room_position`` is invalid or the room is not
+            known
+        """
+        if not isinstance(room_position, tuple) or not len(room_position) == 2:
+            raise ValueError('%s is not a valid position' % str(room_position))
+
+        try:
+            return self.mapping.identifier(room_position)
+        except IndexError:
+            raise ValueError('%s is outside of the maze' % str(room_position))
+        except KeyError:
+            raise ValueError('%s is not a known room from %s' % (
+                str(room_position), str(self.position)))
+
+    def _path(self, room_positions):
+        """Returns the identifiers of a sequence of known rooms.
+
+        :param room_positions: The positions of the rooms.
+        :type room_positions: [(int, int)]
+
+        :rtype: [int]
+
+        :raises ValueError: if a room is unknown
+        """
+        try:
+            return [self.mapping.identifier(room_pos)
+                for room_pos in room_positions]
+        except (KeyError, IndexError):
+            raise ValueError('%s is not a known path from %s' % (
+                str(room_positions), str(self.position)))
+
+    def _update_room(self, identifier, data):
+        """Updates the local maze with the description of a room.
+
+        :param str identifier: The identifier of the room.
+
+        :param dict data: A :term:`recursive room dict` or a
+            :term:`non-recursive room dict`.
+
+        :raises ValueError: if ``data`` does not match the local maze
+        """
+        room_pos = (int(data.position.x), int(data.position.y))
+        room = self.maze[room_pos]
+
+        # Make sure that the room is what we expect
+        if (data.center.x, data.center.y) != self.geometry.center(room_pos):
+            raise ValueError('Unexpecter center for room %s: %s' % (
+                str(room_pos), str(data.center)))
+
+        # Update the doors; walls are identified by the start of their spans
+        doors = dict(
+            (w.span.start, not unwrap(w.target) is None)
+            for w in data.walls)
+        mask = 0
+        x, y = room_pos
+        for wall, start, end, dx, dy in self.geometry.walls(room_pos):
+            if not (x + dx, y + dy) in self.maze:
+                continue
+            try:
+                room[wall] = doors[start]
+            except KeyError:
+                raise ValueError('Wall %s not found for room %s' % (
+                    self.maze.Wall.NAMES[wall], str(room_pos)))
+            if doors[start]:
+                mask |= 1 << wall
+
+        # Update the room
+        self.mapping.add(identifier, room_pos, mask)
+
+    def _move_request(self, **kwargs):
+        """Returns the body of a request to move the current room.
+
+        :param kwargs: The parameters of the move.
+
+        :rtype: dict
+        """
+        if self.delta:
+            kwargs['delta'] = True
+        return kwargs
+
+    def _is_delta_valid(self, data, moved):
+        """Returns whether a :term:`delta dict` follows the previous response.
+
+        :param data: The delta dict.
+
+        :param bool moved: Whether the current room was changed.
+
+        :rtype: bool
+        """
+        return data.version == (self.version + int(moved)) & 0xFFFFFFFF
+
+    def _update_delta(self, identifier, data):
+        """Updates the local maze with a :term:`delta dict`.
+
+        :param int identifier: The identifier of the current room.
+
+        :param data: The delta dict.
+
+        :return: the identifiers of neighbours of the current room that are not
+            known after the update
+        :rtype: [int]
+        """
+        self.version = data.version
+        self._update_room(identifier, data.current_room)
+        for room in data.rooms:
+            if room.identifier in self.mapping:
+                self.counters.increment('skipped')
+            else:
+                self._update_room(room.identifier, room)
+                self.counters.increment('saved')
+
+        return [target
+            for target in (unwrap(w.target) for w in data.current_room.walls)
+            if not target is None and not target in self.mapping]
+
+    def _rooms_path(self, identifiers):
+        """Returns the path used to retrieve several rooms in one request.
+
+        :param identifiers: The identifiers of the rooms.
+        :type identifiers: [int]
+
+        :rtype: str
+        """
+        return '/maze/rooms?ids=%s' % ','.join(
+            str(identifier) for identifier in identifiers)
+
+    def _select_rooms(self, identifiers, data):
+        """Returns the rooms of a :term:`room list dict` in the order of their
+        identifiers.
+
+        :param identifiers: The identifiers of the requested rooms.
+        :type identifiers: [int]
+
+        :param data: The room list dict returned by the server.
+
+        :rtype: [dict]
+
+        :raises AssertionError: if the server did not return a room
+        """
+        rooms = dict((room.identifier, room) for room in data.rooms)
+        try:
+            return [rooms[identifier] for identifier in identifiers]
+        except KeyError:
+            raise AssertionError('The server denied rooms %s' % ', '.join(
+                str(identifier) for identifier in data.denied))
+
+    def _update_neighbors(self, data):
+        """Updates the local maze with the neighbours of a room.
+
+        Neighbours included in ``data`` are updated unless they are already
+        known; the rooms must then be retrieved from the server by the caller.
+
+        :param dict data: A :term:`recursive room dict` or a
+            :term:`non-recursive room dict`.
+
+        :return: the identifiers of neighbours that are not known and not
+            included in ``data``
+        :rtype: [int]
+        """
+        result = []
+        for w in data.walls:
+            target = w.target
+            if unwrap(target) is None:
+                continue
+            elif isinstance(target, dict):
+                if target.identifier in self.mapping:
+                    self.counters.increment('skipped')
+                else:
+                    self._update_room(target.identifier, target)
+                    self.counters.increment('saved')
+            elif target in self.mapping:
+                self.counters.increment('skipped')
+            else:
+                result.append(target)
+        return result
 
 
-class MazeWalker(object):
+class MazeWalker(BaseMazeWalker):
     def __init__(self, host = 'localhost', port = 8080, width = 20,
-            height = 15, **options):
+            height = 15, binary = False, delta = False, retries = RETRIES,
+            **options):
         """Initialises a new maze walker.
 
         :param str host: The maze crawler host.
@@ -43,12 +426,31 @@ class MazeWalker(object):
 
         :param int height: The height of the maze.
 
+        :param bool binary: Whether to request responses in the binary wire
+            format described in :mod:`mazeweb.util.wire` instead of JSON.
+
+        :param bool delta: Whether to request only the rooms that became
+            visible when moving; see :term:`delta dict`. Missed moves are
+            detected using the version of the maze, and the local maze is then
+            resynchronised.
+
+        :param int retries: The number of times a request is retried on a new
+            connection when the connection to the server fails, which happens
+            when the server closes an idle keep-alive connection. Requests
+            whose methods are not in :data:`IDEMPOTENT`, such as moves, are
+            retried only if they could not be sent.
+
         :raises AssertionError: if no cookies were retrieved from the server
 
         :raises ValueError: if the size of the maze created on the server was
             different from the requested size
         """
         self.host, self.port = host, port
+        self.binary = binary
+        self.delta = delta
+        self.retries = retries
+        self.geometry = None
+        self._reset_statistics()
 
         # Make an initial connection to get the session ID
         self.connection = HTTPConnection(self.host, self.port)
@@ -71,79 +473,107 @@ class MazeWalker(object):
             width = width,
             height = height,
             **options))
-        if data.width != width or data.height != height:
-            raise ValueError('Failed to create a maze with dimensions %s' % (
-                str((width, height))))
-
-        self.maze = {
-            3: TriMaze,
-            4: Maze,
-            6: HexMaze}[data.walls](data.width, data.height)
-
-        # Create a mapping from ID to position
-        self.mapping = {}
+        self._initialize(data, width, height)
 
         # Retrieve the current room
         self.current_room = data.current_room.identifier
 
-    @property
-    def current_room(self):
-        """The identifier of the current room"""
-        return self._current_room
+    @classmethod
+    def resume(self, f, host = 'localhost', port = 8080, binary = False,
+            delta = False, retries = RETRIES):
+        """Resumes a walk saved with :meth:`save`.
+
+        No requests are made to the server.
+
+        :param f: A file opened for binary reading.
+
+        :param str host: The maze crawler host.
+
+        :param int port: The port.
+
+        :param bool binary: See :meth:`__init__`.
 
-    @current_room.setter
+        :param bool delta: See :meth:`__init__`.
+
+        :param int retries: See :meth:`__init__`.
+
+        :rtype: MazeWalker
+
+        :raises ValueError: if the file does not contain a saved walker
+        """
+        result = self.__new__(self)
+        result.host, result.port = host, port
+        result.binary = binary
+        result.delta = delta
+        result.retries = retries
+        result._reset_statistics()
+        result._restore(f)
+        result.connection = HTTPConnection(host, port)
+        return result
+
+    @BaseMazeWalker.current_room.setter
     def current_room(self, value):
         """Sets the current room identifier"""
-        maze = self._put('/maze', dict(
+        self._move(value, self._move_request(
             current_room = value))
-        self._current_room = value
-        self._update_cache(self._current_room, True, maze.current_room)
-
-    @property
-    def position(self):
-        """The position of the current room"""
-        return self.mapping[self.current_room]
 
-    @position.setter
+    @BaseMazeWalker.position.setter
     def position(self, value):
         """Sets the current room position"""
-        if not isinstance(value, tuple) or not len(value) == 2:
-            raise ValueError('%s is not a valid position' % str(value))
+        self.current_room = self._identifier(value)
 
-        try:
-            room = self.maze[value]
-        except IndexError:
-            raise ValueError('%s is outside of the maze' % str(value))
+    def follow(self, room_positions):
+        """Moves through a sequence of rooms in a single request.
 
-        try:
-            self.current_room = room.identifier
-        except AttributeError:
-            raise ValueError('%s is not a known room from %s' % (
-                str(value), str(self.position)))
+        Every room must be immediately reachable from the previous one, and the
+        first room from the current room. The server moves the current room
+        only if the whole path is valid.
 
-    def is_reachable(self, room_position):
-        """Returns whether a room is immediately reachable from the current
-        room.
+        :param room_positions: The positions of the rooms through which to
+            move, in order. All rooms must be known.
+        :type room_positions: [(int, int)]
 
-        :param room_position:
-            The position of the room.
+        :raises ValueError: if a room is unknown
+        """
+        if not room_positions:
+            return
+
+        path = self._path(room_positions)
+        self._move(path[-1], self._move_request(
+            path = path))
+
+    def return_to(self, room_position):
+        """Walks to a visited room along the shortest path through visited
+        rooms.
+
+        The path is found by the server, and the rooms are moved through in a
+        single request.
+
+        :param room_position: The position of the room to which to return.
         :type room_position: (int, int)
 
-        :return: whether the room is reachable
-        :rtype: bool
+        :return: the positions of the rooms on the path, excluding the current
+            room
+        :rtype: [(int, int)]
+
+        :raises ValueError: if the room is not known
+
+        :raises AssertionError: if the room has not been visited
         """
-        if room_position == self.position:
-            # The current room is reachable
-            return True
-        else:
-            return self.maze.connected(self.position, room_position)
+        path = unwrap(self._get('/maze/path?to=%d' % self._identifier(
+            room_position)).path)
+        if path:
+            self._move(path[-1], self._move_request(
+                path = path))
+        return [self.mapping[identifier] for identifier in path]
 
     def walk_to(self, room_position):
         """Walks from the current room to ``room_position``.
 
         The result is a generator that yields all room positions from the
         current room to the target room. The underlying maze is used to find the
-        path, so more rooms than on the path may be visited.
+        path, so more rooms than on the path may be visited. Paths through
+        already known rooms are walked using :meth:`follow`.
 
         :param room_position: The position of the room to which to walk.
         :type room_position: (int, int)
@@ -152,11 +582,11 @@ class MazeWalker(object):
             are not connected
         """
         def visitor(room_pos):
-            # Make sure to walk the entire path to the next room
+            # Make sure to walk the entire path to the next room; the path is
+            # sent in a single request
             if not self.is_reachable(room_pos):
-                for transit_room_pos in self.maze.walk_path(
-                        self.position, room_pos):
-                    self.position = transit_room_pos
+                self.follow(list(self.maze.walk_path(
+                    self.position, room_pos))[1:])
             else:
                 self.position = room_pos
 
@@ -165,27 +595,39 @@ class MazeWalker(object):
 
     def __del__(self):
         # Delete the session on the server
-        if hasattr(self, 'connection') and hasattr(self, 'cookies'):
+        if hasattr(self, 'connection') and getattr(self, 'cookies', None):
             try:
                 self._delete('/maze')
             except:
                 pass
 
-    def __getitem__(self, i):
-        try:
-            return self[self.mapping[i]]
-
-        except KeyError:
-            if isinstance(i, tuple) and len(i) == 2:
-                x, y = i
-                if False \
-                        or x < 0 or x >= self.maze.width \
-                        or y < 0 or y >= self.maze.height:
-                    raise IndexError()
-                return self.maze[i]
+    def _move(self, identifier, request):
+        """Moves the current room and updates the cache from the response.
 
-        raise KeyError(i)
+        :param int identifier: The identifier of the new current room.
 
+        :param dict request: The body of the request, as returned by
+            :meth:`_move_request`.
+        """
+        moved = identifier != getattr(self, '_current_room', identifier)
+        data = self._put('/maze', request)
+        self._current_room = identifier
+
+        if not self.delta:
+            self.version = data.version
+            self._update_cache(identifier, True, data.current_room)
+        elif not self._is_delta_valid(data, moved):
+            self.counters.increment('resyncs')
+            data = self._get('/maze')
+            self.version = data.version
+            self._update_cache(identifier, True, data.current_room)
+        else:
+            missing = self._update_delta(identifier, data)
+            if missing:
+                for neighbor, neighbor_data in zip(
+                        missing, self._get_rooms(missing)):
+                    self._update_room(neighbor, neighbor_data)
+        self.mapping.visit(self.position)
 
     def _update_cache(self, identifier, add_neighbors = True,
             current_room = None):
@@ -193,9 +635,10 @@ class MazeWalker(object):
 
         :param str identifier: The identifier of the room.
 
-        :param bool add_neighbors: Whether to also request neighbouring rooms.
-            If this is ``True``, every immediately reachable neighbour is also
-            retrieved.
+        :param bool add_neighbors: Whether to also update neighbouring rooms.
+            If this is ``True``, every immediately reachable neighbour that is
+            not already known is updated, and retrieved if it is not included
+            in the room data.
 
         :param dict current_room:
             A value to use as the current room instead of querying the server.
@@ -204,37 +647,36 @@ class MazeWalker(object):
             will be queried.
         """
         # Get the current room
-        data = current_room or self._get('/maze/%s' % identifier)
-        room_pos = (int(data.position.x), int(data.position.y))
-        room = self.maze[room_pos]
+        data = current_room or self._get_rooms([identifier])[0]
+        self._update_room(identifier, data)
 
-        # Make sure that the room is what we expect
-        if (data.center.x, data.center.y) != self.maze.get_center(room_pos):
-            raise ValueError('Unexpecter center for room %s: %s' % (
-                str(room_pos), str(data.center)))
+        # Update the neighbour rooms; only rooms not already known and not
+        # included in data are retrieved
+        if add_neighbors:
+            missing = self._update_neighbors(data)
+            if missing:
+                for neighbor, neighbor_data in zip(
+                        missing, self._get_rooms(missing)):
+                    self._update_room(neighbor, neighbor_data)
 
-        # Update the room
-        room.identifier = identifier
-        self.mapping[room.identifier] = room_pos
+    def _get_rooms(self, identifiers):
+        """Retrieves rooms from the server.
 
-        # Update the doors
-        for wall in self.maze.walls(room_pos):
-            try:
-                if not self.maze.edge(wall):
-                    self.maze[room_pos][wall] = next(
-                        not unwrap(w.target) is None
-                        for w in data.walls
-                        if w.span.start == wall.span[0])
-            except StopIteration:
-                raise ValueError('Wall %s not found for room %s' % (
-                    wall.NAMES[int(wall)], str(room_pos)))
+        :param identifiers: The identifiers of the rooms to retrieve.
+        :type identifiers: [int]
 
-        # Update the neighbour rooms
-        if add_neighbors:
-            for w in data.walls:
-                if w.target:
-                    self._update_cache(w.target.identifier, False, w.target)
+        Several rooms are retrieved with a single request.
 
+        :return: a :term:`recursive room dict` for every room
+
+        :raises AssertionError: if the server does not return a room
+        """
+        self.counters.increment('requests', len(identifiers))
+        if len(identifiers) == 1:
+            return [self._get('/maze/%s' % identifiers[0])]
+        else:
+            return self._select_rooms(identifiers, self._get(
+                self._rooms_path(identifiers)))
 
     def _req(self, method, path, data = None):
         """Performs an HTTP request to the server for path.
@@ -246,17 +688,42 @@ class MazeWalker(object):
         :param data: The data to send.
         :type data: dict or None
 
-        :return: the JSON decoded response, or None for HTTP status 204
+        If the connection fails, the request is retried on a new connection at
+        most ``retries`` times; see :meth:`__init__`. The round-trip time of the
+        successful attempt is added to ``latencies``.
+
+        :return: the decoded response, or None for HTTP status 204
         :rtype: dict or None
+
+        :raises socket.error: if the connection failed for all attempts
         """
         headers = {
             'Cookie': self.cookies}
+        if self.binary:
+            headers['Accept'] = wire.MEDIA_TYPE
         if data:
             headers['Content-Type'] = 'application/json'
             data = json.dumps(data)
 
-        self.connection.request(method, path, data, headers = headers)
-        response = self.connection.getresponse()
+        for attempt in range(self.retries + 1):
+            sent = False
+            try:
+                start = timeit.default_timer()
+                self.connection.request(method, path, data, headers = headers)
+                sent = True
+                response = self.connection.getresponse()
+                break
+            except (HTTPException, socket.error):
+                # A stale keep-alive connection fails either when sending or
+                # when reading the status line; the server may have handled a
+                # request that was sent, so only idempotent requests are then
+                # retried
+                self.connection.close()
+                self.connection = HTTPConnection(self.host, self.port)
+                if attempt == self.retries \
+                        or (sent and not method in IDEMPOTENT):
+                    raise
+                self.counters.increment('reconnects')
 
         try:
             # Map HTTP status 400 to ValueError
@@ -269,14 +736,18 @@ class MazeWalker(object):
                 'The server responded %d for %s %s' % (
                     response.status, method, path)
 
-            # Make sure the data, if received, is application/json
-            data = response.read().decode('ascii')
-            assert (response.getheader('Content-Type') == 'application/json'
-                    or not data), \
+            # Make sure the data, if received, is application/json or binary
+            content_type = response.getheader('Content-Type')
+            data = response.read()
+            self.latencies.add(method, timeit.default_timer() - start)
+            if response.status != 200:
+                return None
+            elif self.binary and content_type == wire.MEDIA_TYPE:
+                return wrap(wire.loads(data, self.geometry))
+            assert content_type == 'application/json' or not data, \
                 'The server did not respond with JSON data'
 
-            return wrap(json.loads(data)) \
-                if response.status == 200 else None
+            return wrap(json.loads(data.decode('ascii')))
         finally:
             response.close()
 
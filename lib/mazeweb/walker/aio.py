@@ -0,0 +1,488 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""An asynchronous maze walker.
+
+:class:`AsyncMazeWalker` has the same interface as
+:class:`mazeweb.walker.MazeWalker`, except that all methods that communicate
+with the server are coroutines, and that the current room is changed with
+:meth:`AsyncMazeWalker.set_current_room` and
+:meth:`AsyncMazeWalker.set_position`. Many walkers may share one
+:class:`ConnectionPool`, so that thousands of sessions can be driven from a
+single process.
+
+This module requires Python 3.5 or later.
+"""
+
+import asyncio
+import heapq
+import json
+import timeit
+
+from mazeweb.util import wire
+from mazeweb.util.data import wrap, unwrap
+
+from . import BaseMazeWalker
+
+
+class Response(object):
+    """A response to a request made through a :class:`ConnectionPool`.
+
+    :param int status: The HTTP status.
+
+    :param dict headers: The response headers, with lower case names.
+
+    :param bytes data: The response body.
+    """
+    __slots__ = (
+        'status',
+        'headers',
+        'data')
+
+    def __init__(self, status, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+
+class ConnectionPool(object):
+    """A pool of keep-alive HTTP connections to a single server.
+
+    At most ``size`` requests are in progress at the same time; other requests
+    wait for a connection to become available. Connections are reused unless
+    the server closes them.
+
+    :param str host: The server host.
+
+    :param int port: The server port.
+
+    :param int size: The maximum number of connections.
+    """
+    def __init__(self, host = 'localhost', port = 8080, size = 16):
+        self.host = host
+        self.port = port
+        self.size = size
+        self._idle = []
+        self._semaphore = asyncio.Semaphore(size)
+
+    async def request(self, method, path, body = None, headers = {}):
+        """Performs an HTTP request.
+
+        If a reused connection turns out to have been closed by the server, the
+        request is retried once on a new connection.
+
+        :param str method: The HTTP method.
+
+        :param str path: The path.
+
+        :param bytes body: The request body.
+
+        :param dict headers: Additional request headers.
+
+        :rtype: Response
+
+        :raises ConnectionError: if the request cannot be sent
+        """
+        async with self._semaphore:
+            while True:
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused \
+                    else await asyncio.open_connection(self.host, self.port)
+                try:
+                    response, keep_alive = await self._exchange(
+                        reader, writer, method, path, body, headers)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused:
+                        continue
+                    raise
+                except:
+                    writer.close()
+                    raise
+
+                if keep_alive:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+                return response
+
+    async def _exchange(self, reader, writer, method, path, body, headers):
+        """Sends a request and reads the response on a connection.
+
+        :return: the tuple ``(response, keep_alive)``
+
+        :raises ConnectionError: if the connection was closed before a
+            response was received
+        """
+        body = body or b''
+        lines = ['%s %s HTTP/1.1' % (method, path),
+            'Host: %s:%d' % (self.host, self.port),
+            'Content-Length: %d' % len(body)]
+        lines.extend('%s: %s' % item for item in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        writer.write(body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('the connection was closed')
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+
+        response_headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+            if not line:
+                break
+            name, value = line.split(':', 1)
+            response_headers[name.strip().lower()] = value.strip()
+
+        connection = response_headers.get('connection', '').lower()
+        keep_alive = connection == 'keep-alive' \
+            or (version == 'HTTP/1.1' and connection != 'close')
+        if 'content-length' in response_headers:
+            data = await reader.readexactly(
+                int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding') == 'chunked':
+            chunks = []
+            while True:
+                length = int((await reader.readline()).split(b';')[0], 16)
+                chunks.append(await reader.readexactly(length + 2))
+                if not length:
+                    break
+            data = b''.join(chunk[:-2] for chunk in chunks)
+        elif status in ('204', '304'):
+            data = b''
+        else:
+            data = await reader.read()
+            keep_alive = False
+
+        return (Response(int(status), response_headers, data), keep_alive)
+
+    def close(self):
+        """Closes all idle connections.
+        """
+        while self._idle:
+            reader, writer = self._idle.pop()
+            writer.close()
+
+
+class AsyncMazeWalker(BaseMazeWalker):
+    """A maze walker using :mod:`asyncio`.
+
+    Instances are created with the coroutine :meth:`create`, and should be
+    closed with :meth:`close` to delete the session on the server.
+    """
+    def __init__(self, pool, binary = False, delta = False):
+        self.pool = pool
+        self.binary = binary
+        self.delta = delta
+        self.geometry = None
+        self.cookies = None
+        self._reset_statistics()
+
+    @classmethod
+    async def create(self, host = 'localhost', port = 8080, width = 20,
+            height = 15, binary = False, delta = False, pool = None,
+            **options):
+        """Creates a new maze walker.
+
+        :param str host: The maze crawler host. This is ignored if ``pool`` is
+            specified.
+
+        :param int port: The port. This is ignored if ``pool`` is specified.
+
+        :param int width: The width of the maze
+
+        :param int height: The height of the maze.
+
+        :param bool binary: Whether to request responses in the binary wire
+            format described in :mod:`mazeweb.util.wire` instead of JSON.
+
+        :param bool delta: Whether to request only the rooms that became
+            visible when moving; see :class:`mazeweb.walker.MazeWalker`.
+
+        :param ConnectionPool pool: The connection pool to use. If this is not
+            specified, a new pool is created.
+
+        :rtype: AsyncMazeWalker
+
+        :raises AssertionError: if no cookies were retrieved from the server
+
+        :raises ValueError: if the size of the maze created on the server was
+            different from the requested size
+        """
+        result = self(pool or ConnectionPool(host, port), binary, delta)
+
+        # Make an initial request to get the session ID
+        response = await result.pool.request('GET', '/')
+        result.cookies = response.headers.get('set-cookie')
+        assert result.cookies, \
+            'No session ID was saved'
+
+        # Initialise a new maze and get its properties
+        data = await result._post('/maze', dict(
+            width = width,
+            height = height,
+            **options))
+        result._initialize(data, width, height)
+
+        # Retrieve the current room
+        await result.set_current_room(data.current_room.identifier)
+
+        return result
+
+    @classmethod
+    def resume(self, f, host = 'localhost', port = 8080, binary = False,
+            delta = False, pool = None):
+        """Resumes a walk saved with :meth:`save`.
+
+        See :meth:`mazeweb.walker.MazeWalker.resume`.
+
+        :param ConnectionPool pool: The connection pool to use. If this is not
+            specified, a new pool is created.
+
+        :rtype: AsyncMazeWalker
+        """
+        result = self(pool or ConnectionPool(host, port), binary, delta)
+        result._restore(f)
+        return result
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Deletes the session on the server.
+        """
+        if self.cookies:
+            try:
+                await self._delete('/maze')
+            finally:
+                self.cookies = None
+
+    async def set_current_room(self, value):
+        """Sets the current room identifier.
+
+        :param int value: The identifier of the new current room.
+        """
+        await self._move(value, self._move_request(
+            current_room = value))
+
+    async def set_position(self, value):
+        """Sets the current room position.
+
+        :param value: The position of the new current room.
+        :type value: (int, int)
+
+        :raises ValueError: if the room is not known
+        """
+        await self.set_current_room(self._identifier(value))
+
+    async def follow(self, room_positions):
+        """Moves through a sequence of rooms in a single request.
+
+        See :meth:`mazeweb.walker.MazeWalker.follow`.
+        """
+        if not room_positions:
+            return
+
+        path = self._path(room_positions)
+        await self._move(path[-1], self._move_request(
+            path = path))
+
+    async def return_to(self, room_position):
+        """Walks to a visited room along the shortest path through visited
+        rooms.
+
+        See :meth:`mazeweb.walker.MazeWalker.return_to`.
+
+        :return: the positions of the rooms on the path, excluding the current
+            room
+        :rtype: [(int, int)]
+        """
+        path = unwrap((await self._get('/maze/path?to=%d' % self._identifier(
+            room_position))).path)
+        if path:
+            await self._move(path[-1], self._move_request(
+                path = path))
+        return [self.mapping[identifier] for identifier in path]
+
+    async def walk_to(self, room_position):
+        """Walks from the current room to ``room_position``.
+
+        See :meth:`mazeweb.walker.MazeWalker.walk_to`. The search of
+        :meth:`maze.BaseMaze.walk_path` is run on the event loop, and the move
+        to every room it visits is awaited before the search continues, since
+        visiting a room reveals its doors.
+
+        :return: the positions of all rooms from the current room to the target
+            room
+        :rtype: [(int, int)]
+
+        :raises ValueError: if room_position is outside of the maze or the rooms
+            are not connected
+        """
+        start = self.position
+        if not room_position in self.maze:
+            raise ValueError(room_position)
+
+        def h(room_pos):
+            """The heuristic for a room"""
+            return sum(abs(t - f) for f, t in zip(room_pos, room_position))
+
+        # The rooms pending evaluation, as a heap of (f, g, room_pos); rooms
+        # are pushed again when a shorter path is found, and the stale entries
+        # are skipped
+        open_heap = [(h(start), 0, start)]
+        g_score = {start: 0}
+        came_from = {}
+        closed_set = set()
+
+        while open_heap:
+            f, g, current = heapq.heappop(open_heap)
+            if current in closed_set:
+                continue
+
+            # Make sure to walk the entire path to the next room; the path is
+            # sent in a single request
+            if not self.is_reachable(current):
+                await self.follow(list(self.maze.walk_path(
+                    self.position, current))[1:])
+            else:
+                await self.set_position(current)
+
+            if current == room_position:
+                path = [current]
+                while current != start:
+                    current = came_from[current]
+                    path.append(current)
+                return path[::-1]
+
+            closed_set.add(current)
+            for wall in self.maze.doors(current):
+                next = wall.back.room_pos
+                if next in closed_set or not next in self.maze:
+                    continue
+                if not next in g_score or g + 1 < g_score[next]:
+                    came_from[next] = current
+                    g_score[next] = g + 1
+                    heapq.heappush(open_heap, (g + 1 + h(next), g + 1, next))
+
+        raise ValueError(room_position)
+
+    async def _move(self, identifier, request):
+        """Moves the current room and updates the cache from the response.
+
+        See :meth:`mazeweb.walker.MazeWalker._move`.
+        """
+        moved = identifier != getattr(self, '_current_room', identifier)
+        data = await self._put('/maze', request)
+        self._current_room = identifier
+
+        if not self.delta:
+            self.version = data.version
+            await self._update_cache(identifier, True, data.current_room)
+        elif not self._is_delta_valid(data, moved):
+            self.counters.increment('resyncs')
+            data = await self._get('/maze')
+            self.version = data.version
+            await self._update_cache(identifier, True, data.current_room)
+        else:
+            missing = self._update_delta(identifier, data)
+            if missing:
+                for neighbor, neighbor_data in zip(
+                        missing, await self._get_rooms(missing)):
+                    self._update_room(neighbor, neighbor_data)
+        self.mapping.visit(self.position)
+
+    async def _update_cache(self, identifier, add_neighbors = True,
+            current_room = None):
+        """Retrieves the specified room from the server and updates the cache.
+
+        See :meth:`mazeweb.walker.MazeWalker._update_cache`.
+        """
+        data = current_room or (await self._get_rooms([identifier]))[0]
+        self._update_room(identifier, data)
+
+        if add_neighbors:
+            missing = self._update_neighbors(data)
+            if missing:
+                for neighbor, neighbor_data in zip(
+                        missing, await self._get_rooms(missing)):
+                    self._update_room(neighbor, neighbor_data)
+
+    async def _get_rooms(self, identifiers):
+        """Retrieves rooms from the server.
+
+        See :meth:`mazeweb.walker.MazeWalker._get_rooms`.
+        """
+        self.counters.increment('requests', len(identifiers))
+        if len(identifiers) == 1:
+            return [await self._get('/maze/%s' % identifiers[0])]
+        else:
+            return self._select_rooms(identifiers, await self._get(
+                self._rooms_path(identifiers)))
+
+    async def _req(self, method, path, data = None):
+        """Performs an HTTP request to the server for path.
+
+        See :meth:`mazeweb.walker.MazeWalker._req`. Failed connections are
+        retried by the connection pool.
+        """
+        headers = {
+            'Cookie': self.cookies}
+        if self.binary:
+            headers['Accept'] = wire.MEDIA_TYPE
+        if data:
+            headers['Content-Type'] = 'application/json'
+            data = json.dumps(data).encode('utf-8')
+
+        start = timeit.default_timer()
+        response = await self.pool.request(method, path, data, headers)
+        self.latencies.add(method, timeit.default_timer() - start)
+
+        # Map HTTP status 400 to ValueError
+        if response.status == 400:
+            raise ValueError('The server responded "%s" for %s %s' % (
+                response.data, method, path))
+
+        # Make sure the response is one we allow
+        assert response.status in (200, 204), \
+            'The server responded %d for %s %s' % (
+                response.status, method, path)
+
+        content_type = response.headers.get('content-type')
+        if response.status != 200:
+            return None
+        elif self.binary and content_type == wire.MEDIA_TYPE:
+            return wrap(wire.loads(response.data, self.geometry))
+        assert content_type == 'application/json' or not response.data, \
+            'The server did not respond with JSON data'
+
+        return wrap(json.loads(response.data.decode('ascii')))
+
+    def _get(self, path):
+        return self._req('GET', path)
+
+    def _put(self, path, data):
+        return self._req('PUT', path, data)
+
+    def _post(self, path, data):
+        return self._req('POST', path, data)
+
+    def _delete(self, path):
+        return self._req('DELETE', path)
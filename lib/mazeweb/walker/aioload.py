@@ -0,0 +1,134 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""The :mod:`asyncio` mode of :mod:`mazeweb.walker.load`.
+
+This module requires Python 3.5 or later.
+"""
+
+import asyncio
+import random
+import timeit
+
+from .aio import AsyncMazeWalker, ConnectionPool
+from .load import Results, route
+
+
+class LoadAsyncMazeWalker(AsyncMazeWalker):
+    """An asynchronous maze walker recording the latency and errors of every
+    request in a :class:`mazeweb.walker.load.Results`.
+
+    See :class:`mazeweb.walker.load.LoadMazeWalker`. Since walkers are
+    created by :meth:`create`, the results are a class attribute; use
+    :meth:`for_results` to create a subclass recording to specific results.
+    """
+    #: The results to update
+    results = None
+
+    @classmethod
+    def for_results(self, results):
+        """Returns a subclass recording to ``results``.
+
+        :param mazeweb.walker.load.Results results: The results to update.
+        """
+        return type(self.__name__, (self,), dict(results = results))
+
+    async def _req(self, method, path, data = None):
+        name = route(method, path)
+        start = timeit.default_timer()
+        try:
+            result = await super(LoadAsyncMazeWalker, self)._req(
+                method, path, data)
+        except:
+            self.results.record(name)
+            raise
+        self.results.record(name, timeit.default_timer() - start)
+        return result
+
+
+async def walk(walker, options, rng):
+    """Walks a maze.
+
+    See :func:`mazeweb.walker.load.walk`.
+    """
+    if options['walk'] == 'random':
+        for i in range(options['steps']):
+            wall = rng.choice(list(walker.maze.doors(walker.position)))
+            await walker.set_position(wall.back.room_pos)
+    else:
+        room_pos = walker.random_frontier(rng)
+        while not room_pos is None:
+            await walker.walk_to(room_pos)
+            room_pos = walker.random_frontier(rng)
+
+
+async def run_walker(options, index, pool, results):
+    """Runs a single walker.
+
+    See :func:`mazeweb.walker.load.run_walker`.
+
+    :param ConnectionPool pool: The connection pool shared by all walkers.
+
+    :param mazeweb.walker.load.Results results: The results to update.
+    """
+    rng = random.Random(options['seed'] + index)
+    walker_class = LoadAsyncMazeWalker.for_results(results)
+    for i in range(options['mazes']):
+        walker = None
+        try:
+            walker = await walker_class.create(
+                width = options['width'],
+                height = options['height'],
+                walls = options['walls'],
+                binary = options['binary'],
+                delta = options['delta'],
+                pool = pool)
+            await walk(walker, options, rng)
+            results.walks += 1
+        except Exception:
+            results.failed_walks += 1
+        finally:
+            if not walker is None:
+                try:
+                    await walker.close()
+                except Exception:
+                    pass
+
+
+def run_tasks(options):
+    """Runs every walker as a task in a single event loop.
+
+    :param dict options: The options of the run; see
+        :func:`mazeweb.walker.load.main`.
+
+    :rtype: mazeweb.walker.load.Results
+    """
+    async def inner():
+        pool = ConnectionPool(options['host'], options['port'],
+            options['connections'] or options['walkers'])
+        try:
+            await asyncio.gather(*(
+                run_walker(options, index, pool, results)
+                for index in range(options['walkers'])))
+        finally:
+            pool.close()
+
+    results = Results()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(inner())
+    finally:
+        loop.close()
+    return results
@@ -0,0 +1,326 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""The rooms known to a maze walker.
+
+A :class:`RoomIndex` keeps the identifier and door mask of every known room in
+arrays indexed like the backing arrays of
+:class:`mazeweb.util.state.MazeView`, so the position of a room maps to its
+index as ``x * height + y``. Only the reverse mapping, from identifier to
+index, is a dict.
+
+An index is saved with :meth:`RoomIndex.dump` as :data:`HEADER` followed by
+``width * height`` identifiers and ``width * height`` flag bytes, all little
+endian. The flag byte of a room is its door mask, with :data:`KNOWN` and
+:data:`VISITED` added.
+"""
+
+import array
+import struct
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+
+#: The magic bytes that start every saved index
+MAGIC = b'MI'
+
+#: The version of the saved format
+VERSION = 1
+
+#: The header of a saved index; the fields are the magic bytes, the format
+#: version, the width and the height
+HEADER = struct.Struct('<2sBII')
+
+#: The flag set for rooms whose identifier and doors are known
+KNOWN = 1 << 6
+
+#: The flag set for rooms that have been the current room
+VISITED = 1 << 7
+
+#: The flags that are not part of the door mask
+FLAGS = KNOWN | VISITED
+
+#: The array type code used for room identifiers; identifiers are 32 bit values
+ID_TYPECODE = next(t for t in ('I', 'L') if array.array(t).itemsize == 4)
+
+
+class KnownRoom(object):
+    """A room in a :class:`RoomIndex`.
+
+    Instances are created when a room is looked up; they are not kept by the
+    index.
+    """
+    __slots__ = (
+        'identifier',
+        'position',
+        'doors',
+        'visited')
+
+    def __init__(self, identifier, position, doors, visited):
+        #: The room identifier
+        self.identifier = identifier
+
+        #: The room position
+        self.position = position
+
+        #: The door mask, with the bit ``1 << wall`` set for every door
+        self.doors = doors
+
+        #: Whether the room has been the current room
+        self.visited = visited
+
+    def __repr__(self):
+        return 'KnownRoom(%d, %s)' % (self.identifier, str(self.position))
+
+
+class RoomIndex(Mapping):
+    """The rooms known to a maze walker.
+
+    Instances are mappings from room identifier to room position.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        count = width * height
+        self._identifiers = array.array(ID_TYPECODE, (0,)) * count
+        self._flags = bytearray(count)
+        self._indices = {}
+
+        # The indices of the known rooms that have not been visited, in no
+        # particular order, and the position of every index in the list, so
+        # that random rooms are chosen and rooms removed in constant time
+        self._frontier = []
+        self._frontier_positions = {}
+
+    def __getitem__(self, identifier):
+        return divmod(self._indices[identifier], self.height)
+
+    def __contains__(self, identifier):
+        return identifier in self._indices
+
+    def __iter__(self):
+        return iter(self._indices)
+
+    def __len__(self):
+        return len(self._indices)
+
+    def index(self, room_pos):
+        """Returns the index of a room in the backing arrays.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :rtype: int
+
+        :raises IndexError: if ``room_pos`` is outside of the maze
+        """
+        x, y = room_pos
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            raise IndexError(room_pos)
+        return x * self.height + y
+
+    def add(self, identifier, room_pos, doors):
+        """Adds a room, or updates a known room.
+
+        :param int identifier: The room identifier.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :param int doors: The door mask of the room.
+
+        :raises IndexError: if ``room_pos`` is outside of the maze
+        """
+        index = self.index(room_pos)
+        flags = self._flags[index]
+        if flags & KNOWN:
+            self._indices.pop(self._identifiers[index], None)
+        self._identifiers[index] = identifier
+        self._flags[index] = doors | KNOWN | (flags & VISITED)
+        self._indices[identifier] = index
+        if not flags & VISITED:
+            self._add_frontier(index)
+
+    def visit(self, room_pos):
+        """Marks a known room as visited.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :raises KeyError: if the room is not known
+        """
+        index = self._known(room_pos)
+        self._flags[index] |= VISITED
+        self._remove_frontier(index)
+
+    def room(self, room_pos):
+        """Returns a known room.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :rtype: KnownRoom
+
+        :raises IndexError: if ``room_pos`` is outside of the maze
+
+        :raises KeyError: if the room is not known
+        """
+        index = self._known(room_pos)
+        flags = self._flags[index]
+        return KnownRoom(
+            self._identifiers[index],
+            room_pos,
+            flags & ~FLAGS,
+            bool(flags & VISITED))
+
+    def identifier(self, room_pos):
+        """Returns the identifier of a known room.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :rtype: int
+
+        :raises IndexError: if ``room_pos`` is outside of the maze
+
+        :raises KeyError: if the room is not known
+        """
+        return self._identifiers[self._known(room_pos)]
+
+    def is_known(self, room_pos):
+        """Returns whether a room is known.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :rtype: bool
+        """
+        try:
+            return bool(self._flags[self.index(room_pos)] & KNOWN)
+        except IndexError:
+            return False
+
+    @property
+    def frontier(self):
+        """The positions of the known rooms that have not been visited"""
+        height = self.height
+        return set(divmod(index, height) for index in self._frontier)
+
+    def random_frontier(self, rng):
+        """Returns the position of a random known room that has not been
+        visited.
+
+        :param random.Random rng: The random number generator.
+
+        :return: the position of the room, or ``None`` if all known rooms have
+            been visited
+        :rtype: (int, int) or None
+        """
+        if not self._frontier:
+            return None
+        return divmod(rng.choice(self._frontier), self.height)
+
+    def known(self):
+        """Yields the known rooms.
+
+        :return: a generator of :class:`KnownRoom`
+        """
+        for index in sorted(self._indices.values()):
+            yield self.room(divmod(index, self.height))
+
+    def dump(self, f):
+        """Writes this index to a file.
+
+        :param f: A file opened for binary writing.
+        """
+        count = self.width * self.height
+        f.write(HEADER.pack(MAGIC, VERSION, self.width, self.height))
+        f.write(struct.pack('<%dI' % count, *self._identifiers))
+        f.write(bytes(self._flags))
+
+    @classmethod
+    def load(self, f):
+        """Reads an index written by :meth:`dump`.
+
+        :param f: A file opened for binary reading.
+
+        :rtype: RoomIndex
+
+        :raises ValueError: if the file does not contain an index
+        """
+        try:
+            magic, version, width, height = HEADER.unpack(f.read(HEADER.size))
+        except struct.error:
+            raise ValueError('data is too short')
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('data is not a room index')
+
+        result = self(width, height)
+        count = width * height
+        try:
+            result._identifiers = array.array(ID_TYPECODE, struct.unpack(
+                '<%dI' % count, f.read(4 * count)))
+        except struct.error:
+            raise ValueError('data is too short')
+        result._flags = bytearray(f.read(count))
+        if len(result._flags) != count:
+            raise ValueError('data is too short')
+
+        for index, flags in enumerate(result._flags):
+            if flags & KNOWN:
+                result._indices[result._identifiers[index]] = index
+                if not flags & VISITED:
+                    result._add_frontier(index)
+        return result
+
+    def _add_frontier(self, index):
+        """Adds a room index to the frontier unless it is already there.
+        """
+        if not index in self._frontier_positions:
+            self._frontier_positions[index] = len(self._frontier)
+            self._frontier.append(index)
+
+    def _remove_frontier(self, index):
+        """Removes a room index from the frontier if it is there.
+
+        The last index of the list is moved to the position of the removed
+        index.
+        """
+        position = self._frontier_positions.pop(index, None)
+        if position is None:
+            return
+        last = self._frontier.pop()
+        if last != index:
+            self._frontier[position] = last
+            self._frontier_positions[last] = position
+
+    def _known(self, room_pos):
+        """Returns the index of a known room.
+
+        :raises IndexError: if ``room_pos`` is outside of the maze
+
+        :raises KeyError: if the room is not known
+        """
+        index = self.index(room_pos)
+        if not self._flags[index] & KNOWN:
+            raise KeyError(room_pos)
+        return index
@@ -0,0 +1,369 @@
+# coding: utf-8
+# mazeweb
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""A load generator for the maze crawler.
+
+Run as ``python -m mazeweb.walker.load --help`` for a list of options.
+
+A number of concurrent walkers are started, either as processes or, on Python
+3.5 and later, as :mod:`asyncio` tasks sharing a connection pool. Every walker
+creates mazes and walks them, either randomly or until every room has been
+visited. When all walkers have finished, a report is printed as JSON:
+
+.. code-block:: json
+
+    {
+        "duration": 12.5,
+        "errors": 0,
+        "options": {"walkers": 8, "mazes": 4, "...": "..."},
+        "requests": 10240,
+        "routes": {
+            "PUT /maze": {
+                "count": 8192,
+                "errors": 0,
+                "error_rate": 0.0,
+                "p50": 0.002,
+                "p95": 0.005,
+                "p99": 0.01
+            }
+        },
+        "throughput": 819.2,
+        "walks": 32,
+        "failed_walks": 0
+    }
+
+Routes are named by method and path, with room identifiers replaced by
+``<id>`` and query strings removed. Percentiles are the upper bounds, in
+seconds, of the :class:`mazeweb.util.counters.Histograms` buckets containing
+them, and are ``null`` if they exceed the largest bound.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import timeit
+
+from mazeweb.util.counters import Histograms
+
+from . import MazeWalker
+
+
+#: The walk strategies
+WALKS = ('random', 'explore')
+
+#: The concurrency modes
+MODES = ('process', 'asyncio')
+
+
+def route(method, path):
+    """Returns the name of the route of a request.
+
+    :param str method: The HTTP method.
+
+    :param str path: The path, possibly with a query string.
+
+    :return: the method and the path with numeric segments replaced by
+        ``<id>``, such as ``'GET /maze/<id>'``
+    :rtype: str
+    """
+    return '%s %s' % (method, '/'.join(
+        '<id>' if segment.isdigit() else segment
+        for segment in path.split('?', 1)[0].split('/')))
+
+
+class Results(object):
+    """The results of one or more walkers.
+
+    Results from different processes are combined with :meth:`dump` and
+    :meth:`merge`.
+    """
+    def __init__(self):
+        self.latencies = Histograms()
+        self.errors = {}
+        self.walks = 0
+        self.failed_walks = 0
+
+    def record(self, name, seconds = None):
+        """Records a request.
+
+        :param str name: The name of the route; see :func:`route`.
+
+        :param float seconds: The latency of the request, or ``None`` if it
+            failed.
+        """
+        if seconds is None:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        else:
+            self.latencies.add(name, seconds)
+
+    def dump(self):
+        """Returns these results as a value that can be passed to
+        :meth:`merge`.
+
+        :rtype: dict
+        """
+        return dict(
+            latencies = self.latencies.stats(),
+            errors = dict(self.errors),
+            walks = self.walks,
+            failed_walks = self.failed_walks)
+
+    def merge(self, value):
+        """Adds results returned by :meth:`dump`.
+
+        :param dict value: The results to add.
+        """
+        self.latencies.merge(value['latencies'])
+        for name, count in value['errors'].items():
+            self.errors[name] = self.errors.get(name, 0) + count
+        self.walks += value['walks']
+        self.failed_walks += value['failed_walks']
+
+    def report(self, duration, options):
+        """Returns the report of a load generation run.
+
+        :param float duration: The duration of the run, in seconds.
+
+        :param dict options: The options of the run.
+
+        :rtype: dict
+        """
+        stats = self.latencies.stats()
+        routes = {}
+        for name in set(stats) | set(self.errors):
+            count = stats[name]['count'] if name in stats else 0
+            errors = self.errors.get(name, 0)
+            routes[name] = dict(
+                count = count,
+                errors = errors,
+                error_rate = float(errors) / (count + errors),
+                p50 = stats[name]['p50'] if name in stats else None,
+                p95 = stats[name]['p95'] if name in stats else None,
+                p99 = stats[name]['p99'] if name in stats else None)
+
+        requests = sum(value['count'] for value in routes.values())
+        errors = sum(value['errors'] for value in routes.values())
+        return dict(
+            options = options,
+            duration = duration,
+            requests = requests,
+            errors = errors,
+            throughput = requests / duration if duration else None,
+            routes = routes,
+            walks = self.walks,
+            failed_walks = self.failed_walks)
+
+
+class LoadMazeWalker(MazeWalker):
+    """A maze walker recording the latency and errors of every request in a
+    :class:`Results`.
+
+    :param Results results: The results to update.
+
+    All other arguments are passed to :class:`mazeweb.walker.MazeWalker`.
+    """
+    def __init__(self, results, *args, **kwargs):
+        self.results = results
+        super(LoadMazeWalker, self).__init__(*args, **kwargs)
+
+    def close(self):
+        """Deletes the session on the server.
+        """
+        if self.cookies:
+            try:
+                self._delete('/maze')
+            finally:
+                self.detach()
+
+    def _req(self, method, path, data = None):
+        name = route(method, path)
+        start = timeit.default_timer()
+        try:
+            result = super(LoadMazeWalker, self)._req(method, path, data)
+        except:
+            self.results.record(name)
+            raise
+        self.results.record(name, timeit.default_timer() - start)
+        return result
+
+
+def walk(walker, options, rng):
+    """Walks a maze.
+
+    :param LoadMazeWalker walker: The walker.
+
+    :param dict options: The options of the run; see :func:`main`.
+
+    :param random.Random rng: The random number generator used to select
+        rooms.
+    """
+    if options['walk'] == 'random':
+        for i in range(options['steps']):
+            wall = rng.choice(list(walker.maze.doors(walker.position)))
+            walker.position = wall.back.room_pos
+    else:
+        room_pos = walker.random_frontier(rng)
+        while not room_pos is None:
+            walker.walk_to(room_pos)
+            room_pos = walker.random_frontier(rng)
+
+
+def run_walker(options, index):
+    """Runs a single walker.
+
+    :param dict options: The options of the run; see :func:`main`.
+
+    :param int index: The index of the walker, which is used to seed the
+        random number generator.
+
+    :return: the results, as returned by :meth:`Results.dump`
+    :rtype: dict
+    """
+    results = Results()
+    rng = random.Random(options['seed'] + index)
+    for i in range(options['mazes']):
+        walker = None
+        try:
+            walker = LoadMazeWalker(results,
+                host = options['host'],
+                port = options['port'],
+                width = options['width'],
+                height = options['height'],
+                walls = options['walls'],
+                binary = options['binary'],
+                delta = options['delta'])
+            walk(walker, options, rng)
+            results.walks += 1
+        except Exception:
+            results.failed_walks += 1
+        finally:
+            if not walker is None:
+                try:
+                    walker.close()
+                except Exception:
+                    pass
+
+    return results.dump()
+
+
+def _run_walker(args):
+    """Calls :func:`run_walker` with a tuple of arguments.
+    """
+    return run_walker(*args)
+
+
+def run_processes(options):
+    """Runs every walker in a separate process.
+
+    :param dict options: The options of the run; see :func:`main`.
+
+    :rtype: Results
+    """
+    results = Results()
+    pool = multiprocessing.Pool(options['walkers'])
+    try:
+        for value in pool.map(_run_walker, [
+                (options, index) for index in range(options['walkers'])]):
+            results.merge(value)
+    finally:
+        pool.terminate()
+    return results
+
+
+def run(options):
+    """Runs the load generator.
+
+    :param dict options: The options of the run; see :func:`main`.
+
+    :return: the report described in :mod:`mazeweb.walker.load`
+    :rtype: dict
+    """
+    start = timeit.default_timer()
+    if options['mode'] == 'asyncio':
+        from .aioload import run_tasks
+        results = run_tasks(options)
+    else:
+        results = run_processes(options)
+    return results.report(timeit.default_timer() - start, options)
+
+
+def main(argv = None):
+    """Parses the command line, runs the load generator and prints the report.
+
+    :param argv: The command line arguments. If this is not specified,
+        ``sys.argv[1:]`` is used.
+    :type argv: [str]
+    """
+    def size(value):
+        try:
+            width, height = (int(v) for v in value.split('x'))
+            return (width, height)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                '%s is not a valid size' % value)
+
+    parser = argparse.ArgumentParser(
+        prog = 'python -m mazeweb.walker.load',
+        description = 'Generates load on a maze crawler.')
+    parser.add_argument('--host', default = 'localhost',
+        help = 'The maze crawler host.')
+    parser.add_argument('--port', type = int, default = 8080,
+        help = 'The maze crawler port.')
+    parser.add_argument('--walkers', type = int, default = 4,
+        help = 'The number of concurrent walkers.')
+    parser.add_argument('--mode', choices = MODES, default = MODES[0],
+        help = 'Whether to run walkers as processes or asyncio tasks.')
+    parser.add_argument('--connections', type = int, default = None,
+        help = 'The number of connections shared by asyncio walkers; the '
+            'default is one per walker.')
+    parser.add_argument('--mazes', type = int, default = 1,
+        help = 'The number of mazes created by every walker.')
+    parser.add_argument('--size', type = size, default = (20, 15),
+        help = 'The size of the mazes, as WIDTHxHEIGHT.')
+    parser.add_argument('--walls', type = int, choices = (3, 4, 6),
+        default = 4,
+        help = 'The number of walls of every room.')
+    parser.add_argument('--walk', choices = WALKS, default = WALKS[0],
+        help = 'Whether to walk randomly or until all rooms are visited.')
+    parser.add_argument('--steps', type = int, default = 100,
+        help = 'The number of moves of random walks.')
+    parser.add_argument('--seed', type = int, default = 0,
+        help = 'The seed used to select rooms.')
+    parser.add_argument('--binary', action = 'store_true',
+        help = 'Request responses in the binary wire format.')
+    parser.add_argument('--delta', action = 'store_true',
+        help = 'Request delta responses when moving.')
+    parser.add_argument('--output', default = None,
+        help = 'The file to which to write the report.')
+
+    args = parser.parse_args(argv)
+    options = dict(vars(args))
+    options['width'], options['height'] = options.pop('size')
+    output = options.pop('output')
+    if args.mode == 'asyncio' and sys.version_info < (3, 5):
+        parser.error('asyncio requires Python 3.5 or later')
+
+    report = json.dumps(run(options), indent = 4, sort_keys = True)
+    if output:
+        with open(output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
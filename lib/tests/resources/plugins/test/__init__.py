@@ -1,3 +1,5 @@
+import bottle
+
 from .. import Plugin
 from mazeweb.crawler.plugin import MazePlugin
 
@@ -32,6 +34,18 @@ class UpdateMazePlugin(Plugin):
     def update_maze(self, maze, value, result):
         result['update_maze_plugin'] = value.get('update_maze_plugin', None)
 
+class VisitRoomPlugin(Plugin):
+    __plugin_name__ = 'visit_room'
+
+    def visit_room(self, maze, room_pos):
+        bottle.request.environ.setdefault('visit_room_plugin', []).append(
+            dict((c, rp) for c, rp in zip('xy', room_pos)))
+
+    def update_maze(self, maze, value, result):
+        result['visit_room_plugin'] = dict(
+            rooms = bottle.request.environ.get('visit_room_plugin', []),
+            visited = maze.is_visited(maze.current_room_index))
+
 class GetRoomPlugin(Plugin):
     __plugin_name__ = 'get_room'
 
@@ -161,7 +161,7 @@ def webtest(f):
     return test(inner)
 
 
-def get(path):
+def get(path, extra_headers = {}):
     """
     Retrieves the data at path for the most currently started server with HTTP
     GET.
@@ -171,10 +171,13 @@ def get(path):
 
     @param path
         The path to the data to get.
+    @param extra_headers
+        Additional request headers.
     @return the tuple (response_code, data)
     @raise AssertionError if the most currently started server is not running
     """
     c, headers = _get_connection_data()
+    headers.update(extra_headers)
 
     # Parse the data
     c.request('GET', path, headers = headers)
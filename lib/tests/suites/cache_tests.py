@@ -0,0 +1,119 @@
+from mazeweb.util.cache import LRUCache
+
+from ._util import webtest, get, post, put
+from .. import test, assert_exception
+
+
+@test
+def LRUCache_init():
+    """LRUCache creation with invalid arguments"""
+    with assert_exception(ValueError):
+        LRUCache(0)
+
+    with assert_exception(ValueError):
+        LRUCache(10, 100)
+
+
+@test
+def LRUCache_size():
+    """LRUCache evicts the least recently used item when full"""
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    cache['a']
+    cache['c'] = 3
+
+    assert 'a' in cache and 'c' in cache and not 'b' in cache, \
+        'The least recently used item was not evicted'
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 0, 1), \
+        'Invalid stats: %s' % str(stats)
+
+    with assert_exception(KeyError):
+        cache['b']
+    assert cache.stats()['misses'] == 1, \
+        'A miss was not counted'
+
+
+@test
+def LRUCache_memory():
+    """LRUCache evicts items when the memory limit is exceeded"""
+    cache = LRUCache(10, 10, len)
+    cache['a'] = 'xxxx'
+    cache['b'] = 'xxxx'
+    cache['c'] = 'xxxx'
+
+    assert len(cache) == 2 and not 'a' in cache, \
+        'The memory limit was not respected'
+    assert cache.stats()['used'] == 8, \
+        'The used memory was %d, not 8' % cache.stats()['used']
+
+    cache['d'] = 'x' * 11
+    assert len(cache) == 0 and cache.stats()['used'] == 0, \
+        'An item larger than the memory limit was cached'
+
+
+@webtest
+def stats_get():
+    """Test that GET /stats reports cache hits for mazes with equal seeds"""
+    status, data = post('/maze', dict(seed = 42))
+    assert status == 200, \
+        'POST /maze returned %d instead of 200' % status
+    first = data
+
+    status, data = get('/stats')
+    assert status == 200, \
+        'GET /stats returned %d instead of 200' % status
+    misses = data.cache.misses
+
+    status, data = post('/maze', dict(seed = 42))
+    assert data.current_room == first.current_room, \
+        'The same seed generated different mazes'
+
+    status, data = get('/stats')
+    assert data.cache.hits >= 1 and data.cache.misses == misses, \
+        'The cached maze was not used: %s' % str(data.cache)
+
+
+@webtest
+def stats_get_saves():
+    """Test that GET /stats reports the saves avoided for unmodified mazes"""
+    status, data = post('/maze', dict(seed = 42))
+    room_identifier = data.current_room.identifier
+
+    status, data = get('/stats')
+    saves = data.saves
+
+    put('/maze', dict(current_room = room_identifier))
+    status, data = get('/maze/%d' % room_identifier)
+    next_room = next(wall.target.identifier
+        for wall in data.walls
+        if wall.target)
+    put('/maze', dict(current_room = next_room))
+
+    status, data = get('/stats')
+    assert data.saves.full == saves.full, \
+        'The maze was saved in full: %s' % str(data.saves)
+    assert data.saves.current == saves.current + 1, \
+        'The current room was not saved: %s' % str(data.saves)
+    assert data.saves.avoided == saves.avoided + 2, \
+        'Saves were not avoided: %s' % str(data.saves)
+
+
+@webtest
+def stats_get_sessions():
+    """Test that GET /stats reports session cache hits for unmodified mazes"""
+    post('/maze', dict(seed = 42))
+
+    status, data = get('/stats')
+    hits = data.sessions.hits
+
+    status, first = get('/maze')
+    status, second = get('/maze')
+    assert first == second, \
+        'The cached maze differs: %s != %s' % (str(first), str(second))
+
+    status, data = get('/stats')
+    assert data.sessions.hits == hits + 2, \
+        'The cached session maze was not used: %s' % str(data.sessions)
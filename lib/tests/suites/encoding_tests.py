@@ -0,0 +1,43 @@
+import json
+
+from mazeweb.util import encoding
+
+from .. import test
+
+
+@test
+def encoding_dumps():
+    """encoding.dumps splices cached dicts"""
+    cached = encoding.CachedDict(a = 1, b = [1, 2, None])
+    value = dict(
+        cached = cached,
+        items = [cached, dict(nested = cached), 'text'],
+        number = 1.5)
+
+    assert json.loads(encoding.dumps(value)) == json.loads(json.dumps(value)), \
+        'Invalid encoding: %s' % encoding.dumps(value)
+    assert json.loads(encoding.dumps(cached)) == dict(cached), \
+        'Invalid encoding of a cached dict: %s' % encoding.dumps(cached)
+    assert value['items'][1]['nested'] is cached, \
+        'The encoded value was modified'
+
+
+@test
+def encoding_CachedDict():
+    """CachedDict caches its representation"""
+    cached = encoding.CachedDict(a = 1)
+    first = encoding.dumps([cached])
+    cached['b'] = 2
+    assert encoding.dumps([cached]) == first, \
+        'The cached representation was not used'
+
+
+@test
+def encoding_placeholder():
+    """encoding.dumps does not replace placeholders in other strings"""
+    value = [
+        encoding.CachedDict(a = 1),
+        encoding._PLACEHOLDER + '0']
+    assert json.loads(encoding.dumps(value)) == [
+            dict(a = 1), encoding._PLACEHOLDER + '0'], \
+        'A placeholder string was replaced: %s' % encoding.dumps(value)
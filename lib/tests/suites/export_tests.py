@@ -0,0 +1,88 @@
+import json
+import struct
+
+from mazeweb import util
+from mazeweb.util import export, state, wire
+
+from ._util import webtest, get, maze_reset
+from .. import test
+
+
+@test
+def export_ndjson():
+    """export.ndjson exports all rooms"""
+    for walls in state.VIEW_CLASSES:
+        maze, remaining = util.new(width = 5, height = 4, walls = walls,
+            seed = 5)
+        lines = [json.loads(line) for line in export.ndjson(maze)]
+
+        header = lines[0]
+        assert header == dict(
+                walls = walls,
+                width = 5,
+                height = 4,
+                start_room = maze[(0, 0)].identifier,
+                current_room = maze.current_room), \
+            'Invalid header: %s' % str(header)
+
+        assert len(lines) == 1 + maze.height, \
+            'Invalid number of rows: %d' % (len(lines) - 1)
+        for row in lines[1:]:
+            y = row['y']
+            for x in range(maze.width):
+                assert row['identifiers'][x] == maze[(x, y)].identifier, \
+                    'Invalid identifier for %s' % str((x, y))
+                assert row['doors'][x] == sum(
+                        1 << w for w in maze[(x, y)].doors), \
+                    'Invalid doors for %s' % str((x, y))
+
+
+@test
+def export_binary():
+    """export.binary exports all rooms"""
+    maze, remaining = util.new(width = 5, height = 4, seed = 5)
+    chunks = list(export.binary(maze))
+
+    walls, width, height, start_room = wire.MAZE.unpack_from(chunks[0])
+    current_room, = export.CURRENT.unpack_from(chunks[0], wire.MAZE.size)
+    assert (walls, width, height, start_room, current_room) == (
+            4, 5, 4, maze[(0, 0)].identifier, maze.current_room), \
+        'Invalid header'
+
+    row = struct.Struct('<5I5B')
+    for y, chunk in enumerate(chunks[1:]):
+        values = row.unpack(chunk)
+        for x in range(maze.width):
+            assert values[x] == maze[(x, y)].identifier, \
+                'Invalid identifier for %s' % str((x, y))
+            assert values[maze.width + x] == sum(
+                    1 << w for w in maze[(x, y)].doors), \
+                'Invalid doors for %s' % str((x, y))
+
+
+@webtest
+def export_get():
+    """Test GET /maze/export"""
+    maze_reset(width = 7, height = 6)
+
+    status, data = get('/maze/export')
+    assert status == 403, \
+        'GET /maze/export without a token returned %d instead of 403' % status
+
+    status, data = get('/maze/export', {
+        'Authorization': 'Bearer invalid'})
+    assert status == 403, \
+        'GET /maze/export with an invalid token returned %d instead of 403' % (
+            status)
+
+    status, data = get('/maze/export', {
+        'Authorization': 'Bearer operator'})
+    assert status == 200, \
+        'GET /maze/export returned %d instead of 200' % status
+
+    lines = data.splitlines()
+    assert len(lines) == 1 + 6, \
+        'GET /maze/export returned %d lines' % len(lines)
+    assert all(len(json.loads(line)['identifiers']) == 7
+            for line in lines[1:]), \
+        'GET /maze/export returned invalid rows'
@@ -0,0 +1,136 @@
+from mazeweb import util
+from mazeweb.util import generate, state
+from mazeweb.util.numeric import LFSR
+
+from .. import test, assert_exception
+
+
+def _rooms(maze):
+    """Returns the number of rooms reachable from the first room and the number
+    of doors in a maze.
+    """
+    doors = 0
+    reached = set([0])
+    queue = [0]
+    while queue:
+        index = queue.pop()
+        for neighbor in util._neighbors(maze, index):
+            doors += 1
+            if not neighbor in reached:
+                reached.add(neighbor)
+                queue.append(neighbor)
+    return (len(reached), doors // 2)
+
+
+@test
+def generate_perfect():
+    """All algorithms generate perfect mazes"""
+    for algorithm, initialize in generate.ALGORITHMS.items():
+        for walls in state.VIEW_CLASSES:
+            for width, height in ((1, 1), (6, 1), (9, 7), (20, 30)):
+                maze = state.create(walls, width, height)
+                random = LFSR(11)
+                initialize(maze, lambda max: next(random) % max)
+                reached, doors = _rooms(maze)
+                assert reached == width * height, \
+                    '%s reached %d of %d rooms in %dx%d with %d walls' % (
+                        algorithm, reached, width * height, width, height,
+                        walls)
+                assert doors == width * height - 1, \
+                    '%s generated %d doors in %dx%d with %d walls' % (
+                        algorithm, doors, width, height, walls)
+                for room_pos in maze.room_positions:
+                    for wall in maze.doors(room_pos):
+                        assert wall.back.wall in maze[wall.back.room_pos], \
+                            '%s generated a door without a back' % algorithm
+
+
+@test
+def generate_deterministic():
+    """All algorithms are deterministic under the seed"""
+    for algorithm in generate.ALGORITHMS:
+        first = [
+            list(util._generate(4, 15, 10, seed, algorithm)._doors)
+            for seed in (3, 4)]
+        second = [
+            list(util._generate(4, 15, 10, seed, algorithm)._doors)
+            for seed in (3, 4)]
+        assert first == second, \
+            '%s generated different mazes for the same seed' % algorithm
+        assert first[0] != first[1], \
+            '%s generated the same maze for different seeds' % algorithm
+
+
+@test
+def generate_carved():
+    """Algorithms never enter rooms that already have doors"""
+    for algorithm, initialize in generate.ALGORITHMS.items():
+        maze = state.create(4, 9, 7)
+        for wall in maze.walls((0, 0)):
+            maze[wall.room_pos][wall] = True
+        random = LFSR(7)
+        initialize(maze, lambda max: next(random) % max)
+
+        for room_pos in maze.room_positions:
+            for wall in maze.doors(room_pos):
+                if room_pos != (0, 0):
+                    assert wall.back.room_pos != (0, 0), \
+                        '%s entered a room with doors from %s' % (
+                            algorithm, str(room_pos))
+
+        reached = set([(1, 1)])
+        queue = [(1, 1)]
+        while queue:
+            for wall in maze.doors(queue.pop()):
+                if not wall.back.room_pos in reached:
+                    reached.add(wall.back.room_pos)
+                    queue.append(wall.back.room_pos)
+        assert len(reached) == 9 * 7 - 1, \
+            '%s reached %d rooms' % (algorithm, len(reached))
+
+
+@test
+def generate_disconnected():
+    """Algorithms generate mazes whose rooms cannot all be connected"""
+    for algorithm, initialize in generate.ALGORITHMS.items():
+        for height in (2, 3, 8):
+            maze = state.create(3, 1, height)
+            random = LFSR(5)
+            initialize(maze, lambda max: next(random) % max)
+            for room_pos in maze.room_positions:
+                for wall in maze.doors(room_pos):
+                    assert wall.back.wall in maze[wall.back.room_pos], \
+                        '%s generated a door without a back' % algorithm
+
+
+@test
+def generate_name():
+    """generate.name for valid and invalid codes"""
+    for algorithm, code in generate.CODES.items():
+        assert generate.name(code) == algorithm, \
+            'generate.name(%d) returned %s instead of %s' % (
+                code, generate.name(code), algorithm)
+
+    with assert_exception(ValueError):
+        generate.name(max(generate.CODES.values()) + 1)
+
+
+@test
+def generate_new():
+    """util.new with an invalid algorithm"""
+    with assert_exception(KeyError):
+        util.new(width = 5, height = 4, algorithm = 'invalid')
+
+
+@test
+def generate_seeded():
+    """state.unpack regenerates seeded mazes with their algorithm"""
+    for algorithm in generate.ALGORITHMS:
+        maze, remaining = util.new(width = 9, height = 7, seed = 13,
+            algorithm = algorithm)
+        copy = state.unpack(state.pack(maze, True), util.topology)
+        assert copy.algorithm == algorithm, \
+            'The algorithm was not restored: %s != %s' % (
+                copy.algorithm, algorithm)
+        assert list(copy._doors) == list(maze._doors), \
+            'The regenerated %s maze was different' % algorithm
@@ -0,0 +1,66 @@
+from mazeweb import util
+from mazeweb.util import geometry, state
+
+from .. import test
+
+
+@test
+def geometry_Geometry():
+    """Geometry matches pymaze for all maze classes"""
+    for walls, maze_class in util.MAZE_CLASSES.items():
+        maze = maze_class(5, 4)
+        g = geometry.Geometry(maze_class, 5, 4)
+        for room_pos in maze.room_positions:
+            assert g.center(room_pos) == maze.get_center(room_pos), \
+                'Invalid center for %s in %s: %s != %s' % (
+                    str(room_pos), maze_class.__name__,
+                    str(g.center(room_pos)), str(maze.get_center(room_pos)))
+
+            expected = [
+                (int(wall), wall.span[0], wall.span[1]) + tuple(wall.direction)
+                for wall in maze.walls(room_pos)]
+            assert list(g.walls(room_pos)) == expected, \
+                'Invalid walls for %s in %s: %s != %s' % (
+                    str(room_pos), maze_class.__name__,
+                    str(g.walls(room_pos)), str(expected))
+
+            expected = [
+                (int(wall),) + tuple(wall.direction) + (int(wall.back),)
+                for wall in maze.walls(room_pos)]
+            assert list(g.passages(room_pos)) == expected, \
+                'Invalid passages for %s in %s: %s != %s' % (
+                    str(room_pos), maze_class.__name__,
+                    str(g.passages(room_pos)), str(expected))
+
+
+@test
+def geometry_get():
+    """geometry.get returns shared instances"""
+    for walls, maze_class in util.MAZE_CLASSES.items():
+        assert geometry.get(maze_class, 5, 4) \
+                is geometry.get(state.VIEW_CLASSES[walls], 5, 4), \
+            'The geometry for %s was not shared' % maze_class.__name__
+
+
+@test
+def geometry_room_to_dict():
+    """util.room_to_dict matches the pymaze geometry"""
+    for walls in state.VIEW_CLASSES:
+        maze, remaining = util.new(width = 5, height = 4, walls = walls,
+            seed = 3)
+        for room_pos in maze.room_positions:
+            result = util.room_to_dict(maze, room_pos)
+            assert (result['center']['x'], result['center']['y']) \
+                    == maze.get_center(room_pos), \
+                'Invalid center for %s' % str(room_pos)
+            expected = [
+                (maze[maze.walk(w)].identifier if w in maze[room_pos]
+                    else None, w.span[0], w.span[1])
+                for w in maze.walls(room_pos)
+                if not maze.edge(w)]
+            actual = [
+                (w['target'], w['span']['start'], w['span']['end'])
+                for w in result['walls']]
+            assert actual == expected, \
+                'Invalid walls for %s: %s != %s' % (
+                    str(room_pos), str(actual), str(expected))
@@ -79,3 +79,102 @@ def maze_room_get3():
                 unreachable_room, status)
 
         break
+
+
+@webtest
+def maze_rooms_get0():
+    """Test GET /maze/rooms for the current room and its neighbours"""
+    maze_reset()
+
+    status, data = get('/maze')
+    start_room = data.current_room.identifier
+    neighbors = [wall.target.identifier
+        for wall in data.current_room.walls
+        if wall.target]
+    identifiers = [start_room] + neighbors + [-1]
+
+    status, data = get('/maze/rooms?ids=%s' % ','.join(
+        str(identifier) for identifier in identifiers))
+    assert status == 200, \
+        'GET /maze/rooms returned %d instead of 200' % status
+
+    assert [room.identifier for room in data.rooms] == identifiers[:-1], \
+        'GET /maze/rooms returned %s' % str(data.rooms)
+    assert data.denied == [-1], \
+        'GET /maze/rooms denied %s' % str(data.denied)
+
+    status, expected = get('/maze/%d' % neighbors[0])
+    assert data.rooms[1] == expected, \
+        'GET /maze/rooms returned %s instead of %s' % (
+            str(data.rooms[1]), str(expected))
+
+
+@webtest
+def maze_rooms_get1():
+    """Test GET /maze/rooms with invalid identifiers"""
+    maze_reset()
+
+    status, data = get('/maze/rooms?ids=1,a')
+    assert status == 400, \
+        'GET /maze/rooms returned %d instead of 400' % status
+
+    status, data = get('/maze/rooms')
+    assert status == 400, \
+        'GET /maze/rooms returned %d instead of 400' % status
+
+
+@webtest
+def maze_path_get0():
+    """Test GET /maze/path for visited rooms"""
+    maze_reset()
+
+    status, data = get('/maze')
+    path = [data.current_room.identifier]
+    previous_room = None
+    while len(path) < 5:
+        status, data = get('/maze/%d' % path[-1])
+        try:
+            next_room = next(wall.target.identifier
+                for wall in data.walls
+                if wall.target and wall.target.identifier != previous_room)
+        except StopIteration:
+            break
+        previous_room = path[-1]
+        path.append(next_room)
+        put('/maze', dict(
+            current_room = next_room))
+
+    status, data = get('/maze/path?to=%d' % path[0])
+    assert status == 200, \
+        'GET /maze/path returned %d instead of 200' % status
+    assert data.path == list(reversed(path[:-1])), \
+        'GET /maze/path returned %s instead of %s' % (
+            str(data.path), str(list(reversed(path[:-1]))))
+
+    status, data = get('/maze/path?to=%d' % path[-1])
+    assert data.path == [], \
+        'GET /maze/path returned %s for the current room' % str(data.path)
+
+
+@webtest
+def maze_path_get1():
+    """Test GET /maze/path for rooms not visited and invalid rooms"""
+    maze_reset()
+
+    status, data = get('/maze')
+    next_room = next(wall.target.identifier
+        for wall in data.current_room.walls
+        if wall.target)
+
+    status, data = get('/maze/path?to=%d' % next_room)
+    assert status == 403, \
+        'GET /maze/path returned %d instead of 403' % status
+
+    status, data = get('/maze/path?to=-1')
+    assert status == 404, \
+        'GET /maze/path returned %d instead of 404' % status
+
+    status, data = get('/maze/path')
+    assert status == 400, \
+        'GET /maze/path returned %d instead of 400' % status
+
@@ -92,12 +92,63 @@ def maze_reset2():
     assert status == 400, \
         'POST /maze failed with status code %d' % status
 
+    status, data = post('/maze', dict(
+        algorithm = 'invalid'))
+    assert status == 400, \
+        'POST /maze failed with status code %d' % status
+
     status, data = get('/maze')
 
     assert status == 204, \
         'GET /maze returned %d instead of 204' % status
 
 
+@webtest
+def maze_reset3():
+    """Test POST /maze with every generation algorithm"""
+    for algorithm in ('prim', 'backtracker', 'kruskal', 'wilson', 'pymaze'):
+        status, data = post('/maze', dict(
+            width = 12,
+            height = 8,
+            algorithm = algorithm))
+        assert status == 200, \
+            'POST /maze with %s failed with status code %d' % (
+                algorithm, status)
+
+        status, data = get('/maze')
+        assert status == 200 and data.width == 12, \
+            'GET /maze returned %d for %s' % (status, algorithm)
+
+
+@webtest
+def maze_reset4():
+    """Test POST /maze for a large lazily generated maze"""
+    status, data = post('/maze', dict(
+        width = 5000,
+        height = 5000,
+        lazy = True))
+    assert status == 200, \
+        'POST /maze failed with status code %d' % status
+
+    status, data = get('/maze')
+    assert status == 200 and data.width == 5000, \
+        'GET /maze returned %d' % status
+
+    next_room = next(wall.target.identifier
+        for wall in data.current_room.walls
+        if wall.target)
+    status, data = put('/maze', dict(
+        current_room = next_room))
+    assert status == 200, \
+        'PUT /maze returned %d, not 200' % status
+    assert data.current_room.identifier == next_room, \
+        'current_room is %s, not %s' % (data.current_room, next_room)
+
+    status, data = get('/maze/%d' % next_room)
+    assert status == 200, \
+        'GET /maze/%d returned %d instead of 200' % (next_room, status)
+
+
 @webtest
 def maze_update0():
     """Test PUT /maze for an uninitialised maze"""
@@ -234,7 +285,6 @@ def maze_update6():
             if bool(wall.target.identifier))
     except StopIteration as e:
         raise AssertionError('No walls had details')
-    print str(next_room)
 
     status, data = put('/maze', dict(
         current_room = next_room))
@@ -247,6 +297,112 @@ def maze_update6():
         'No all walls had details'
 
 
+@webtest
+def maze_update7():
+    """Test PUT /maze with a path of rooms"""
+    maze_reset()
+
+    status, data = get('/maze')
+    start_room = data.current_room.identifier
+    path = [start_room]
+    previous_room = None
+    while len(path) < 4:
+        status, data = get('/maze/%d' % path[-1])
+        try:
+            next_room = next(wall.target.identifier
+                for wall in data.walls
+                if wall.target and wall.target.identifier != previous_room)
+        except StopIteration:
+            break
+        previous_room = path[-1]
+        path.append(next_room)
+        status, data = put('/maze', dict(
+            current_room = next_room))
+
+    status, data = put('/maze', dict(
+        path = list(reversed(path[:-1]))))
+    assert data.current_room.identifier == start_room, \
+        'Failed to return to the start room'
+    status, data = put('/maze', dict(
+        path = path[1:] + [path[-2]],
+        steps = True))
+
+    assert status == 200, \
+        'PUT /maze returned %d, not 200' % status
+    assert data.current_room.identifier == path[-2], \
+        'current_room is %s, not %s' % (data.current_room.identifier, path[-2])
+    assert [step.identifier for step in data.steps] == path[1:] + [path[-2]], \
+        'Invalid steps: %s' % str(data.steps)
+
+
+@webtest
+def maze_update8():
+    """Test PUT /maze with a path containing an unreachable room"""
+    maze_reset()
+
+    status, data = get('/maze')
+    start_room = data.current_room.identifier
+    next_room = next(wall.target.identifier
+        for wall in data.current_room.walls
+        if wall.target)
+
+    status, data = put('/maze', dict(
+        path = [next_room, start_room, -1]))
+    assert status == 404, \
+        'PUT /maze returned %d instead of 404' % status
+
+    status, data = get('/maze')
+    assert data.current_room.identifier == start_room, \
+        'The current room was moved by an invalid path'
+
+    status, data = put('/maze', dict(
+        path = []))
+    assert status == 400, \
+        'PUT /maze returned %d instead of 400' % status
+
+
+@webtest
+def maze_update9():
+    """Test PUT /maze with delta responses"""
+    maze_reset()
+
+    status, data = get('/maze')
+    version = data.version
+    start_room = data.current_room
+    next_room = next(wall.target
+        for wall in start_room.walls
+        if wall.target)
+    status, next_data = get('/maze/%d' % next_room.identifier)
+    visible = set([start_room.identifier]).union(
+        wall.target.identifier for wall in start_room.walls if wall.target)
+    expected = set(wall.target.identifier
+        for wall in next_data.walls
+        if wall.target and not wall.target.identifier in visible)
+
+    status, data = put('/maze', dict(
+        current_room = next_room.identifier,
+        delta = True))
+    assert status == 200, \
+        'PUT /maze returned %d, not 200' % status
+    assert data.version == version + 1, \
+        'The version was not incremented'
+    assert data.current_room.identifier == next_room.identifier, \
+        'current_room is %s, not %s' % (
+            data.current_room.identifier, next_room.identifier)
+    assert set(room.identifier for room in data.rooms) == expected, \
+        'Invalid rooms: %s' % str(data.rooms)
+
+    status, data = put('/maze', dict(
+        current_room = next_room.identifier,
+        delta = True))
+    assert data.version == version + 1 and not data.rooms, \
+        'Staying in the current room was reported as a move'
+
+    status, data = get('/maze')
+    assert data.version == version + 1, \
+        'The version was not stored'
+
+
 @webtest
 def maze_delete0():
     """Test DELETE /maze for an uninitialised maze"""
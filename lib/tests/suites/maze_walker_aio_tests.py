@@ -0,0 +1,57 @@
+import sys
+
+from ._util import webtest
+
+from .. import assert_exception
+
+# The asynchronous walker requires Python 3.5
+if sys.version_info >= (3, 5):
+    import asyncio
+
+    from mazeweb.walker.aio import AsyncMazeWalker, ConnectionPool
+
+    def run(coroutine):
+        """Runs a coroutine to completion"""
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    @webtest
+    def AsyncMazeWalker_create0():
+        """AsyncMazeWalker.create with invalid arguments"""
+        with assert_exception(ValueError):
+            run(AsyncMazeWalker.create(width = -1))
+
+    @webtest
+    def AsyncMazeWalker_create1():
+        """AsyncMazeWalker.create with valid arguments"""
+        mw = run(AsyncMazeWalker.create(width = 5, height = 5))
+        try:
+            assert mw.maze.width == 5 and mw.maze.height == 5, \
+                'Failed to create a maze with dimensions %s: it was %s' % (
+                    str((5, 5)), str((mw.maze.width, mw.maze.height)))
+        finally:
+            run(mw.close())
+
+    @webtest
+    def AsyncMazeWalker_walk_to():
+        """AsyncMazeWalker.walk_to for the top-right corner with concurrent
+        walkers"""
+        pool = ConnectionPool(size = 4)
+        walkers = run(asyncio.gather(*(
+            AsyncMazeWalker.create(pool = pool, binary = binary)
+            for binary in (False, True, False, True))))
+        try:
+            starts = [mw.position for mw in walkers]
+            targets = [(mw.maze.width - 1, mw.maze.height - 1)
+                for mw in walkers]
+            paths = run(asyncio.gather(*(
+                mw.walk_to(target)
+                for mw, target in zip(walkers, targets))))
+            for mw, start, target, path in zip(
+                    walkers, starts, targets, paths):
+                correct = list(mw.maze.walk_path(start, target))
+                assert path == correct, \
+                    'AsyncMazeWalker.walk_to yielded %s instead of %s' % (
+                        str(path), str(correct))
+        finally:
+            run(asyncio.gather(*(mw.close() for mw in walkers)))
+            pool.close()
@@ -0,0 +1,110 @@
+import sys
+
+from ._util import webtest
+
+from .. import test
+
+from mazeweb.walker import load
+
+
+#: The options used for load generation tests
+OPTIONS = dict(
+    host = 'localhost',
+    port = 8080,
+    walkers = 1,
+    mode = 'process',
+    connections = None,
+    mazes = 2,
+    width = 5,
+    height = 4,
+    walls = 4,
+    walk = 'explore',
+    steps = 10,
+    seed = 0,
+    binary = False,
+    delta = False)
+
+
+@test
+def load_route():
+    """load.route replaces room identifiers and removes query strings"""
+    assert load.route('GET', '/maze/1234') == 'GET /maze/<id>', \
+        'Room identifiers were not replaced'
+    assert load.route('GET', '/maze/rooms?ids=1,2') == 'GET /maze/rooms', \
+        'Query strings were not removed'
+    assert load.route('PUT', '/maze') == 'PUT /maze', \
+        'Invalid route'
+
+
+@test
+def load_Results_report():
+    """load.Results.report for merged results"""
+    first, second = load.Results(), load.Results()
+    first.record('PUT /maze', 0.001)
+    first.record('PUT /maze')
+    second.record('PUT /maze', 0.001)
+    second.record('POST /maze', 0.03)
+    second.walks = 1
+
+    first.merge(second.dump())
+    report = first.report(2.0, OPTIONS)
+    assert report['requests'] == 3 and report['errors'] == 1, \
+        'Invalid number of requests: %s' % str(report)
+    assert report['throughput'] == 1.5, \
+        'Invalid throughput: %s' % str(report['throughput'])
+    assert report['routes']['PUT /maze']['error_rate'] == 1.0 / 3, \
+        'Invalid error rate: %s' % str(report['routes']['PUT /maze'])
+    assert report['routes']['POST /maze']['p50'] == 0.05, \
+        'Invalid percentile: %s' % str(report['routes']['POST /maze'])
+    assert report['walks'] == 1, \
+        'Invalid number of walks: %d' % report['walks']
+
+
+@webtest
+def load_run_walker():
+    """load.run_walker explores mazes and records every request"""
+    results = load.Results()
+    results.merge(load.run_walker(OPTIONS, 0))
+    report = results.report(1.0, OPTIONS)
+
+    assert report['walks'] == 2 and report['failed_walks'] == 0, \
+        'The mazes were not walked: %s' % str(report)
+    assert report['routes']['POST /maze']['count'] == 2, \
+        'The mazes were not created: %s' % str(report['routes'])
+    assert report['routes']['DELETE /maze']['count'] == 2, \
+        'The mazes were not deleted: %s' % str(report['routes'])
+    assert report['routes']['PUT /maze']['count'] >= 2 * 5 * 4 - 2, \
+        'Not all rooms were visited: %s' % str(report['routes'])
+    assert report['errors'] == 0, \
+        'Requests failed: %s' % str(report['routes'])
+
+
+# The asyncio mode requires Python 3.5
+if sys.version_info >= (3, 5):
+    @webtest
+    def load_run_tasks():
+        """load.run in asyncio mode explores mazes and records every request"""
+        options = dict(OPTIONS, walkers = 2, mode = 'asyncio')
+        report = load.run(options)
+
+        assert report['walks'] == 4 and report['failed_walks'] == 0, \
+            'The mazes were not walked: %s' % str(report)
+        assert report['routes']['POST /maze']['count'] == 4, \
+            'The mazes were not created: %s' % str(report['routes'])
+        assert report['routes']['DELETE /maze']['count'] == 4, \
+            'The mazes were not deleted: %s' % str(report['routes'])
+        assert report['errors'] == 0, \
+            'Requests failed: %s' % str(report['routes'])
+
+    @webtest
+    def load_run_tasks_many():
+        """load.run in asyncio mode with more walkers than executor threads"""
+        walkers = 100
+        options = dict(OPTIONS, walkers = walkers, connections = 4, mazes = 1,
+            width = 3, height = 3, mode = 'asyncio')
+        report = load.run(options)
+
+        assert report['walks'] == walkers and report['failed_walks'] == 0, \
+            'The mazes were not walked: %s' % str(report)
+        assert report['errors'] == 0, \
+            'Requests failed: %s' % str(report['routes'])
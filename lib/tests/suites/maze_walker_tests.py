@@ -1,8 +1,17 @@
+import io
+import sys
+
 from ._util import webtest
 
 from .. import assert_exception
 
 from mazeweb.walker import MazeWalker
+from mazeweb.walker.index import RoomIndex
+
+if sys.version_info.major < 3:
+    from httplib import CannotSendRequest, HTTPException
+else:
+    from http.client import CannotSendRequest, HTTPException
 
 @webtest
 def MazeWalker_init0():
@@ -207,3 +216,226 @@ def MazeWalker_walk_to1():
     assert path == correct, \
         'MazeWalker.walk_to yielded %s instead of %s' % (
             str(path), str(correct))
+
+
+@webtest
+def MazeWalker_binary():
+    """MazeWalker.walk_to with the binary wire format"""
+    mw = MazeWalker(binary = True)
+
+    start_room = mw.position
+    target = (mw.maze.width - 1, mw.maze.height - 1)
+    path = list(mw.walk_to(target))
+    correct = list(mw.maze.walk_path(start_room, target))
+    assert path == correct, \
+        'MazeWalker.walk_to yielded %s instead of %s' % (
+            str(path), str(correct))
+
+
+@webtest
+def MazeWalker_follow():
+    """MazeWalker.follow for a path of known rooms"""
+    mw = MazeWalker()
+
+    start_room = mw.position
+    next_room = next(mw.maze.doors(start_room)).room_pos
+    mw.position = next_room
+    mw.position = start_room
+
+    mw.follow([next_room, start_room, next_room])
+    assert mw.position == next_room, \
+        'MazeWalker.follow moved to %s instead of %s' % (
+            str(mw.position), str(next_room))
+
+    with assert_exception(ValueError):
+        mw.follow([(mw.maze.width - 1, mw.maze.height - 1)])
+
+
+@webtest
+def MazeWalker_counters():
+    """MazeWalker skips known rooms and retrieves only missing rooms"""
+    mw = MazeWalker()
+
+    assert mw.counters['requests'] == 0, \
+        'Rooms included in responses were requested'
+    assert mw.counters['saved'] > 0, \
+        'No requests were saved'
+
+    start_room = mw.position
+    next_room = next(mw.maze.doors(start_room)).room_pos
+    mw.position = next_room
+    assert mw.counters['skipped'] > 0, \
+        'Known rooms were not skipped'
+
+    # Replace the neighbours in the room data with their identifiers, and
+    # forget them
+    data = mw._get('/maze/%d' % mw.current_room)
+    missing = []
+    for w in data['walls']:
+        if w['target']:
+            w['target'] = w['target']['identifier']
+            missing.append(w['target'])
+    mw.mapping = RoomIndex(mw.maze.width, mw.maze.height)
+    mw.mapping.add(mw.current_room, next_room, 0)
+
+    requests = mw.counters['requests']
+    mw._update_cache(mw.current_room, True, data)
+    assert mw.counters['requests'] == requests + len(missing), \
+        'Missing rooms were not requested'
+    assert all(identifier in mw.mapping for identifier in missing), \
+        'Missing rooms were not added'
+
+
+@webtest
+def MazeWalker_identifier_zero():
+    """MazeWalker learns about neighbours with the identifier 0"""
+    mw = MazeWalker()
+
+    # Replace the first neighbour in the room data with the identifier 0,
+    # which the keyed permutation assigns to some room of large mazes
+    data = mw._get('/maze/%d' % mw.current_room)
+    wall = next(w for w in data['walls'] if not w['target'] is None)
+    wall['target'] = 0
+
+    assert 0 in mw._update_neighbors(data), \
+        'A neighbour with the identifier 0 was treated as a wall'
+
+
+@webtest
+def MazeWalker_delta():
+    """MazeWalker.walk_to with delta responses"""
+    mw = MazeWalker(delta = True)
+
+    start_room = mw.position
+    target = (mw.maze.width - 1, mw.maze.height - 1)
+    path = list(mw.walk_to(target))
+    correct = list(mw.maze.walk_path(start_room, target))
+    assert path == correct, \
+        'MazeWalker.walk_to yielded %s instead of %s' % (
+            str(path), str(correct))
+    assert mw.counters['resyncs'] == 0, \
+        'The walker was resynchronised without missed moves'
+
+    # Pretend that a move was missed
+    mw.version -= 1
+    mw.position = next(mw.maze.doors(mw.position)).back.room_pos
+    assert mw.counters['resyncs'] == 1, \
+        'A missed move was not detected'
+    assert all(
+            wall.back.room_pos in mw.mapping.values()
+            for wall in mw.maze.doors(mw.position)), \
+        'The neighbours of the current room were not retrieved'
+
+
+@webtest
+def MazeWalker_resume():
+    """MazeWalker.resume for a saved walker"""
+    mw = MazeWalker()
+    mw.position = next(mw.maze.doors(mw.position)).back.room_pos
+
+    f = io.BytesIO()
+    mw.save(f)
+    mw.detach()
+    f.seek(0)
+    resumed = MazeWalker.resume(f)
+
+    assert resumed.position == mw.position, \
+        'The current room was not resumed'
+    assert dict(resumed.mapping) == dict(mw.mapping), \
+        'The known rooms were not resumed'
+    assert resumed.frontier == mw.frontier, \
+        'The frontier was not resumed'
+
+    start_room = resumed.position
+    target = (resumed.maze.width - 1, resumed.maze.height - 1)
+    path = list(resumed.walk_to(target))
+    correct = list(resumed.maze.walk_path(start_room, target))
+    assert path == correct, \
+        'MazeWalker.walk_to yielded %s instead of %s' % (
+            str(path), str(correct))
+
+
+@webtest
+def MazeWalker_return_to():
+    """MazeWalker.return_to for a visited room"""
+    mw = MazeWalker()
+
+    start_room = mw.position
+    target = (mw.maze.width - 1, mw.maze.height - 1)
+    list(mw.walk_to(target))
+
+    path = mw.return_to(start_room)
+    correct = list(mw.maze.walk_path(target, start_room))[1:]
+    assert mw.position == start_room, \
+        'MazeWalker.return_to moved to %s instead of %s' % (
+            str(mw.position), str(start_room))
+    assert len(path) == len(correct), \
+        'MazeWalker.return_to walked %s instead of %s' % (
+            str(path), str(correct))
+
+    with assert_exception(AssertionError):
+        mw.return_to(next(iter(mw.frontier)))
+
+
+
+@webtest
+def MazeWalker_reconnect():
+    """MazeWalker retries requests on failed connections"""
+    mw = MazeWalker()
+
+    # Leave a response unread, which makes the next request fail
+    mw.connection.request('GET', '/')
+    assert mw._get('/maze').current_room.identifier == mw.current_room, \
+        'The request was not retried'
+    assert mw.counters['reconnects'] == 1, \
+        'The reconnection was not counted'
+
+    # Close the socket behind the back of the connection
+    mw.connection.connect()
+    mw.connection.sock.close()
+    mw.position = next(mw.maze.doors(mw.position)).back.room_pos
+    assert mw.counters['reconnects'] == 2, \
+        'The reconnection was not counted'
+
+    mw.retries = 0
+    mw.connection.request('GET', '/')
+    with assert_exception(CannotSendRequest):
+        mw._get('/maze')
+
+
+@webtest
+def MazeWalker_reconnect_sent():
+    """MazeWalker retries sent requests only if they are idempotent"""
+    mw = MazeWalker()
+
+    def lost():
+        raise HTTPException('lost response')
+
+    # The move is applied by the server, but the response is lost
+    mw.connection.getresponse = lost
+    with assert_exception(HTTPException):
+        mw.position = next(mw.maze.doors(mw.position)).back.room_pos
+    assert mw.counters['reconnects'] == 0, \
+        'The move was retried'
+
+    mw.connection.getresponse = lost
+    mw._get('/maze')
+    assert mw.counters['reconnects'] == 1, \
+        'The GET request was not retried'
+
+
+@webtest
+def MazeWalker_latencies():
+    """MazeWalker records the latency of requests per method"""
+    mw = MazeWalker()
+    mw.position = next(mw.maze.doors(mw.position)).back.room_pos
+
+    stats = mw.latencies.stats()
+    assert set(stats.keys()) == set(('POST', 'PUT')), \
+        'Invalid methods: %s' % ', '.join(stats.keys())
+    assert stats['POST']['count'] == 1 and stats['PUT']['count'] == 2, \
+        'Invalid latency histograms: %s' % str(stats)
+
+    mw._get('/maze')
+    assert mw.latencies.stats()['GET']['count'] == 1, \
+        'The latency of GET was not recorded'
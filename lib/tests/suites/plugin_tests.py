@@ -162,6 +162,35 @@ def plugins_update_maze():
         'GetMazePlugin did not update the maze'
 
 
+@webtest
+def plugins_visit_room():
+    """Tests that the visit room callbacks are called"""
+    maze_reset()
+
+    status, data = get('/maze')
+    start_room = data.current_room
+    next_room = next(wall.target
+        for wall in start_room.walls
+        if wall.target)
+    status, data = put('/maze', dict(current_room = next_room.identifier))
+    assert data.visit_room_plugin == dict(
+            rooms = [next_room.position],
+            visited = True), \
+        'VisitRoomPlugin was not called for the new room: %s' % str(
+            data.visit_room_plugin)
+    assert data.visited == 2, \
+        'Invalid number of visited rooms: %d' % data.visited
+
+    status, data = put('/maze', dict(current_room = start_room.identifier))
+    assert data.visit_room_plugin == dict(
+            rooms = [],
+            visited = True), \
+        'VisitRoomPlugin was called for a visited room: %s' % str(
+            data.visit_room_plugin)
+    assert data.visited == 2, \
+        'Invalid number of visited rooms: %d' % data.visited
+
+
 @webtest
 def plugins_get_room():
     """Tests that the get room callbacks are called"""
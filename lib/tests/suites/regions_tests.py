@@ -0,0 +1,213 @@
+import json
+
+from mazeweb import util
+from mazeweb.util import export, generate, regions, state
+
+from .. import test, assert_exception
+from .generate_tests import _rooms
+
+
+def _lazy(walls, width, height, seed, algorithm, size = 4, cache = 2):
+    """Returns a lazy maze with small regions.
+    """
+    maze = regions.create(walls, width, height, seed)
+    maze._doors.generate(seed, algorithm, size, cache)
+    return maze
+
+
+@test
+def regions_perfect():
+    """Lazy mazes are perfect"""
+    for algorithm in generate.ALGORITHMS:
+        for walls in state.VIEW_CLASSES:
+            for width, height in ((1, 1), (5, 3), (13, 9), (16, 16)):
+                maze = _lazy(walls, width, height, 5, algorithm)
+                reached, doors = _rooms(maze)
+                assert reached == width * height, \
+                    '%s reached %d of %d rooms in %dx%d with %d walls' % (
+                        algorithm, reached, width * height, width, height,
+                        walls)
+                assert doors == width * height - 1, \
+                    '%s generated %d doors in %dx%d with %d walls' % (
+                        algorithm, doors, width, height, walls)
+                for room_pos in maze.room_positions:
+                    for wall in maze.doors(room_pos):
+                        assert wall.back.wall in maze[wall.back.room_pos], \
+                            '%s generated a door without a back' % algorithm
+
+
+@test
+def regions_deterministic():
+    """Lazy mazes are deterministic under the seed and regenerate evicted
+    regions"""
+    first = _lazy(4, 20, 20, 3, 'prim')
+    second = _lazy(4, 20, 20, 3, 'prim')
+    doors = list(first._doors)
+    assert doors == [second._doors[i] for i in range(399, -1, -1)][::-1], \
+        'The same seed generated different mazes'
+    assert first._doors.regions.stats()['evictions'] > 0, \
+        'No regions were evicted'
+    assert doors == list(first._doors), \
+        'Regenerated regions were different'
+    assert doors != list(_lazy(4, 20, 20, 4, 'prim')._doors), \
+        'Different seeds generated the same maze'
+
+
+@test
+def regions_carved():
+    """Lazy generation never enters rooms that already have doors"""
+    maze = regions.create(4, 9, 7, 7)
+    for wall in maze.walls((0, 0)):
+        maze[wall.room_pos][wall] = True
+    maze._doors.generate(7, 'prim', 4, 2)
+
+    for room_pos in maze.room_positions:
+        if room_pos != (0, 0):
+            for wall in maze.doors(room_pos):
+                assert wall.back.room_pos != (0, 0), \
+                    'Entered a room with doors from %s' % str(room_pos)
+
+
+@test
+def regions_identifiers():
+    """LazyIdentifiers computes identifiers and keeps modified values"""
+    maze = _lazy(4, 10, 10, 9, 'prim')
+    permutation = state.identifier_permutation(9)
+    identifiers = maze._identifiers
+    assert list(identifiers) == [permutation(i) for i in range(100)], \
+        'The identifiers were not computed from the permutation'
+    assert identifiers.index(permutation(42)) == 42, \
+        'The index of an identifier was not found'
+
+    old = identifiers[42]
+    identifiers[42] = 1234
+    assert identifiers[42] == 1234, \
+        'A modified identifier was not kept'
+    assert identifiers.index(1234) == 42, \
+        'The index of a modified identifier was not found'
+    with assert_exception(ValueError):
+        identifiers.index(old)
+    with assert_exception(ValueError):
+        identifiers.index(-1)
+    with assert_exception(IndexError):
+        identifiers[100]
+
+
+@test
+def regions_new():
+    """util.new generates lazy mazes that are restored when unpacked"""
+    maze, remaining = util.new(width = 30, height = 20, seed = 17,
+        lazy = True)
+    assert maze.lazy, \
+        'util.new did not generate a lazy maze'
+    assert isinstance(maze._doors, regions.LazyDoors), \
+        'The doors of a lazy maze were not lazy'
+
+    copy = state.unpack(state.pack(maze), util.topology)
+    assert copy.lazy, \
+        'The unpacked maze was not lazy'
+    assert list(copy._doors) == list(maze._doors), \
+        'The unpacked maze was different'
+    assert list(copy._identifiers) == list(maze._identifiers), \
+        'The unpacked identifiers were different'
+    assert util.room_to_dict(copy, (3, 4)) \
+        == util.room_to_dict(maze, (3, 4)), \
+        'The room dicts were different'
+
+    copy[(3, 4)].identifier = 1234
+    restored = state.unpack(state.pack(copy), util.topology)
+    assert restored[(3, 4)].identifier == 1234, \
+        'A modified lazy maze was not restored'
+
+
+@test
+def regions_visited():
+    """The visited rooms of lazy mazes are stored as room indices"""
+    maze, remaining = util.new(width = 1000, height = 1000, seed = 17,
+        lazy = True)
+    start = maze.current_room_index
+    assert isinstance(maze._visited, set), \
+        'The visited rooms of a lazy maze were not sparse'
+    assert maze.visit(999999) and not maze.visit(999999), \
+        'MazeView.visit did not report new rooms'
+
+    data = bytearray(state.pack(maze))
+    assert state.is_lazy(data) and len(data) < 4096, \
+        'A lazy maze was packed with %d bytes' % len(data)
+    state.set_visited(data, [999999, 12345])
+    assert state.get_visited_count(data) == 3 \
+            and sorted(state.get_visited(data)) == sorted(
+                [start, 999999, 12345]), \
+        'set_visited did not add the new rooms'
+
+    copy = state.unpack(data, util.topology)
+    assert copy.visited_count == 3 and copy.is_visited(12345) \
+            and not copy.is_visited(12346), \
+        'The visited rooms were not unpacked'
+
+    snapshot = state.Snapshot(copy)
+    restored = snapshot.restore(True, visited = state.get_visited(data),
+        visited_count = 3)
+    assert restored.visit(1) and not copy.is_visited(1) \
+            and not 1 in snapshot.visited, \
+        'The visited rooms were shared with a snapshot'
+
+    copy[(3, 4)].identifier = 1234
+    modified = state.unpack(state.pack(copy), util.topology)
+    assert modified.is_visited(12345) and modified.visited_count == 3, \
+        'The visited rooms of a modified lazy maze were not preserved'
+
+
+@test
+def regions_overlay():
+    """Modified lazy mazes are packed with only the modified rooms"""
+    maze, remaining = util.new(width = 1000, height = 1000, seed = 17,
+        lazy = True)
+    room_pos = (500, 500)
+    wall = next(iter(maze.walls(room_pos)))
+    maze[room_pos][wall] = not maze[room_pos][wall]
+    maze[(3, 4)].identifier = 1234
+    doors = maze._doors[maze.index(room_pos)]
+
+    data = state.pack(maze)
+    assert state.is_lazy(data) and len(data) < 4096, \
+        'A modified lazy maze was packed with %d bytes' % len(data)
+
+    copy = state.unpack(data, util.topology)
+    assert copy.lazy and not copy.seeded and not copy.permuted, \
+        'The flags of a modified lazy maze were not restored'
+    assert copy._doors[copy.index(room_pos)] == doors \
+            and copy[(3, 4)].identifier == 1234 \
+            and copy.room_mapping[1234] == (3, 4), \
+        'The modified rooms were not restored'
+    assert copy._doors[copy.index((0, 0))] == maze._doors[0], \
+        'The unmodified rooms were not regenerated'
+    assert util.topology(4, 1000, 1000, 17, maze.algorithm, True)[0] \
+            .overlay == {}, \
+        'The overlay was applied to the shared topology'
+
+    copy.visit(1)
+    restored = state.unpack(state.pack(copy), util.topology)
+    assert restored[(3, 4)].identifier == 1234 and restored.is_visited(1), \
+        'A modified lazy maze was not packed again'
+
+
+@test
+def regions_export():
+    """Lazy mazes are exported generating every region once"""
+    maze = _lazy(4, 13, 9, 3, 'prim', 4, 1)
+    maze.current_room_index = 0
+    lines = [json.loads(line) for line in export.ndjson(maze)]
+    stats = maze._doors.regions.stats()
+    assert stats['misses'] == 3 * 2, \
+        'Regions were generated %d times' % stats['misses']
+
+    assert [row['y'] for row in lines[1:]] == list(range(9)), \
+        'Invalid rows: %s' % str(lines[1:])
+    for row in lines[1:]:
+        y = row['y']
+        assert row['identifiers'] == [maze[(x, y)].identifier
+                for x in range(13)] \
+            and row['doors'] == [maze._doors[maze.index((x, y))]
+                for x in range(13)], \
+            'Invalid row %d' % y
@@ -0,0 +1,103 @@
+import io
+import random
+
+from mazeweb.walker.index import RoomIndex
+
+from .. import test, assert_exception
+
+
+@test
+def RoomIndex_add():
+    """RoomIndex.add for new and known rooms"""
+    index = RoomIndex(5, 4)
+    index.add(17, (2, 3), 5)
+
+    assert index[17] == (2, 3) and 17 in index and len(index) == 1, \
+        'The room was not added'
+    assert index.identifier((2, 3)) == 17, \
+        'The identifier was not stored'
+    assert index.room((2, 3)).doors == 5, \
+        'The doors were not stored'
+
+    index.add(18, (2, 3), 1)
+    assert not 17 in index and index[18] == (2, 3), \
+        'The identifier of a known room was not replaced'
+
+    with assert_exception(IndexError):
+        index.add(19, (5, 0), 0)
+    with assert_exception(KeyError):
+        index.identifier((0, 0))
+    with assert_exception(KeyError):
+        index[-1]
+
+
+@test
+def RoomIndex_frontier():
+    """RoomIndex.frontier contains known rooms not yet visited"""
+    index = RoomIndex(5, 4)
+    index.add(1, (0, 0), 1)
+    index.add(2, (1, 0), 2)
+    assert index.frontier == set([(0, 0), (1, 0)]), \
+        'Invalid frontier: %s' % str(index.frontier)
+
+    index.visit((0, 0))
+    index.add(1, (0, 0), 1)
+    assert index.frontier == set([(1, 0)]), \
+        'Invalid frontier: %s' % str(index.frontier)
+    assert index.room((0, 0)).visited, \
+        'The room was not marked as visited'
+
+    with assert_exception(KeyError):
+        index.visit((4, 3))
+
+
+@test
+def RoomIndex_random_frontier():
+    """RoomIndex.random_frontier chooses rooms in the frontier"""
+    index = RoomIndex(5, 4)
+    rng = random.Random(0)
+    assert index.random_frontier(rng) is None, \
+        'A room was chosen from an empty frontier'
+
+    for i in range(20):
+        index.add(i + 1, divmod(i, 4), 0)
+    for i in range(0, 20, 3):
+        index.visit(divmod(i, 4))
+    chosen = set(index.random_frontier(rng) for i in range(200))
+    assert chosen == index.frontier, \
+        'Invalid rooms chosen: %s' % str(chosen)
+
+    for room_pos in list(index.frontier):
+        index.visit(room_pos)
+    assert index.random_frontier(rng) is None, \
+        'A room was chosen when all rooms were visited'
+
+
+@test
+def RoomIndex_dump():
+    """RoomIndex.load(RoomIndex.dump())"""
+    index = RoomIndex(5, 4)
+    index.add(1, (0, 0), 1)
+    index.add(2, (1, 0), 2)
+    index.add(3, (4, 3), 12)
+    index.visit((1, 0))
+
+    f = io.BytesIO()
+    index.dump(f)
+    data = f.getvalue()
+    loaded = RoomIndex.load(io.BytesIO(data))
+
+    assert dict(loaded) == dict(index), \
+        'Invalid mapping: %s' % str(dict(loaded))
+    assert loaded.frontier == index.frontier, \
+        'Invalid frontier: %s' % str(loaded.frontier)
+    assert [(r.identifier, r.position, r.doors, r.visited)
+                for r in loaded.known()] \
+            == [(r.identifier, r.position, r.doors, r.visited)
+                for r in index.known()], \
+        'The rooms were not loaded'
+
+    with assert_exception(ValueError):
+        RoomIndex.load(io.BytesIO(data[:-1]))
+    with assert_exception(ValueError):
+        RoomIndex.load(io.BytesIO(b'X' + data[1:]))
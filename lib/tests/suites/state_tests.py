@@ -0,0 +1,323 @@
+from mazeweb import util
+from mazeweb.util import state
+
+from .. import test, assert_exception
+
+
+@test
+def state_create():
+    """state.create for valid and invalid wall counts"""
+    for walls in (3, 4, 6):
+        maze = state.create(walls, 4, 3)
+        assert len(maze.Wall.WALLS) == walls, \
+            'state.create(%d, ...) created a maze with %d walls' % (
+                walls, len(maze.Wall.WALLS))
+        assert not any(maze[room_pos] for room_pos in maze.room_positions), \
+            'A new maze view had doors'
+
+    with assert_exception(KeyError):
+        state.create(5, 4, 3)
+
+
+@test
+def state_RoomView():
+    """Modifying doors through RoomView"""
+    maze = state.create(4, 3, 3)
+
+    maze[(1, 1)][maze.Wall.LEFT] = True
+    assert maze[(1, 1)].doors == set([maze.Wall.LEFT]), \
+        'Adding a door failed'
+    assert not maze[(0, 1)], \
+        'Adding a door to a room modified its neighbour'
+
+    maze.set_door((1, 1), maze.Wall.UP, True)
+    assert maze.connected((1, 1), (1, 2)) \
+            and maze.connected((1, 2), (1, 1)), \
+        'set_door did not connect both rooms'
+
+    room = maze[(1, 1)]
+    room -= maze.Wall.LEFT
+    assert maze[(1, 1)].doors == set([maze.Wall.UP]), \
+        'Removing a door failed'
+
+    with assert_exception(IndexError):
+        maze[(3, 0)]
+
+
+@test
+def state_pack0():
+    """state.unpack(state.pack(maze)) for all maze types"""
+    for walls in (3, 4, 6):
+        maze, remaining = util.new(width = 9, height = 7, walls = walls,
+            seed = 17)
+        next(maze.random)
+        copy = state.unpack(state.pack(maze))
+
+        assert (copy.width, copy.height, copy.seed) \
+                == (maze.width, maze.height, maze.seed), \
+            'Header was not preserved'
+        assert all(
+                copy[room_pos].doors == maze[room_pos].doors
+                and copy[room_pos].identifier == maze[room_pos].identifier
+                for room_pos in maze.room_positions), \
+            'Rooms were not preserved'
+        assert copy.current_room == maze.current_room, \
+            'The current room was not preserved'
+        assert next(copy.random) == next(maze.random), \
+            'The random number generator was not preserved'
+        assert sorted(copy.plugins.keys()) == sorted(maze.plugins.keys()), \
+            'The plugins were not preserved'
+
+
+@test
+def state_visited():
+    """MazeView.visit marks rooms as visited and is preserved when packed"""
+    maze, remaining = util.new(width = 9, height = 7, seed = 17)
+    assert maze.is_visited(maze.current_room_index), \
+        'The start room was not visited'
+
+    maze = state.unpack(state.pack(maze))
+    assert maze.visit(62) and not maze.visit(62), \
+        'MazeView.visit did not report new rooms'
+    assert maze.modified == state.MODIFIED_VISITED, \
+        'Visiting a room was not reported as a modification'
+
+    copy = state.unpack(state.pack(maze))
+    assert [index for index in range(63) if copy.is_visited(index)] \
+            == [maze.current_room_index, 62], \
+        'The visited rooms were not preserved'
+    copy = state.Snapshot(maze).restore()
+    assert copy.is_visited(62), \
+        'The visited rooms were not restored from a snapshot'
+
+
+@test
+def state_visited_count():
+    """MazeView.visited_count is maintained when visiting rooms"""
+    maze, remaining = util.new(width = 9, height = 7, seed = 17)
+    assert maze.visited_count == 1, \
+        'The start room was not counted'
+
+    maze.visit(62)
+    maze.visit(62)
+    data = bytearray(state.pack(maze))
+    assert state.get_visited_count(data) == 2, \
+        'Invalid packed number of visited rooms: %d' % (
+            state.get_visited_count(data))
+
+    indices = [index for index in range(4)
+        if index != maze.current_room_index][:2]
+    state.set_visited(data, indices + [62])
+    copy = state.unpack(data)
+    assert copy.visited_count == 4 \
+            and copy.visited_count == sum(
+                1 for index in range(63) if copy.is_visited(index)), \
+        'Invalid number of visited rooms after set_visited: %d' % (
+            copy.visited_count)
+    copy = state.Snapshot(maze).restore()
+    assert copy.visited_count == 2, \
+        'The number of visited rooms was not restored from a snapshot'
+
+
+@test
+def state_identifier_index():
+    """MazeView.identifier_index for permuted and modified identifiers"""
+    maze, remaining = util.new(width = 9, height = 7, seed = 17)
+    assert maze.permuted, \
+        'The identifiers of a new maze were not permuted'
+    assert len(set(maze.room_mapping)) == 63, \
+        'The identifiers are not unique'
+
+    for maze in (maze, state.unpack(state.pack(maze))):
+        assert maze.permuted, \
+            'The permuted flag was not preserved'
+        for room_pos in maze.room_positions:
+            assert maze.identifier_index(maze[room_pos].identifier) \
+                    == maze.index(room_pos), \
+                'Invalid index for %s' % str(room_pos)
+        for identifier in (-1, 2**32, 'a', None, maze[(0, 0)].identifier ^ 1):
+            with assert_exception(ValueError):
+                maze.identifier_index(identifier)
+
+    maze[(1, 1)].identifier = 42
+    assert not maze.permuted, \
+        'Modifying an identifier did not clear the permuted flag'
+    assert maze.identifier_index(42) == maze.index((1, 1)) \
+            and maze.room_mapping[42] == (1, 1), \
+        'A modified identifier was not found'
+    assert not state.unpack(state.pack(maze)).permuted, \
+        'The permuted flag was not cleared when packed'
+
+
+@test
+def state_identifier_zero():
+    """Rooms with the identifier 0 are found and described"""
+    maze, remaining = util.new(width = 300, height = 300, seed = 7549,
+        lazy = True)
+    room_pos = maze.position(84157)
+    assert maze[room_pos].identifier == 0, \
+        'The seed did not assign the identifier 0'
+    assert maze.identifier_index(0) == 84157 \
+            and maze.room_mapping[0] == room_pos, \
+        'The room with the identifier 0 was not found'
+
+    neighbor = next(maze.doors(room_pos)).back.room_pos
+    targets = [w['target'] for w in util.room_to_dict(maze, neighbor)['walls']]
+    assert 0 in targets, \
+        'The room with the identifier 0 was not a target: %s' % str(targets)
+
+
+@test
+def state_pack1():
+    """state.unpack for invalid data"""
+    maze, remaining = util.new(width = 5, height = 5)
+    data = state.pack(maze)
+
+    with assert_exception(ValueError):
+        state.unpack(data[:10])
+
+    with assert_exception(ValueError):
+        state.unpack(data[:-1])
+
+    with assert_exception(ValueError):
+        state.unpack(b'XX' + data[2:])
+
+
+@test
+def state_room_mapping():
+    """MazeView.room_mapping maps identifiers to positions"""
+    maze, remaining = util.new(width = 6, height = 4)
+
+    for room_pos in maze.room_positions:
+        identifier = maze[room_pos].identifier
+        assert maze.room_mapping[identifier] == room_pos, \
+            'room_mapping[%d] was %s, not %s' % (identifier,
+                str(maze.room_mapping[identifier]), str(room_pos))
+
+    assert not -1 in maze.room_mapping, \
+        'An invalid identifier was mapped'
+    with assert_exception(KeyError):
+        maze.room_mapping[-1]
+
+
+@test
+def state_pack_seeded0():
+    """state.pack with seeded for an unmodified maze"""
+    maze, remaining = util.new(width = 30, height = 20, seed = 5)
+    maze.share()
+    maze.current_room = maze[(0, 1)].identifier
+
+    data = state.pack(maze, True)
+    assert len(data) + 5 * maze.width * maze.height == len(state.pack(maze)), \
+        'The seeded maze contained room data'
+
+    with assert_exception(ValueError):
+        state.unpack(data)
+
+    copy = state.unpack(data, util.topology)
+    assert all(
+            copy[room_pos].doors == maze[room_pos].doors
+            and copy[room_pos].identifier == maze[room_pos].identifier
+            for room_pos in maze.room_positions), \
+        'The regenerated maze differs from the original'
+    assert copy.current_room_pos == (0, 1), \
+        'The current room was not preserved'
+
+
+@test
+def state_pack_seeded1():
+    """state.pack with seeded for a modified maze"""
+    maze, remaining = util.new(width = 30, height = 20, seed = 5)
+    doors, identifiers = maze.share()
+    maze[(0, 0)][maze.Wall.UP] = not maze[(0, 0)][maze.Wall.UP]
+
+    assert not maze.shared and not doors is maze._doors, \
+        'The shared arrays were not copied when modified'
+
+    data = state.pack(maze, True)
+    copy = state.unpack(data)
+    assert copy[(0, 0)].doors == maze[(0, 0)].doors, \
+        'The modification was not preserved'
+
+
+@test
+def state_modified():
+    """MazeView.modified for unpacked mazes"""
+    maze, remaining = util.new(width = 5, height = 4, seed = 17)
+    assert maze.modified == state.MODIFIED_ALL, \
+        'A new maze was not modified'
+
+    data = state.pack(maze)
+    maze = state.unpack(data)
+    assert maze.modified == 0, \
+        'An unpacked maze was modified'
+
+    maze.current_room = maze.current_room
+    assert maze.modified == 0, \
+        'Moving to the current room modified the maze'
+
+    maze.current_room = maze[(1, 0)].identifier
+    assert maze.modified == state.MODIFIED_CURRENT, \
+        'Moving to a new room did not modify only the current room'
+
+    maze = state.unpack(data)
+    room = maze[(1, 1)]
+    room += maze.Wall.LEFT
+    assert maze.modified == state.MODIFIED_ROOMS, \
+        'Adding a door did not modify only the rooms'
+
+    maze = state.unpack(data)
+    next(maze.random)
+    assert maze.modified == state.MODIFIED_RANDOM, \
+        'Using the random number generator did not modify only its state'
+
+    maze = state.unpack(data)
+    maze.plugins['test'] = 'test'
+    assert maze.modified == state.MODIFIED_PLUGINS, \
+        'Changing the plugins did not modify only the plugins'
+
+
+@test
+def state_Snapshot_restore():
+    """Snapshot.restore with current room and modification tracking"""
+    maze, remaining = util.new(width = 5, height = 4, seed = 17)
+    maze.revision = 42
+    snapshot = state.Snapshot(maze)
+
+    copy = snapshot.restore()
+    assert copy.modified == state.MODIFIED_ALL, \
+        'A restored maze was not reported as new'
+    assert copy.revision == 42, \
+        'The revision was not restored'
+
+    copy = snapshot.restore(True, 3)
+    assert copy.modified == 0 and copy.current_room_index == 3, \
+        'The maze was not restored unmodified with the current room'
+    assert copy.room_dicts is maze.room_dicts, \
+        'The room dict cache was not shared'
+
+
+@test
+def util_room_to_dict():
+    """util.room_to_dict caches non-recursive room dicts"""
+    maze, remaining = util.new(width = 5, height = 4, seed = 17)
+    maze = state.unpack(state.pack(maze))
+
+    expected = util.room_to_dict(maze, (1, 1), True)
+    assert maze.room_dicts, \
+        'No room dicts were cached'
+    assert util.room_to_dict(maze, (1, 1), True) == expected, \
+        'The cached room dict differs'
+
+    room_dicts = maze.room_dicts
+    util.invalidate(maze)
+    assert not maze.room_dicts and room_dicts, \
+        'The room dicts were not invalidated'
+
+    original = util.room_to_dict(maze, (1, 1))
+    room = maze[(1, 1)]
+    room[maze.Wall.RIGHT] = not room[maze.Wall.RIGHT]
+    assert not maze.derived and not maze.room_dicts, \
+        'The caches were not cleared when the maze was modified'
+    assert util.room_to_dict(maze, (1, 1)) != original, \
+        'The room dict was not updated when the maze was modified'
@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import time
+
+from mazeweb import util
+from mazeweb.util import data, state, storage
+
+from .. import test, assert_exception
+
+
+class Session(dict):
+    """A minimal stand-in for a *Beaker* session"""
+    def __init__(self, id):
+        super(Session, self).__init__()
+        self.id = id
+        self.saved = 0
+
+    def save(self):
+        self.saved += 1
+
+
+def check_store(store):
+    """Verifies the behaviour of a store"""
+    for lazy in (False, True):
+        check_maze(store, util.new(width = 5, height = 6, seed = 17,
+            lazy = lazy)[0])
+
+
+def check_maze(store, maze):
+    """Verifies the behaviour of a store for a maze"""
+    packed = state.pack(maze)
+    session1 = Session('session1')
+    session2 = Session('session2')
+
+    with assert_exception(KeyError):
+        store.load(session1)
+    with assert_exception(KeyError):
+        store.store_current(session1, 3, 1)
+
+    store.store(session1, packed)
+    assert bytes(store.load(session1)) == packed, \
+        'The stored maze was not loaded'
+    with assert_exception(KeyError):
+        store.load(session2)
+
+    store.store_current(session1, 3, 1, [3, 29])
+    maze = state.unpack(store.load(session1), util.topology)
+    assert maze.current_room_index == 3 and maze.moves == 1, \
+        'The current room was not updated'
+    assert maze.is_visited(3) and maze.is_visited(29) \
+            and not maze.is_visited(4), \
+        'The visited rooms were not updated'
+
+    store.store(session1, packed)
+    assert bytes(store.load(session1)) == packed, \
+        'The visited rooms were not replaced'
+
+    store.delete(session1)
+    store.delete(session1)
+    with assert_exception(KeyError):
+        store.load(session1)
+
+
+def check_purge(store):
+    """Verifies that a store purges expired mazes at most once every
+    PURGE_INTERVAL seconds"""
+    session = Session('session')
+    store.store(session, state.pack(util.new(width = 5, height = 6,
+        seed = 17)[0]))
+    store.timeout = 0
+    time.sleep(0.01)
+
+    store._purge()
+    store.load(session)
+
+    store._purged -= store.PURGE_INTERVAL
+    store._purge()
+    with assert_exception(KeyError):
+        store.load(session)
+
+
+@test
+def storage_BeakerStore():
+    """BeakerStore stores mazes in the session"""
+    check_store(storage.BeakerStore())
+
+
+@test
+def storage_FileStore():
+    """FileStore stores mazes in files"""
+    path = tempfile.mkdtemp()
+    try:
+        check_store(storage.FileStore(os.path.join(path, 'sessions')))
+        check_purge(storage.FileStore(os.path.join(path, 'purge')))
+
+        with assert_exception(KeyError):
+            storage.FileStore(path).load(Session('../session'))
+    finally:
+        shutil.rmtree(path)
+
+
+@test
+def storage_SQLiteStore():
+    """SQLiteStore stores mazes in a database"""
+    path = tempfile.mkdtemp()
+    try:
+        check_store(storage.SQLiteStore(os.path.join(path, 'sessions.sqlite')))
+        check_purge(storage.SQLiteStore(os.path.join(path, 'purge.sqlite')))
+    finally:
+        shutil.rmtree(path)
+
+
+@test
+def storage_create():
+    """storage.create returns the configured store"""
+    path = tempfile.mkdtemp()
+    try:
+        configuration = data.ConfigurationStore({
+            'session': {
+                'store': 'file',
+                'path': path}})
+        store = storage.create(configuration)
+        assert isinstance(store, storage.FileStore), \
+            'Invalid store: %s' % str(store)
+        assert store.path == os.path.realpath(path), \
+            'Invalid path: %s' % store.path
+
+        with assert_exception(ValueError):
+            storage.create(data.ConfigurationStore({
+                'session': {
+                    'store': 'invalid'}}))
+    finally:
+        shutil.rmtree(path)
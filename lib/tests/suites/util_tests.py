@@ -1,4 +1,8 @@
-from mazeweb.util.numeric import randuniq
+import itertools
+
+from mazeweb.util.counters import Counters, Histograms
+from mazeweb.util.numeric import jump, randuniq, randuniq_at, \
+    randuniq_block, LFSR, Permutation
 from mazeweb.util.data import wrap, ConfigurationStore
 
 from .. import test, assert_exception
@@ -46,6 +50,101 @@ def numeric_randuniq4():
         seen.add(n)
 
 
+@test
+def numeric_LFSR0():
+    """LFSR for invalid seed"""
+    with assert_exception(ValueError):
+        LFSR(0)
+
+
+@test
+def numeric_LFSR1():
+    """LFSR yields the same sequence as randuniq and resumes from its state"""
+    expected = list(itertools.islice(randuniq(None, 1234), 200))
+
+    lfsr = LFSR(1234)
+    actual = [next(lfsr) for i in range(100)]
+    actual.extend(itertools.islice(LFSR(lfsr.state), 100))
+
+    assert actual == expected, \
+        'LFSR yielded %s instead of %s' % (str(actual), str(expected))
+
+
+@test
+def numeric_randuniq_block0():
+    """randuniq_block for invalid arguments"""
+    with assert_exception(ValueError):
+        randuniq_block(0)
+    with assert_exception(ValueError):
+        randuniq_block(10, 0)
+
+
+@test
+def numeric_randuniq_block1():
+    """randuniq_block yields the same sequence as randuniq"""
+    for length, seed in ((1, 1), (31, 5), (32, 7), (33, 9), (5000, 456),
+            (70001, 2**32 + 77)):
+        actual = list(randuniq_block(length, seed))
+        expected = list(randuniq(length, seed))
+        assert actual == expected, \
+            'randuniq_block(%d, %d) differs from randuniq at index %d' % (
+                length, seed, next(i for i, (a, e) in enumerate(zip(
+                    actual, expected)) if a != e))
+
+    lfsr = LFSR(1234)
+    actual = list(lfsr.block(150))
+    actual.extend(itertools.islice(lfsr, 50))
+    expected = list(itertools.islice(randuniq(None, 1234), 200))
+    assert actual == expected, \
+        'LFSR.block yielded %s instead of %s' % (str(actual), str(expected))
+
+
+@test
+def numeric_jump0():
+    """jump for invalid arguments"""
+    with assert_exception(ValueError):
+        jump(0, 1)
+    with assert_exception(ValueError):
+        jump(1, -1)
+    with assert_exception(ValueError):
+        randuniq_at(-1)
+
+
+@test
+def numeric_jump1():
+    """jump and randuniq_at yield the same values as randuniq"""
+    expected = list(randuniq(70000, 1234))
+    for index in (0, 1, 31, 32, 1000, 65535, 69999):
+        assert randuniq_at(index, 1234) == expected[index], \
+            'randuniq_at(%d) yielded %d instead of %d' % (
+                index, randuniq_at(index, 1234), expected[index])
+    assert jump(1234, 0) == 1234, \
+        'jump with no steps changed the state'
+
+    lfsr = LFSR(1234)
+    lfsr.jump(500)
+    assert next(lfsr) == expected[500], \
+        'LFSR.jump did not skip numbers'
+
+
+@test
+def numeric_Permutation():
+    """Permutation.block, Permutation() and Permutation.inverse"""
+    permutation = Permutation.for_key(1234)
+    values = list(permutation.block(70000))
+    assert values == [permutation(i) for i in range(70000)], \
+        'Permutation.block differs from Permutation()'
+    assert len(set(values)) == len(values), \
+        'The permutation yielded duplicate values'
+    for value in values[:1000] + [0xFFFFFFFF, 0x80000000]:
+        assert permutation.inverse(permutation(value)) == value, \
+            'Permutation.inverse(%d) is invalid' % value
+    assert list(Permutation(1235).block(100)) != values[:100], \
+        'Different keys yielded the same permutation'
+    assert len(permutation.block(0)) == 0, \
+        'Permutation.block(0) yielded values'
+
+
 @test
 def wrap_cmp():
     """Tests comparison for standard types"""
@@ -153,3 +252,56 @@ def ConfigurationStore_call1():
         'Access failed'
     assert w('a_dict.key', 'next') == 'next', \
         'Access failed'
+
+
+@test
+def counters_Counters():
+    """Counters.increment and Counters.stats"""
+    counters = Counters('a', 'b')
+    counters.increment('a')
+    counters.increment('a', 2)
+
+    assert counters['a'] == 3, \
+        'Counter a is %d, not 3' % counters['a']
+    assert counters.stats() == dict(a = 3, b = 0), \
+        'Invalid stats: %s' % str(counters.stats())
+
+    with assert_exception(KeyError):
+        counters.increment('c')
+
+
+@test
+def counters_Histograms():
+    """Histograms.add, Histograms.percentile and Histograms.stats"""
+    histograms = Histograms()
+    for value in [0.0001] * 50 + [0.003] * 45 + [0.03] * 4 + [10.0]:
+        histograms.add('GET', value)
+
+    stats = histograms.stats()['GET']
+    assert stats['count'] == 100, \
+        'Invalid count: %d' % stats['count']
+    assert (stats['p50'], stats['p95'], stats['p99']) \
+            == (0.0005, 0.005, 0.05), \
+        'Invalid percentiles: %s' % str(stats)
+    assert histograms.percentile('GET', 100) is None, \
+        'The last bucket has an upper bound'
+
+    with assert_exception(KeyError):
+        histograms.percentile('PUT', 50)
+
+
+@test
+def counters_Histograms_merge():
+    """Histograms.merge(Histograms.stats())"""
+    first, second = Histograms(), Histograms()
+    first.add('GET', 0.001)
+    second.add('GET', 0.001)
+    second.add('PUT', 1.5)
+
+    first.merge(second.stats())
+    stats = first.stats()
+    assert stats['GET']['count'] == 2 and stats['PUT']['count'] == 1, \
+        'Invalid merged histograms: %s' % str(stats)
+
+    with assert_exception(ValueError):
+        first.merge(dict(GET = dict(buckets = [1])))
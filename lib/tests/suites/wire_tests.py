@@ -0,0 +1,101 @@
+import json
+
+from mazeweb import util
+from mazeweb.util import encoding, state, wire
+
+from .. import test, assert_exception
+
+
+def _json(value):
+    """Returns a value as decoded from its JSON representation"""
+    return json.loads(encoding.dumps(value))
+
+
+@test
+def wire_dumps_maze():
+    """wire.loads(wire.dumps(maze dict)) for all maze types"""
+    for walls in state.VIEW_CLASSES:
+        maze, remaining = util.new(width = 5, height = 4, walls = walls,
+            seed = 5)
+        for room_pos in maze.room_positions:
+            maze.current_room_index = maze.index(room_pos)
+            value = util.to_dict(maze)
+            value['extra'] = dict(values = [1, 2, 3])
+            actual = wire.loads(wire.dumps(value, maze.geometry))
+            assert actual == _json(value), \
+                'Invalid maze dict for %s: %s != %s' % (
+                    str(room_pos), str(actual), str(_json(value)))
+
+
+@test
+def wire_dumps_room():
+    """wire.loads(wire.dumps(room dict)) for all maze types"""
+    for walls in state.VIEW_CLASSES:
+        maze, remaining = util.new(width = 5, height = 4, walls = walls,
+            seed = 5)
+        for room_pos in maze.room_positions:
+            for neighbor_details in (False, True):
+                value = util.room_to_dict(maze, room_pos, neighbor_details)
+                actual = wire.loads(
+                    wire.dumps(value, maze.geometry),
+                    maze.geometry)
+                assert actual == _json(value), \
+                    'Invalid room dict for %s: %s != %s' % (
+                        str(room_pos), str(actual), str(_json(value)))
+
+
+@test
+def wire_dumps_rooms():
+    """wire.loads(wire.dumps(room list dict))"""
+    maze, remaining = util.new(width = 5, height = 4, walls = 6, seed = 5)
+    value = dict(
+        rooms = [util.room_to_dict(maze, room_pos, True)
+            for room_pos in ((0, 0), (1, 1), (4, 3))],
+        denied = [1, 2])
+    actual = wire.loads(wire.dumps(value, maze.geometry), maze.geometry)
+    assert actual == _json(value), \
+        'Invalid room list dict: %s != %s' % (str(actual), str(_json(value)))
+
+
+@test
+def wire_dumps_delta():
+    """wire.loads(wire.dumps(delta dict))"""
+    for walls in state.VIEW_CLASSES:
+        maze, remaining = util.new(width = 5, height = 4, walls = walls,
+            seed = 5)
+        previous = util.visible(maze, maze.current_room_pos)
+        maze.current_room_index = maze.index((2, 2))
+        maze.moves = 7
+        value = util.delta_to_dict(maze, previous)
+        actual = wire.loads(wire.dumps(value, maze.geometry), maze.geometry)
+        assert actual == _json(value), \
+            'Invalid delta dict: %s != %s' % (str(actual), str(_json(value)))
+
+
+@test
+def wire_dumps_cached():
+    """wire.dump_room caches the representation of cached dicts"""
+    maze, remaining = util.new(width = 5, height = 4, seed = 5)
+    value = util.room_to_dict(maze, (1, 1))
+    data = wire.dump_room(maze.geometry, value)
+    assert value.binary is data, \
+        'The binary representation was not cached'
+    assert wire.dump_room(maze.geometry, value) is data, \
+        'The cached binary representation was not used'
+
+
+@test
+def wire_loads_invalid():
+    """wire.loads for invalid data"""
+    maze, remaining = util.new(width = 5, height = 4, seed = 5)
+    data = wire.dumps(util.to_dict(maze), maze.geometry)
+
+    with assert_exception(ValueError):
+        wire.loads(data[:-1])
+    with assert_exception(ValueError):
+        wire.loads(data + b'\0')
+    with assert_exception(ValueError):
+        wire.loads(b'X' + data[1:])
+    with assert_exception(ValueError):
+        wire.loads(wire.dumps(util.room_to_dict(maze, (0, 0), True),
+            maze.geometry))